@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Location',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('latitude', models.DecimalField(decimal_places=8, max_digits=10)),
+                ('longitude', models.DecimalField(decimal_places=8, max_digits=11)),
+                ('openaq_location_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'locations',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PipelineWorker',
+            fields=[
+                ('worker_id', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('heartbeat_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'pipeline_workers',
+            },
+        ),
+        migrations.CreateModel(
+            name='PipelineShard',
+            fields=[
+                ('shard_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('owner', models.CharField(blank=True, max_length=255, null=True)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'pipeline_shards',
+                'indexes': [models.Index(fields=['owner'], name='pipeline_sh_owner_de05be_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_location_pipeline_shards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='measurement',
+            name='dominant_pollutant',
+            field=models.CharField(blank=True, max_length=10, null=True),
+        ),
+    ]
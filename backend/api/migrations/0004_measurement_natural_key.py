@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_measurement_dominant_pollutant'),
+    ]
+
+    operations = [
+        # Repeated runs appended the same observation many times; keep the newest copy
+        migrations.RunSQL(
+            sql="""
+                DELETE FROM measurements
+                WHERE EXISTS (
+                    SELECT 1 FROM measurements newer
+                    WHERE newer.location_name = measurements.location_name
+                    AND newer.timestamp = measurements.timestamp
+                    AND newer.source = measurements.source
+                    AND newer.id > measurements.id
+                )
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='measurement',
+            constraint=models.UniqueConstraint(fields=('location_name', 'timestamp', 'source'), name='measurements_natural_key'),
+        ),
+    ]
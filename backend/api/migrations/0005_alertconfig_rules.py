@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_measurement_natural_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alertconfig',
+            name='clear_value',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='alertconfig',
+            name='rule_type',
+            field=models.CharField(choices=[('threshold', 'Threshold'), ('duration', 'Sustained exceedance'), ('rate_of_change', 'Rate of change')], default='threshold', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='alertconfig',
+            name='window_minutes',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
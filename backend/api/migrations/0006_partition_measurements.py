@@ -0,0 +1,98 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:30
+
+from datetime import datetime, timezone
+
+from django.db import migrations
+
+# Monthly partitions created ahead of the current month; the pipeline's
+# PartitionManager keeps this window rolling afterwards
+MONTHS_AHEAD = 3
+
+INDEXES = """
+    ALTER TABLE measurements ADD CONSTRAINT measurements_pkey PRIMARY KEY (id, timestamp);
+    ALTER TABLE measurements ADD CONSTRAINT measurements_natural_key UNIQUE (location_name, timestamp, source);
+    CREATE INDEX measurement_locatio_f44847_idx ON measurements (location_name, timestamp);
+    CREATE INDEX measurement_timesta_133bdb_idx ON measurements (timestamp);
+"""
+
+DROP_INDEXES = """
+    DROP INDEX IF EXISTS measurement_locatio_f44847_idx;
+    DROP INDEX IF EXISTS measurement_timesta_133bdb_idx;
+    ALTER TABLE {table} DROP CONSTRAINT IF EXISTS measurements_natural_key;
+    ALTER TABLE {table} DROP CONSTRAINT IF EXISTS measurements_pkey;
+"""
+
+# The id sequence is recreated by hand: PostgreSQL 15 doesn't allow identity
+# columns on partitioned tables
+SEQUENCE = """
+    DROP SEQUENCE IF EXISTS measurements_id_seq;
+    CREATE SEQUENCE measurements_id_seq OWNED BY measurements.id;
+    SELECT setval('measurements_id_seq', COALESCE((SELECT MAX(id) FROM measurements), 0) + 1, false);
+    ALTER TABLE measurements ALTER COLUMN id SET DEFAULT nextval('measurements_id_seq');
+"""
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_measurements(apps, schema_editor):
+    """Rebuild measurements as a table range-partitioned by month on timestamp"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("LOCK TABLE measurements IN ACCESS EXCLUSIVE MODE")
+        cursor.execute("ALTER TABLE measurements RENAME TO measurements_unpartitioned")
+        cursor.execute(DROP_INDEXES.format(table='measurements_unpartitioned'))
+        cursor.execute("""
+            CREATE TABLE measurements (LIKE measurements_unpartitioned INCLUDING DEFAULTS)
+            PARTITION BY RANGE (timestamp)
+        """)
+        cursor.execute("ALTER TABLE measurements ALTER COLUMN id DROP DEFAULT")
+
+        cursor.execute("SELECT MIN(timestamp) FROM measurements_unpartitioned")
+        oldest = cursor.fetchone()[0]
+        current = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        month = current
+        if oldest is not None:
+            month = min(current, oldest.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0))
+        while month <= add_months(current, MONTHS_AHEAD):
+            cursor.execute(
+                f"CREATE TABLE measurements_{month:%Y_%m} PARTITION OF measurements FOR VALUES FROM (%s) TO (%s)",
+                [month, add_months(month, 1)]
+            )
+            month = add_months(month, 1)
+        # Catches rows outside every monthly partition instead of rejecting them
+        cursor.execute("CREATE TABLE measurements_default PARTITION OF measurements DEFAULT")
+
+        cursor.execute("INSERT INTO measurements SELECT * FROM measurements_unpartitioned")
+        cursor.execute("DROP TABLE measurements_unpartitioned")
+        cursor.execute(INDEXES)
+        cursor.execute(SEQUENCE)
+
+
+def unpartition_measurements(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("LOCK TABLE measurements IN ACCESS EXCLUSIVE MODE")
+        cursor.execute("ALTER TABLE measurements RENAME TO measurements_partitioned")
+        cursor.execute(DROP_INDEXES.format(table='measurements_partitioned'))
+        cursor.execute("ALTER SEQUENCE measurements_id_seq OWNED BY NONE")
+        cursor.execute("CREATE TABLE measurements (LIKE measurements_partitioned INCLUDING DEFAULTS)")
+        cursor.execute("INSERT INTO measurements SELECT * FROM measurements_partitioned")
+        cursor.execute("DROP TABLE measurements_partitioned")
+        cursor.execute("ALTER SEQUENCE measurements_id_seq OWNED BY measurements.id")
+        cursor.execute(INDEXES.replace('PRIMARY KEY (id, timestamp)', 'PRIMARY KEY (id)'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_alertconfig_rules'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_measurements, unpartition_measurements),
+    ]
@@ -0,0 +1,194 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:23
+
+from django.db import migrations, models
+
+# Frozen copy of api.models.ROLLUP_FIELDS
+ROLLUP_FIELDS = [
+    'temperature', 'humidity', 'pressure', 'pm25', 'pm10',
+    'no2', 'so2', 'co', 'o3', 'aqi', 'traffic_level'
+]
+
+
+def backfill_rollups(apps, schema_editor):
+    """Build the rollups from every stored measurement; the pipeline keeps them current afterwards"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    columns = ', '.join(f'avg_{f}, min_{f}, max_{f}, count_{f}' for f in ROLLUP_FIELDS)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO measurements_hourly (location_name, bucket, sample_count, {columns}, updated_at)
+            SELECT
+                location_name,
+                date_trunc('hour', timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+                COUNT(*),
+                {', '.join(f'AVG({f})::float8, MIN({f})::float8, MAX({f})::float8, COUNT({f})' for f in ROLLUP_FIELDS)},
+                now()
+            FROM measurements
+            GROUP BY 1, 2
+        """)
+        cursor.execute(f"""
+            INSERT INTO measurements_daily (location_name, bucket, sample_count, {columns}, updated_at)
+            SELECT
+                location_name,
+                date_trunc('day', bucket AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+                SUM(sample_count),
+                {', '.join(
+                    f'SUM(avg_{f} * count_{f}) / NULLIF(SUM(count_{f}), 0), MIN(min_{f}), MAX(max_{f}), SUM(count_{f})'
+                    for f in ROLLUP_FIELDS
+                )},
+                now()
+            FROM measurements_hourly
+            GROUP BY 1, 2
+        """)
+
+
+def drop_hourly_view(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP FUNCTION IF EXISTS refresh_hourly_measurements()")
+        cursor.execute("DROP MATERIALIZED VIEW IF EXISTS hourly_measurements")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_partition_measurements'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMeasurement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location_name', models.CharField(max_length=255)),
+                ('bucket', models.DateTimeField()),
+                ('sample_count', models.IntegerField()),
+                ('avg_temperature', models.FloatField(blank=True, null=True)),
+                ('min_temperature', models.FloatField(blank=True, null=True)),
+                ('max_temperature', models.FloatField(blank=True, null=True)),
+                ('count_temperature', models.IntegerField(default=0)),
+                ('avg_humidity', models.FloatField(blank=True, null=True)),
+                ('min_humidity', models.FloatField(blank=True, null=True)),
+                ('max_humidity', models.FloatField(blank=True, null=True)),
+                ('count_humidity', models.IntegerField(default=0)),
+                ('avg_pressure', models.FloatField(blank=True, null=True)),
+                ('min_pressure', models.FloatField(blank=True, null=True)),
+                ('max_pressure', models.FloatField(blank=True, null=True)),
+                ('count_pressure', models.IntegerField(default=0)),
+                ('avg_pm25', models.FloatField(blank=True, null=True)),
+                ('min_pm25', models.FloatField(blank=True, null=True)),
+                ('max_pm25', models.FloatField(blank=True, null=True)),
+                ('count_pm25', models.IntegerField(default=0)),
+                ('avg_pm10', models.FloatField(blank=True, null=True)),
+                ('min_pm10', models.FloatField(blank=True, null=True)),
+                ('max_pm10', models.FloatField(blank=True, null=True)),
+                ('count_pm10', models.IntegerField(default=0)),
+                ('avg_no2', models.FloatField(blank=True, null=True)),
+                ('min_no2', models.FloatField(blank=True, null=True)),
+                ('max_no2', models.FloatField(blank=True, null=True)),
+                ('count_no2', models.IntegerField(default=0)),
+                ('avg_so2', models.FloatField(blank=True, null=True)),
+                ('min_so2', models.FloatField(blank=True, null=True)),
+                ('max_so2', models.FloatField(blank=True, null=True)),
+                ('count_so2', models.IntegerField(default=0)),
+                ('avg_co', models.FloatField(blank=True, null=True)),
+                ('min_co', models.FloatField(blank=True, null=True)),
+                ('max_co', models.FloatField(blank=True, null=True)),
+                ('count_co', models.IntegerField(default=0)),
+                ('avg_o3', models.FloatField(blank=True, null=True)),
+                ('min_o3', models.FloatField(blank=True, null=True)),
+                ('max_o3', models.FloatField(blank=True, null=True)),
+                ('count_o3', models.IntegerField(default=0)),
+                ('avg_aqi', models.FloatField(blank=True, null=True)),
+                ('min_aqi', models.FloatField(blank=True, null=True)),
+                ('max_aqi', models.FloatField(blank=True, null=True)),
+                ('count_aqi', models.IntegerField(default=0)),
+                ('avg_traffic_level', models.FloatField(blank=True, null=True)),
+                ('min_traffic_level', models.FloatField(blank=True, null=True)),
+                ('max_traffic_level', models.FloatField(blank=True, null=True)),
+                ('count_traffic_level', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'measurements_daily',
+                'ordering': ['-bucket'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlyMeasurement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location_name', models.CharField(max_length=255)),
+                ('bucket', models.DateTimeField()),
+                ('sample_count', models.IntegerField()),
+                ('avg_temperature', models.FloatField(blank=True, null=True)),
+                ('min_temperature', models.FloatField(blank=True, null=True)),
+                ('max_temperature', models.FloatField(blank=True, null=True)),
+                ('count_temperature', models.IntegerField(default=0)),
+                ('avg_humidity', models.FloatField(blank=True, null=True)),
+                ('min_humidity', models.FloatField(blank=True, null=True)),
+                ('max_humidity', models.FloatField(blank=True, null=True)),
+                ('count_humidity', models.IntegerField(default=0)),
+                ('avg_pressure', models.FloatField(blank=True, null=True)),
+                ('min_pressure', models.FloatField(blank=True, null=True)),
+                ('max_pressure', models.FloatField(blank=True, null=True)),
+                ('count_pressure', models.IntegerField(default=0)),
+                ('avg_pm25', models.FloatField(blank=True, null=True)),
+                ('min_pm25', models.FloatField(blank=True, null=True)),
+                ('max_pm25', models.FloatField(blank=True, null=True)),
+                ('count_pm25', models.IntegerField(default=0)),
+                ('avg_pm10', models.FloatField(blank=True, null=True)),
+                ('min_pm10', models.FloatField(blank=True, null=True)),
+                ('max_pm10', models.FloatField(blank=True, null=True)),
+                ('count_pm10', models.IntegerField(default=0)),
+                ('avg_no2', models.FloatField(blank=True, null=True)),
+                ('min_no2', models.FloatField(blank=True, null=True)),
+                ('max_no2', models.FloatField(blank=True, null=True)),
+                ('count_no2', models.IntegerField(default=0)),
+                ('avg_so2', models.FloatField(blank=True, null=True)),
+                ('min_so2', models.FloatField(blank=True, null=True)),
+                ('max_so2', models.FloatField(blank=True, null=True)),
+                ('count_so2', models.IntegerField(default=0)),
+                ('avg_co', models.FloatField(blank=True, null=True)),
+                ('min_co', models.FloatField(blank=True, null=True)),
+                ('max_co', models.FloatField(blank=True, null=True)),
+                ('count_co', models.IntegerField(default=0)),
+                ('avg_o3', models.FloatField(blank=True, null=True)),
+                ('min_o3', models.FloatField(blank=True, null=True)),
+                ('max_o3', models.FloatField(blank=True, null=True)),
+                ('count_o3', models.IntegerField(default=0)),
+                ('avg_aqi', models.FloatField(blank=True, null=True)),
+                ('min_aqi', models.FloatField(blank=True, null=True)),
+                ('max_aqi', models.FloatField(blank=True, null=True)),
+                ('count_aqi', models.IntegerField(default=0)),
+                ('avg_traffic_level', models.FloatField(blank=True, null=True)),
+                ('min_traffic_level', models.FloatField(blank=True, null=True)),
+                ('max_traffic_level', models.FloatField(blank=True, null=True)),
+                ('count_traffic_level', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'measurements_hourly',
+                'ordering': ['-bucket'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['bucket'], name='measurement_bucket_612039_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='hourlymeasurement',
+            constraint=models.UniqueConstraint(fields=('location_name', 'bucket'), name='measurements_hourly_key'),
+        ),
+        migrations.AddIndex(
+            model_name='dailymeasurement',
+            index=models.Index(fields=['bucket'], name='measurement_bucket_c3d9db_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailymeasurement',
+            constraint=models.UniqueConstraint(fields=('location_name', 'bucket'), name='measurements_daily_key'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+        # Superseded by measurements_hourly; it was never refreshed
+        migrations.RunPython(drop_hourly_view, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:29
+
+import django.core.validators
+from django.db import migrations, models
+
+COLUMNS = (
+    'location_name, latitude, longitude, timestamp, temperature, humidity, pressure, '
+    'pm25, pm10, no2, so2, co, o3, aqi, dominant_pollutant, traffic_level, source'
+)
+
+
+def backfill_current(apps, schema_editor):
+    """Seed the latest reading per location and source from the stored measurements"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO current_measurements ({COLUMNS}, updated_at)
+            SELECT DISTINCT ON (location_name, source) {COLUMNS}, now()
+            FROM measurements
+            ORDER BY location_name, source, timestamp DESC
+        """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_measurement_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurrentMeasurement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location_name', models.CharField(max_length=255)),
+                ('latitude', models.DecimalField(decimal_places=8, max_digits=10)),
+                ('longitude', models.DecimalField(decimal_places=8, max_digits=11)),
+                ('timestamp', models.DateTimeField()),
+                ('temperature', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('humidity', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('pressure', models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True)),
+                ('pm25', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('pm10', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('no2', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('so2', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('co', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('o3', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('aqi', models.IntegerField(blank=True, null=True)),
+                ('dominant_pollutant', models.CharField(blank=True, max_length=10, null=True)),
+                ('traffic_level', models.IntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(10)])),
+                ('source', models.CharField(max_length=50)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'current_measurements',
+                'ordering': ['location_name'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='currentmeasurement',
+            constraint=models.UniqueConstraint(fields=('location_name', 'source'), name='current_measurements_key'),
+        ),
+        migrations.RunPython(backfill_current, migrations.RunPython.noop),
+    ]
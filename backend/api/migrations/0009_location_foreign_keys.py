@@ -0,0 +1,153 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Tables that referenced locations by name
+TABLES = [
+    'measurements', 'current_measurements', 'measurements_hourly',
+    'measurements_daily', 'predictions', 'alerts',
+]
+
+# Models whose location becomes required once every row is linked
+REQUIRED = ['measurement', 'currentmeasurement', 'hourlymeasurement', 'dailymeasurement', 'prediction']
+
+
+def link_locations(apps, schema_editor):
+    """Register every location name in use, then point each row at its location"""
+    with schema_editor.connection.cursor() as cursor:
+        if schema_editor.connection.vendor == 'postgresql':
+            # Check the new foreign keys now; pending deferred checks would block the ALTERs that follow
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        # Names seen in measurements get their reported coordinates; names only
+        # known from derived tables are registered inactive at (0, 0)
+        for table in TABLES:
+            coordinates = 'MAX(latitude), MAX(longitude), true' if table == 'measurements' else '0, 0, false'
+            cursor.execute(f"""
+                INSERT INTO locations (name, latitude, longitude, is_active, created_at, updated_at)
+                SELECT location_name, {coordinates}, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+                FROM {table}
+                WHERE location_name IS NOT NULL
+                AND location_name NOT IN (SELECT name FROM locations)
+                GROUP BY location_name
+            """)
+        for table in TABLES:
+            cursor.execute(f"""
+                UPDATE {table}
+                SET location_id = (SELECT id FROM locations WHERE locations.name = {table}.location_name)
+            """)
+
+
+def unlink_locations(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for table in TABLES:
+            cursor.execute(f"""
+                UPDATE {table}
+                SET location_name = (SELECT name FROM locations WHERE locations.id = {table}.location_id)
+            """)
+
+
+def location_field(**kwargs):
+    return models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='api.location', **kwargs)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_current_measurements'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='location',
+            field=location_field(blank=True, null=True),
+        ),
+    ] + [
+        migrations.AddField(
+            model_name=model_name,
+            name='location',
+            field=location_field(db_index=False, null=True),
+        )
+        for model_name in REQUIRED
+    ] + [
+        # Nullable first, so reversing can re-add the names before requiring them
+        migrations.AlterField(
+            model_name=model_name,
+            name='location_name',
+            field=models.CharField(max_length=255, null=True),
+        )
+        for model_name in REQUIRED
+    ] + [
+        migrations.RunPython(link_locations, unlink_locations),
+        migrations.RemoveConstraint(
+            model_name='currentmeasurement',
+            name='current_measurements_key',
+        ),
+        migrations.RemoveConstraint(
+            model_name='dailymeasurement',
+            name='measurements_daily_key',
+        ),
+        migrations.RemoveConstraint(
+            model_name='hourlymeasurement',
+            name='measurements_hourly_key',
+        ),
+        migrations.RemoveConstraint(
+            model_name='measurement',
+            name='measurements_natural_key',
+        ),
+        migrations.RemoveIndex(
+            model_name='measurement',
+            name='measurement_locatio_f44847_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='prediction',
+            name='predictions_locatio_1da718_idx',
+        ),
+        migrations.RemoveField(
+            model_name='alert',
+            name='location_name',
+        ),
+    ] + [
+        migrations.RemoveField(
+            model_name=model_name,
+            name='location_name',
+        )
+        for model_name in REQUIRED
+    ] + [
+        migrations.AlterField(
+            model_name=model_name,
+            name='location',
+            field=location_field(db_index=False),
+        )
+        for model_name in REQUIRED
+    ] + [
+        migrations.AlterModelOptions(
+            name='currentmeasurement',
+            options={'ordering': ['location']},
+        ),
+        migrations.AddIndex(
+            model_name='measurement',
+            index=models.Index(fields=['location', 'timestamp'], name='measurement_locatio_57c418_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prediction',
+            index=models.Index(fields=['location', 'target_timestamp'], name='predictions_locatio_3171bd_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='currentmeasurement',
+            constraint=models.UniqueConstraint(fields=('location', 'source'), name='current_measurements_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailymeasurement',
+            constraint=models.UniqueConstraint(fields=('location', 'bucket'), name='measurements_daily_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='hourlymeasurement',
+            constraint=models.UniqueConstraint(fields=('location', 'bucket'), name='measurements_hourly_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='measurement',
+            constraint=models.UniqueConstraint(fields=('location', 'timestamp', 'source'), name='measurements_natural_key'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:34
+
+from django.db import migrations, models
+
+# Previous (max_digits, decimal_places) of every column that becomes a float
+READING_COLUMNS = {
+    'latitude': (10, 8), 'longitude': (11, 8),
+    'temperature': (5, 2), 'humidity': (5, 2), 'pressure': (7, 2),
+    'pm25': (6, 2), 'pm10': (6, 2), 'no2': (6, 2), 'so2': (6, 2), 'co': (6, 2), 'o3': (6, 2),
+}
+COLUMNS = {
+    'measurements': READING_COLUMNS,
+    'current_measurements': READING_COLUMNS,
+    'predictions': {'predicted_pm25': (6, 2), 'confidence_score': (3, 2)},
+}
+
+MODELS = {'measurements': 'measurement', 'current_measurements': 'currentmeasurement', 'predictions': 'prediction'}
+NULLABLE = {'temperature', 'humidity', 'pressure', 'pm25', 'pm10', 'no2', 'so2', 'co', 'o3', 'confidence_score'}
+
+
+def alter_columns(schema_editor, types):
+    """One ALTER TABLE per table, so each table is rewritten once rather than once per column"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table, columns in COLUMNS.items():
+            cursor.execute(f"ALTER TABLE {table} " + ', '.join(
+                f"ALTER COLUMN {column} TYPE {types(column, digits, places)}"
+                for column, (digits, places) in columns.items()
+            ))
+
+
+def to_float(apps, schema_editor):
+    alter_columns(schema_editor, lambda column, digits, places: 'double precision')
+
+
+def to_decimal(apps, schema_editor):
+    alter_columns(
+        schema_editor,
+        lambda column, digits, places: f"numeric({digits}, {places}) USING round({column}::numeric, {places})"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_location_foreign_keys'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(to_float, to_decimal),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name=MODELS[table],
+                    name=column,
+                    field=models.FloatField(blank=True, null=True) if column in NULLABLE else models.FloatField(),
+                )
+                for table, columns in COLUMNS.items()
+                for column in columns
+            ],
+        ),
+    ]
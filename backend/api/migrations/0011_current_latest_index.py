@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_float_readings'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='currentmeasurement',
+            index=models.Index(fields=['location', '-timestamp'], name='current_location_latest_idx'),
+        ),
+    ]
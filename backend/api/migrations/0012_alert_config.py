@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def link_alert_configs(apps, schema_editor):
+    """Point existing alerts at the rule that raised them; active alerts no rule matches are closed
+
+    Alerts only recorded their parameter (alert_type), severity and threshold,
+    so each is matched on as many of those as a rule shares, enabled rules first.
+    """
+    Alert = apps.get_model('api', 'Alert')
+    AlertConfig = apps.get_model('api', 'AlertConfig')
+    configs = list(AlertConfig.objects.order_by('-is_enabled', 'id'))
+    for fields in (('severity', 'threshold_value'), ('severity',), ()):
+        for config in configs:
+            Alert.objects.filter(
+                config__isnull=True, alert_type=config.parameter,
+                **{field: getattr(config, field) for field in fields}
+            ).update(config=config)
+    # The alert engine resolves by rule, so these could never close
+    Alert.objects.filter(config__isnull=True, is_active=True).update(is_active=False, resolved_at=timezone.now())
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_current_latest_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='config',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='alerts', to='api.alertconfig'),
+        ),
+        migrations.RunPython(link_alert_configs, migrations.RunPython.noop),
+    ]
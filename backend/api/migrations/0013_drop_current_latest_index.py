@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:19
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_alert_config'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='currentmeasurement',
+            name='current_location_latest_idx',
+        ),
+    ]
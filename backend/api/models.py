@@ -14,49 +14,167 @@ class User(AbstractUser):
     class Meta:
         db_table = 'users'
 
-class Measurement(models.Model):
-    location_name = models.CharField(max_length=255)
-    latitude = models.DecimalField(max_digits=10, decimal_places=8)
-    longitude = models.DecimalField(max_digits=11, decimal_places=8)
+class Reading(models.Model):
+    """Observed conditions at a location, as stored by the pipeline"""
+    location = models.ForeignKey('Location', on_delete=models.PROTECT, db_index=False)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
     timestamp = models.DateTimeField()
-    temperature = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
-    humidity = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
-    pressure = models.DecimalField(max_digits=7, decimal_places=2, null=True, blank=True)
-    pm25 = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
-    pm10 = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
-    no2 = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
-    so2 = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
-    co = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
-    o3 = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    temperature = models.FloatField(null=True, blank=True)
+    humidity = models.FloatField(null=True, blank=True)
+    pressure = models.FloatField(null=True, blank=True)
+    pm25 = models.FloatField(null=True, blank=True)
+    pm10 = models.FloatField(null=True, blank=True)
+    no2 = models.FloatField(null=True, blank=True)
+    so2 = models.FloatField(null=True, blank=True)
+    co = models.FloatField(null=True, blank=True)
+    o3 = models.FloatField(null=True, blank=True)
     aqi = models.IntegerField(null=True, blank=True)
+    dominant_pollutant = models.CharField(max_length=10, null=True, blank=True)
     traffic_level = models.IntegerField(
         validators=[MinValueValidator(0), MaxValueValidator(10)],
         null=True, blank=True
     )
     source = models.CharField(max_length=50)
+
+    class Meta:
+        abstract = True
+
+class Measurement(Reading):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
+        # On PostgreSQL the table is range-partitioned by month on timestamp and
+        # its primary key is (id, timestamp); see migration 0006
         db_table = 'measurements'
         indexes = [
-            models.Index(fields=['location_name', 'timestamp']),
+            models.Index(fields=['location', 'timestamp']),
             models.Index(fields=['timestamp']),
         ]
+        constraints = [
+            # One row per provider observation; the pipeline upserts on this key
+            models.UniqueConstraint(
+                fields=['location', 'timestamp', 'source'],
+                name='measurements_natural_key'
+            ),
+        ]
         ordering = ['-timestamp']
 
+class CurrentMeasurement(Reading):
+    """Latest reading per location and source.
+
+    The pipeline upserts it in the same transaction as each load, so current
+    conditions are read without touching the measurements history.
+    """
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'current_measurements'
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'source'], name='current_measurements_key'),
+        ]
+        ordering = ['location']
+
+# Measurement fields summarised by the rollup tables
+ROLLUP_FIELDS = [
+    'temperature', 'humidity', 'pressure', 'pm25', 'pm10',
+    'no2', 'so2', 'co', 'o3', 'aqi', 'traffic_level'
+]
+
+class MeasurementRollup(models.Model):
+    """Per-location aggregates of measurements over one time bucket.
+
+    The pipeline recomputes the buckets each load touched, so the rollups
+    stay exact when observations are corrected. Every field gets
+    avg_/min_/max_/count_ columns; count_ is the number of non-null
+    readings, which weights averages when buckets are combined.
+    """
+    location = models.ForeignKey('Location', on_delete=models.PROTECT, db_index=False)
+    bucket = models.DateTimeField()
+    sample_count = models.IntegerField()
+    avg_temperature = models.FloatField(null=True, blank=True)
+    min_temperature = models.FloatField(null=True, blank=True)
+    max_temperature = models.FloatField(null=True, blank=True)
+    count_temperature = models.IntegerField(default=0)
+    avg_humidity = models.FloatField(null=True, blank=True)
+    min_humidity = models.FloatField(null=True, blank=True)
+    max_humidity = models.FloatField(null=True, blank=True)
+    count_humidity = models.IntegerField(default=0)
+    avg_pressure = models.FloatField(null=True, blank=True)
+    min_pressure = models.FloatField(null=True, blank=True)
+    max_pressure = models.FloatField(null=True, blank=True)
+    count_pressure = models.IntegerField(default=0)
+    avg_pm25 = models.FloatField(null=True, blank=True)
+    min_pm25 = models.FloatField(null=True, blank=True)
+    max_pm25 = models.FloatField(null=True, blank=True)
+    count_pm25 = models.IntegerField(default=0)
+    avg_pm10 = models.FloatField(null=True, blank=True)
+    min_pm10 = models.FloatField(null=True, blank=True)
+    max_pm10 = models.FloatField(null=True, blank=True)
+    count_pm10 = models.IntegerField(default=0)
+    avg_no2 = models.FloatField(null=True, blank=True)
+    min_no2 = models.FloatField(null=True, blank=True)
+    max_no2 = models.FloatField(null=True, blank=True)
+    count_no2 = models.IntegerField(default=0)
+    avg_so2 = models.FloatField(null=True, blank=True)
+    min_so2 = models.FloatField(null=True, blank=True)
+    max_so2 = models.FloatField(null=True, blank=True)
+    count_so2 = models.IntegerField(default=0)
+    avg_co = models.FloatField(null=True, blank=True)
+    min_co = models.FloatField(null=True, blank=True)
+    max_co = models.FloatField(null=True, blank=True)
+    count_co = models.IntegerField(default=0)
+    avg_o3 = models.FloatField(null=True, blank=True)
+    min_o3 = models.FloatField(null=True, blank=True)
+    max_o3 = models.FloatField(null=True, blank=True)
+    count_o3 = models.IntegerField(default=0)
+    avg_aqi = models.FloatField(null=True, blank=True)
+    min_aqi = models.FloatField(null=True, blank=True)
+    max_aqi = models.FloatField(null=True, blank=True)
+    count_aqi = models.IntegerField(default=0)
+    avg_traffic_level = models.FloatField(null=True, blank=True)
+    min_traffic_level = models.FloatField(null=True, blank=True)
+    max_traffic_level = models.FloatField(null=True, blank=True)
+    count_traffic_level = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+        ordering = ['-bucket']
+
+class HourlyMeasurement(MeasurementRollup):
+    class Meta(MeasurementRollup.Meta):
+        db_table = 'measurements_hourly'
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'bucket'], name='measurements_hourly_key'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket']),
+        ]
+
+class DailyMeasurement(MeasurementRollup):
+    class Meta(MeasurementRollup.Meta):
+        db_table = 'measurements_daily'
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'bucket'], name='measurements_daily_key'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket']),
+        ]
+
 class Prediction(models.Model):
-    location_name = models.CharField(max_length=255)
+    location = models.ForeignKey('Location', on_delete=models.PROTECT, db_index=False)
     prediction_timestamp = models.DateTimeField(auto_now_add=True)
     target_timestamp = models.DateTimeField()
-    predicted_pm25 = models.DecimalField(max_digits=6, decimal_places=2)
-    confidence_score = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True)
+    predicted_pm25 = models.FloatField()
+    confidence_score = models.FloatField(null=True, blank=True)
     model_name = models.CharField(max_length=50)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = 'predictions'
         indexes = [
-            models.Index(fields=['location_name', 'target_timestamp']),
+            models.Index(fields=['location', 'target_timestamp']),
         ]
 
 class Alert(models.Model):
@@ -69,7 +187,9 @@ class Alert(models.Model):
     
     alert_type = models.CharField(max_length=50)
     severity = models.CharField(max_length=20, choices=SEVERITY_CHOICES)
-    location_name = models.CharField(max_length=255, null=True, blank=True)
+    location = models.ForeignKey('Location', on_delete=models.PROTECT, null=True, blank=True)
+    # The rule that raised the alert; resolving matches on it
+    config = models.ForeignKey('AlertConfig', on_delete=models.SET_NULL, null=True, blank=True, related_name='alerts')
     message = models.TextField()
     threshold_value = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     actual_value = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
@@ -84,13 +204,58 @@ class Alert(models.Model):
         ]
 
 class AlertConfig(models.Model):
+    RULE_CHOICES = [
+        ('threshold', 'Threshold'),
+        ('duration', 'Sustained exceedance'),
+        ('rate_of_change', 'Rate of change'),
+    ]
+
     parameter = models.CharField(max_length=50)
     threshold_value = models.DecimalField(max_digits=10, decimal_places=2)
     severity = models.CharField(max_length=20)
+    rule_type = models.CharField(max_length=20, choices=RULE_CHOICES, default='threshold')
+    # Minutes the value must stay above the threshold (duration), or the
+    # lookback the change is measured over (rate_of_change, threshold per hour)
+    window_minutes = models.PositiveIntegerField(null=True, blank=True)
+    # Hysteresis: an open alert resolves only once the value falls to this level
+    clear_value = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     is_enabled = models.BooleanField(default=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        db_table = 'alert_configs'
\ No newline at end of file
+        db_table = 'alert_configs'
+
+class Location(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    latitude = models.DecimalField(max_digits=10, decimal_places=8)
+    longitude = models.DecimalField(max_digits=11, decimal_places=8)
+    openaq_location_id = models.CharField(max_length=50, null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'locations'
+        ordering = ['name']
+
+class PipelineWorker(models.Model):
+    """Live pipeline worker, kept alive by periodic heartbeats"""
+    worker_id = models.CharField(max_length=255, primary_key=True)
+    heartbeat_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'pipeline_workers'
+
+class PipelineShard(models.Model):
+    """Slice of the location catalog leased to one pipeline worker at a time"""
+    shard_id = models.IntegerField(primary_key=True)
+    owner = models.CharField(max_length=255, null=True, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'pipeline_shards'
+        indexes = [
+            models.Index(fields=['owner']),
+        ]
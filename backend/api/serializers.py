@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Measurement, Prediction, Alert, AlertConfig
+from .models import Measurement, Prediction, Alert, AlertConfig, Location
 
 User = get_user_model()
 
@@ -19,23 +19,41 @@ class UserSerializer(serializers.ModelSerializer):
         user.save()
         return user
 
+class LocationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Location
+        fields = '__all__'
+        read_only_fields = ('id', 'created_at', 'updated_at')
+
+class LocationNameField(serializers.SlugRelatedField):
+    """A location referenced by name, so clients keep using ``location_name``"""
+
+    def __init__(self, **kwargs):
+        super().__init__(source='location', slug_field='name', queryset=Location.objects.all(), **kwargs)
+
 class MeasurementSerializer(serializers.ModelSerializer):
+    location_name = LocationNameField()
+
     class Meta:
         model = Measurement
         fields = '__all__'
-        read_only_fields = ('id', 'created_at')
+        read_only_fields = ('id', 'location', 'created_at')
 
 class PredictionSerializer(serializers.ModelSerializer):
+    location_name = LocationNameField()
+
     class Meta:
         model = Prediction
         fields = '__all__'
-        read_only_fields = ('id', 'created_at', 'prediction_timestamp')
+        read_only_fields = ('id', 'location', 'created_at', 'prediction_timestamp')
 
 class AlertSerializer(serializers.ModelSerializer):
+    location_name = LocationNameField(required=False, allow_null=True)
+
     class Meta:
         model = Alert
         fields = '__all__'
-        read_only_fields = ('id', 'created_at')
+        read_only_fields = ('id', 'location', 'created_at')
 
 class AlertConfigSerializer(serializers.ModelSerializer):
     created_by_username = serializers.CharField(source='created_by.username', read_only=True)
@@ -0,0 +1,201 @@
+import json
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+from rest_framework.renderers import JSONRenderer
+from .models import CurrentMeasurement, DailyMeasurement, HourlyMeasurement, Location, Measurement
+from .serializers import MeasurementSerializer
+
+# A Wednesday afternoon; every range below is counted back from it
+NOW = datetime(2024, 5, 15, 14, 30, tzinfo=dt_timezone.utc)
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+@mock.patch('api.views.timezone.now', return_value=NOW)
+class HistoryBucketTests(TestCase):
+    """Which rollup buckets ``/api/measurements/history/`` reports"""
+
+    def setUp(self):
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.location = Location.objects.create(name='Paris Nord', latitude=48.8809, longitude=2.3553)
+
+    def add(self, model, bucket, pm25, count=1):
+        model.objects.create(
+            location=self.location, bucket=bucket, sample_count=count,
+            avg_pm25=pm25, min_pm25=pm25, max_pm25=pm25, count_pm25=count
+        )
+
+    def history(self, **params):
+        response = self.client.get('/api/measurements/history/', {'pollutants': 'pm25', **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_hourly_range_ends_with_the_current_hour(self, now):
+        self.add(HourlyMeasurement, utc(2024, 5, 14, 14), 10.0)
+        self.add(HourlyMeasurement, utc(2024, 5, 14, 15), 20.0)
+        self.add(HourlyMeasurement, utc(2024, 5, 15, 14), 30.0)
+
+        buckets = self.history(granularity='hour', days=1)
+        self.assertEqual(
+            [(row['bucket'], row['avg_pm25']) for row in buckets],
+            [(utc(2024, 5, 14, 15), 20.0), (utc(2024, 5, 15, 14), 30.0)]
+        )
+
+    def test_daily_range_starts_at_utc_midnight(self, now):
+        self.add(DailyMeasurement, utc(2024, 5, 13), 10.0)
+        self.add(DailyMeasurement, utc(2024, 5, 14), 20.0)
+        self.add(DailyMeasurement, utc(2024, 5, 15), 30.0)
+
+        buckets = self.history(granularity='day', days=2)
+        self.assertEqual([row['bucket'] for row in buckets], [utc(2024, 5, 14), utc(2024, 5, 15)])
+
+    def test_weekly_range_covers_whole_iso_weeks(self, now):
+        # Five days back from Wednesday lands on a Saturday, widened to the Monday before
+        self.add(DailyMeasurement, utc(2024, 5, 5), 99.0)
+        self.add(DailyMeasurement, utc(2024, 5, 6), 10.0, count=3)
+        self.add(DailyMeasurement, utc(2024, 5, 12), 30.0, count=1)
+        self.add(DailyMeasurement, utc(2024, 5, 13), 40.0)
+
+        buckets = self.history(granularity='week', days=5)
+        self.assertEqual([row['bucket'] for row in buckets], [utc(2024, 5, 6), utc(2024, 5, 13)])
+        # Days are weighted by their reading counts
+        self.assertEqual(buckets[0]['avg_pm25'], 15.0)
+        self.assertEqual((buckets[0]['min_pm25'], buckets[0]['max_pm25']), (10.0, 30.0))
+
+    def test_buckets_without_readings_are_skipped(self, now):
+        self.add(DailyMeasurement, utc(2024, 5, 15), None, count=0)
+        self.assertEqual(self.history(granularity='day', days=1), [])
+
+    def test_ranges_are_capped_per_granularity(self, now):
+        response = self.client.get('/api/measurements/history/', {'granularity': 'hour', 'days': 32})
+        self.assertEqual(response.status_code, 400)
+
+
+class MeasurementListTests(TestCase):
+    """``/api/measurements/`` skips the serializer but must render what it would"""
+
+    def setUp(self):
+        self.client = APIClient(SERVER_NAME='localhost')
+        location = Location.objects.create(name='Paris Nord', latitude=48.8809, longitude=2.3553)
+        for hour, pm25 in enumerate([12.25, None, 30.5]):
+            Measurement.objects.create(
+                location=location, latitude=48.8809, longitude=2.3553, timestamp=utc(2024, 5, 15, hour),
+                pm25=pm25, aqi=50, dominant_pollutant='pm25', source='openaq'
+            )
+
+    def instants(self, rows):
+        # Rows come straight from the driver in UTC, the serializer renders local time
+        return [
+            {key: datetime.fromisoformat(value) if key in ('timestamp', 'created_at') else value for key, value in row.items()}
+            for row in rows
+        ]
+
+    def test_rows_match_the_serializer(self):
+        response = self.client.get('/api/measurements/')
+        self.assertEqual(response.status_code, 200)
+        expected = json.loads(JSONRenderer().render(MeasurementSerializer(Measurement.objects.all(), many=True).data))
+        self.assertEqual(self.instants(response.json()['results']), self.instants(expected))
+        self.assertEqual([row['pm25'] for row in response.json()['results']], [30.5, None, 12.25])
+
+
+class LatestMeasurementTests(TestCase):
+    """How ``/api/measurements/latest/`` combines the current reading of each source"""
+
+    def setUp(self):
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.nord = Location.objects.create(name='Paris Nord', latitude=48.8809, longitude=2.3553)
+        self.est = Location.objects.create(name='Paris Est', latitude=48.8768, longitude=2.3592)
+
+    def add(self, location, source, timestamp, **values):
+        return CurrentMeasurement.objects.create(
+            location=location, latitude=location.latitude, longitude=location.longitude,
+            timestamp=timestamp, source=source, **values
+        )
+
+    def latest(self):
+        response = self.client.get('/api/measurements/latest/')
+        self.assertEqual(response.status_code, 200)
+        return {row['location_name']: row for row in response.data}
+
+    def test_values_from_several_sources_are_reported_as_combined(self):
+        self.add(self.nord, 'openweather', utc(2024, 5, 15, 14, 0), temperature=18.5, humidity=60.0)
+        self.add(self.nord, 'openaq', utc(2024, 5, 15, 13, 0), pm25=12.0, aqi=50, dominant_pollutant='pm25')
+
+        row = self.latest()['Paris Nord']
+        self.assertEqual((row['id'], row['source'], row['timestamp']), (None, 'combined', utc(2024, 5, 15, 14, 0)))
+        self.assertEqual((row['temperature'], row['pm25'], row['aqi']), (18.5, 12.0, 50))
+        self.assertEqual(row['field_timestamps'], {
+            'temperature': utc(2024, 5, 15, 14, 0), 'humidity': utc(2024, 5, 15, 14, 0),
+            'pm25': utc(2024, 5, 15, 13, 0), 'aqi': utc(2024, 5, 15, 13, 0),
+            'dominant_pollutant': utc(2024, 5, 15, 13, 0),
+        })
+
+    def test_a_single_source_row_is_reported_as_stored(self):
+        current = self.add(self.est, 'openaq', utc(2024, 5, 15, 13, 0), pm25=12.0)
+        # An older source with nothing the newer one lacks adds nothing
+        self.add(self.est, 'openweather', utc(2024, 5, 15, 12, 0), pm25=30.0)
+
+        row = self.latest()['Paris Est']
+        self.assertEqual((row['id'], row['source'], row['pm25']), (current.id, 'openaq', 12.0))
+        self.assertEqual(row['field_timestamps'], {'pm25': utc(2024, 5, 15, 13, 0)})
+
+
+class AlertConfigMigrationTests(TransactionTestCase):
+    """How ``0012_alert_config`` links alerts raised before they recorded their rule"""
+
+    before = [('api', '0011_current_latest_index')]
+    after = [('api', '0012_alert_config')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        Location = apps.get_model('api', 'Location')
+        AlertConfig = apps.get_model('api', 'AlertConfig')
+        Alert = apps.get_model('api', 'Alert')
+
+        location = Location.objects.create(name='Paris Nord', latitude=48.8809, longitude=2.3553)
+        self.configs = {
+            name: AlertConfig.objects.create(parameter=parameter, threshold_value=threshold, severity=severity).id
+            for name, parameter, threshold, severity in [
+                ('pm25 high', 'pm25', 35, 'high'), ('pm25 critical', 'pm25', 75, 'critical'), ('no2', 'no2', 200, 'high')
+            ]
+        }
+        self.alerts = {
+            name: Alert.objects.create(
+                alert_type=alert_type, severity=severity, threshold_value=threshold,
+                location=location, message=name
+            ).id
+            for name, alert_type, severity, threshold in [
+                ('pm25 critical', 'pm25', 'critical', 75), ('pm25 edited', 'pm25', 'high', 40),
+                ('no2 renamed', 'no2', 'low', 150), ('o3', 'o3', 'high', 180),
+            ]
+        }
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        self.Alert = executor.loader.project_state(self.after).apps.get_model('api', 'Alert')
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def alert(self, name):
+        return self.Alert.objects.get(id=self.alerts[name])
+
+    def test_alerts_are_linked_to_the_closest_rule(self):
+        # Exact threshold and severity first, then severity, then parameter alone
+        self.assertEqual(self.alert('pm25 critical').config_id, self.configs['pm25 critical'])
+        self.assertEqual(self.alert('pm25 edited').config_id, self.configs['pm25 high'])
+        self.assertEqual(self.alert('no2 renamed').config_id, self.configs['no2'])
+        self.assertTrue(self.alert('no2 renamed').is_active)
+
+    def test_active_alerts_without_a_rule_are_closed(self):
+        alert = self.alert('o3')
+        self.assertIsNone(alert.config_id)
+        self.assertFalse(alert.is_active)
+        self.assertIsNotNone(alert.resolved_at)
@@ -3,7 +3,7 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     RegisterView, CustomTokenObtainPairView,
     MeasurementViewSet, PredictionViewSet,
-    AlertViewSet, AlertConfigViewSet
+    AlertViewSet, AlertConfigViewSet, LocationViewSet
 )
 
 router = DefaultRouter()
@@ -11,6 +11,7 @@ router.register('measurements', MeasurementViewSet)
 router.register('predictions', PredictionViewSet)
 router.register('alerts', AlertViewSet)
 router.register('alert-configs', AlertConfigViewSet)
+router.register('locations', LocationViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
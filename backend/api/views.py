@@ -3,14 +3,18 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import get_user_model
-from django.db.models import Avg, Max, Min
+from django.db.models import F, FloatField, Max, Min, Q, Sum
+from django.db.models.functions import TruncWeek
 from django.utils import timezone
-from datetime import timedelta
+from datetime import timedelta, timezone as dt_timezone
 import requests
-from .models import Measurement, Prediction, Alert, AlertConfig
+from .models import (
+    Measurement, CurrentMeasurement, HourlyMeasurement, DailyMeasurement,
+    Prediction, Alert, AlertConfig, Location, ROLLUP_FIELDS
+)
 from .serializers import (
-    UserSerializer, MeasurementSerializer, 
-    PredictionSerializer, AlertSerializer, AlertConfigSerializer
+    UserSerializer, MeasurementSerializer,
+    PredictionSerializer, AlertSerializer, AlertConfigSerializer, LocationSerializer
 )
 from .permissions import IsOwnerOrReadOnly, IsAdminOrReadOnly
 
@@ -35,71 +39,210 @@ class CustomTokenObtainPairView(TokenObtainPairView):
             response.data['user'] = UserSerializer(user).data
         return response
 
-class MeasurementViewSet(viewsets.ModelViewSet):
+def location_filter(value):
+    """Lookup for a location given by id or by name"""
+    return {'location_id': int(value)} if value.isdigit() else {'location__name': value}
+
+class LocationFilterMixin:
+    """Filters a location-keyed queryset by ``?location=<id or name>`` or ``?location_name=<name>``"""
+
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related('location')
+        location = self.request.query_params.get('location')
+        if location:
+            queryset = queryset.filter(**location_filter(location))
+        name = self.request.query_params.get('location_name')
+        if name:
+            queryset = queryset.filter(location__name=name)
+        return queryset
+
+def reading_rows(queryset):
+    """Readings as plain dicts with the serializer's fields.
+
+    Every column is a float, int, string or datetime straight from the
+    driver, so list endpoints skip building and running a serializer field
+    per value.
+    """
+    fields = [field.name for field in queryset.model._meta.concrete_fields]
+    return queryset.values(*fields, location_name=F('location__name'))
+
+def weighted_sum(field):
+    """Sum of a rollup average weighted by its reading count, to average across buckets"""
+    return Sum(F(f'avg_{field}') * F(f'count_{field}'), output_field=FloatField())
+
+# History granularities as (rollup model, bucket length, longest range in days)
+HISTORY_GRANULARITIES = {
+    'hour': (HourlyMeasurement, timedelta(hours=1), 31),
+    'day': (DailyMeasurement, timedelta(days=1), 366),
+    'week': (DailyMeasurement, timedelta(weeks=1), 5 * 366),
+}
+HISTORY_MAX_LOCATIONS = 20
+# Reading values the latest endpoint combines across sources
+LATEST_FIELDS = ROLLUP_FIELDS + ['dominant_pollutant']
+HISTORY_DEFAULT_FIELDS = ['pm25', 'temperature', 'humidity']
+
+class MeasurementViewSet(LocationFilterMixin, viewsets.ModelViewSet):
     queryset = Measurement.objects.all()
     serializer_class = MeasurementSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filterset_fields = ['location_name', 'source']
+    filterset_fields = ['location', 'source']
     ordering_fields = ['timestamp', 'pm25', 'aqi']
 
+    def list(self, request, *args, **kwargs):
+        rows = reading_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(list(rows))
+
     @action(detail=False, methods=['get'])
     def latest(self, request):
-        """Get the latest measurements for each location"""
-        locations = Measurement.objects.values_list('location_name', flat=True).distinct()
-        latest_measurements = []
+        """Get the latest conditions for each location in one query, read from current_measurements.
+
+        Sources report different fields, so each location's row takes every
+        value from the newest source that has it. ``field_timestamps`` gives
+        when each value was observed; a row combining several sources has
+        ``source='combined'`` and no id. Optional filters: ``?source=`` and
+        ``?bbox=min_lon,min_lat,max_lon,max_lat``.
+        """
+        queryset = CurrentMeasurement.objects.all()
+        
+        source = request.query_params.get('source')
+        if source:
+            queryset = queryset.filter(source=source)
         
-        for location in locations:
-            latest = Measurement.objects.filter(
-                location_name=location
-            ).order_by('-timestamp').first()
-            if latest:
-                latest_measurements.append(latest)
+        bbox = request.query_params.get('bbox')
+        if bbox:
+            try:
+                min_lon, min_lat, max_lon, max_lat = (float(value) for value in bbox.split(','))
+            except ValueError:
+                return Response(
+                    {'error': 'bbox must be min_lon,min_lat,max_lon,max_lat'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            queryset = queryset.filter(
+                longitude__range=(min_lon, max_lon),
+                latitude__range=(min_lat, max_lat)
+            )
         
-        serializer = self.get_serializer(latest_measurements, many=True)
-        return Response(serializer.data)
+        # One row per location and source, newest first within each location
+        latest_measurements = {}
+        for current in reading_rows(queryset.order_by('location_id', '-timestamp')):
+            merged = latest_measurements.get(current['location'])
+            if merged is None:
+                current['field_timestamps'] = {
+                    field: current['timestamp'] for field in LATEST_FIELDS if current[field] is not None
+                }
+                latest_measurements[current['location']] = current
+                continue
+            for field in LATEST_FIELDS:
+                if merged[field] is None and current[field] is not None:
+                    merged[field] = current[field]
+                    merged['field_timestamps'][field] = current['timestamp']
+                    merged['id'] = None
+                    merged['source'] = 'combined'
+        return Response(list(latest_measurements.values()))
 
     @action(detail=False, methods=['get'])
     def history(self, request):
-        """Get historical data with aggregations"""
-        location = request.query_params.get('location', None)
-        days = int(request.query_params.get('days', 7))
+        """Get aggregates per time bucket in one query over the rollups.
+
+        ``?granularity=hour|day|week`` (default day) over the last ``?days=``
+        (default 7, capped per granularity). ``?location=`` takes up to
+        HISTORY_MAX_LOCATIONS comma-separated ids or names and returns one
+        series per location; without it buckets cover every location.
+        ``?pollutants=`` picks the rollup fields reported (default pm25,
+        temperature, humidity).
+        """
+        granularity = request.query_params.get('granularity', 'day')
+        if granularity not in HISTORY_GRANULARITIES:
+            return Response(
+                {'error': f"granularity must be one of {', '.join(HISTORY_GRANULARITIES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        model, step, max_days = HISTORY_GRANULARITIES[granularity]
+        
+        try:
+            days = int(request.query_params.get('days', 7))
+        except ValueError:
+            days = 0
+        if not 1 <= days <= max_days:
+            return Response(
+                {'error': f'days must be between 1 and {max_days} for {granularity} granularity'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        start_date = timezone.now() - timedelta(days=days)
-        queryset = Measurement.objects.filter(timestamp__gte=start_date)
+        fields = request.query_params.get('pollutants')
+        fields = fields.split(',') if fields else HISTORY_DEFAULT_FIELDS
+        unknown = [field for field in fields if field not in ROLLUP_FIELDS]
+        if unknown:
+            return Response(
+                {'error': f"Unknown pollutants: {', '.join(unknown)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        if location:
-            queryset = queryset.filter(location_name=location)
+        locations = [value for value in request.query_params.get('location', '').split(',') if value]
+        if len(locations) > HISTORY_MAX_LOCATIONS:
+            return Response(
+                {'error': f'At most {HISTORY_MAX_LOCATIONS} locations per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # The last ``days`` UTC days (hours for hourly), the current bucket included
+        now = timezone.now().astimezone(dt_timezone.utc)
+        if granularity == 'hour':
+            start = now.replace(minute=0, second=0, microsecond=0) - timedelta(days=days) + step
+        else:
+            start = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+            if granularity == 'week':
+                # Whole ISO weeks, so the first bucket isn't a partial one
+                start -= timedelta(days=start.weekday())
+        queryset = model.objects.filter(bucket__gte=start)
+        
+        group_by = []
+        if locations:
+            lookup = Q()
+            for value in locations:
+                lookup |= Q(**location_filter(value))
+            queryset = queryset.filter(lookup)
+            group_by = ['location_id', 'location__name']
+        
+        if granularity == 'week':
+            queryset = queryset.annotate(period=TruncWeek('bucket', tzinfo=dt_timezone.utc))
+        else:
+            queryset = queryset.annotate(period=F('bucket'))
+        
+        # One row per bucket, per location when locations were given
+        aggregates = {}
+        for field in fields:
+            aggregates[f'{field}_total'] = weighted_sum(field)
+            aggregates[f'{field}_count'] = Sum(f'count_{field}')
+            aggregates[f'max_{field}'] = Max(f'max_{field}')
+            aggregates[f'min_{field}'] = Min(f'min_{field}')
+        rows = queryset.values(*group_by, 'period').annotate(**aggregates).order_by(*group_by, 'period')
         
-        # Aggregate by day
         aggregated_data = []
-        for i in range(days):
-            day_start = start_date + timedelta(days=i)
-            day_end = day_start + timedelta(days=1)
-            
-            day_data = queryset.filter(
-                timestamp__gte=day_start,
-                timestamp__lt=day_end
-            ).aggregate(
-                avg_pm25=Avg('pm25'),
-                max_pm25=Max('pm25'),
-                min_pm25=Min('pm25'),
-                avg_temp=Avg('temperature'),
-                avg_humidity=Avg('humidity')
-            )
-            
-            if day_data['avg_pm25']:
-                aggregated_data.append({
-                    'date': day_start.date(),
-                    **day_data
-                })
+        for row in rows:
+            if not any(row[f'{field}_count'] for field in fields):
+                continue
+            bucket = {'bucket': row['period']}
+            if locations:
+                bucket['location'] = row['location_id']
+                bucket['location_name'] = row['location__name']
+            for field in fields:
+                count = row[f'{field}_count']
+                bucket[f'avg_{field}'] = row[f'{field}_total'] / count if count else None
+                bucket[f'max_{field}'] = row[f'max_{field}']
+                bucket[f'min_{field}'] = row[f'min_{field}']
+            aggregated_data.append(bucket)
         
         return Response(aggregated_data)
 
-class PredictionViewSet(viewsets.ModelViewSet):
+class PredictionViewSet(LocationFilterMixin, viewsets.ModelViewSet):
     queryset = Prediction.objects.all()
     serializer_class = PredictionSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filterset_fields = ['location_name', 'model_name']
+    filterset_fields = ['location', 'model_name']
 
     @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
     def generate(self, request):
@@ -107,6 +250,13 @@ class PredictionViewSet(viewsets.ModelViewSet):
         location = request.data.get('location_name')
         hours_ahead = request.data.get('hours_ahead', 24)
         
+        location_obj = Location.objects.filter(name=location).first()
+        if location_obj is None:
+            return Response(
+                {'error': f'Unknown location: {location}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         # Call ML service - try Docker service name first, then localhost
         ml_service_urls = [
             'http://ml_service:5000/predict',  # Docker service name
@@ -132,7 +282,7 @@ class PredictionViewSet(viewsets.ModelViewSet):
             predictions = []
             for pred in prediction_data['predictions']:
                 prediction = Prediction.objects.create(
-                    location_name=location,
+                    location=location_obj,
                     target_timestamp=pred['timestamp'],
                     predicted_pm25=pred['pm25'],
                     confidence_score=pred['confidence'],
@@ -148,11 +298,11 @@ class PredictionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_503_SERVICE_UNAVAILABLE
             )
 
-class AlertViewSet(viewsets.ModelViewSet):
+class AlertViewSet(LocationFilterMixin, viewsets.ModelViewSet):
     queryset = Alert.objects.all()
     serializer_class = AlertSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filterset_fields = ['severity', 'is_active', 'alert_type']
+    filterset_fields = ['severity', 'is_active', 'alert_type', 'location']
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -177,3 +327,9 @@ class AlertConfigViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
+
+class LocationViewSet(viewsets.ModelViewSet):
+    """Registered monitoring locations; admins add new sensors here"""
+    queryset = Location.objects.all()
+    serializer_class = LocationSerializer
+    permission_classes = [IsAdminOrReadOnly]
@@ -3,7 +3,7 @@
 echo "🌱 Generating sample data..."
 
 docker-compose exec backend python manage.py shell << 'EOF'
-from api.models import Measurement, AlertConfig
+from api.models import Measurement, CurrentMeasurement, Location, AlertConfig
 from django.contrib.auth import get_user_model
 from datetime import datetime, timedelta
 import random
@@ -31,6 +31,10 @@ base_time = datetime.now()
 count = 0
 
 for location in locations:
+    location_obj, _ = Location.objects.get_or_create(
+        name=location["name"],
+        defaults={"latitude": location["lat"], "longitude": location["lon"]}
+    )
     for i in range(72):  # 3 days of hourly data
         timestamp = base_time - timedelta(hours=i)
         
@@ -42,8 +46,7 @@ for location in locations:
         elif 22 <= hour or hour <= 6:  # Night
             traffic_base = 2
         
-        Measurement.objects.create(
-            location_name=location["name"],
+        reading = dict(
             latitude=location["lat"],
             longitude=location["lon"],
             timestamp=timestamp,
@@ -54,12 +57,18 @@ for location in locations:
             pm10=30 + 40 * random.random() + (traffic_base * 3),
             no2=15 + 25 * random.random(),
             so2=5 + 15 * random.random(),
-            co=0.3 + 0.7 * random.random(),
+            co=300 + 700 * random.random(),  # µg/m³, like every reading
             o3=30 + 40 * random.random(),
             aqi=int(50 + 50 * random.random() + (traffic_base * 5)),
             traffic_level=traffic_base + random.randint(-2, 2),
             source='sample_data'
         )
+        Measurement.objects.create(location=location_obj, **reading)
+        if i == 0:
+            # The dashboard reads current conditions from current_measurements
+            CurrentMeasurement.objects.update_or_create(
+                location=location_obj, source='sample_data', defaults=reading
+            )
         count += 1
 
 print(f"✓ Created {count} sample measurements")
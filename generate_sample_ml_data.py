@@ -14,7 +14,8 @@ import os
 sys.path.append('./backend')
 os.environ.setdefault('DJANGO_SECRET_KEY', 'sample-data-generation-key')
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects.postgresql import insert
 from decouple import config
 
 # Database connection - use localhost when running outside Docker
@@ -111,6 +112,47 @@ def generate_sample_measurements(days=30, locations=None):
     
     return measurements
 
+# Fields summarised by the measurements_hourly and measurements_daily rollups
+ROLLUP_FIELDS = [
+    'temperature', 'humidity', 'pressure', 'pm25', 'pm10',
+    'no2', 'so2', 'co', 'o3', 'aqi', 'traffic_level'
+]
+
+def location_ids(conn, df):
+    """Register the sample locations and return their ids by name"""
+    for name, row in df.groupby('location_name').first().iterrows():
+        conn.execute(
+            text("""
+                INSERT INTO locations (name, latitude, longitude, is_active, created_at, updated_at)
+                VALUES (:name, :lat, :lon, true, now(), now())
+                ON CONFLICT (name) DO NOTHING
+            """),
+            {'name': name, 'lat': row['latitude'], 'lon': row['longitude']}
+        )
+    rows = conn.execute(
+        text("SELECT name, id FROM locations WHERE name = ANY(:names)"),
+        {'names': list(df['location_name'].unique())}
+    )
+    return dict(rows.fetchall())
+
+def rollup(df, freq):
+    """Per-location aggregates of ``df`` over ``freq`` buckets, shaped like the rollup tables"""
+    grouped = df.groupby(['location_id', df['timestamp'].dt.floor(freq).rename('bucket')])
+    rollups = grouped.size().rename('sample_count').to_frame()
+    for field in ROLLUP_FIELDS:
+        if field in df:
+            stats = grouped[field].agg(['mean', 'min', 'max', 'count'])
+            stats.columns = [f'avg_{field}', f'min_{field}', f'max_{field}', f'count_{field}']
+            rollups = rollups.join(stats)
+        else:
+            rollups[f'count_{field}'] = 0
+    return rollups.reset_index().assign(updated_at=datetime.now())
+
+def insert_missing(table, conn, keys, data_iter):
+    """to_sql method skipping rollup buckets a previous run already wrote"""
+    rows = [dict(zip(keys, row)) for row in data_iter]
+    conn.execute(insert(table.table).values(rows).on_conflict_do_nothing())
+
 def insert_sample_data(measurements):
     """Insert sample data into database"""
     try:
@@ -118,7 +160,13 @@ def insert_sample_data(measurements):
         df = pd.DataFrame(measurements)
         
         print(f"Inserting {len(measurements)} measurements into database...")
-        df.to_sql('measurements', engine, if_exists='append', index=False, method='multi')
+        with engine.begin() as conn:
+            ids = location_ids(conn, df)
+            rows = df.assign(location_id=df['location_name'].map(ids)).drop(columns='location_name')
+            rows.to_sql('measurements', conn, if_exists='append', index=False, method='multi')
+            # Training reads the hourly rollup, which the pipeline normally maintains
+            rollup(rows, 'h').to_sql('measurements_hourly', conn, if_exists='append', index=False, method=insert_missing)
+            rollup(rows, 'D').to_sql('measurements_daily', conn, if_exists='append', index=False, method=insert_missing)
         print("✓ Sample data inserted successfully")
         
         # Print statistics
@@ -7,6 +7,9 @@ DATABASE_URL = config('DATABASE_URL', default='postgresql://postgres:changeme@db
 # Model configuration
 MODEL_PATH = config('MODEL_PATH', default='/app/models')
 
+# Parquet archive written by the pipeline; training reads archived months from here
+ARCHIVE_DIR = config('ARCHIVE_DIR', default='/app/archive')
+
 # Feature columns for prediction
 FEATURE_COLUMNS = [
     'temperature', 'humidity', 'pressure', 'pm10', 'no2', 'so2', 'co', 'o3',
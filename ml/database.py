@@ -1,90 +1,137 @@
+import json
+import os
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
 from sqlalchemy import create_engine, text
-from config import DATABASE_URL
+from config import DATABASE_URL, ARCHIVE_DIR
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Hourly rollup averages under the raw measurement column names, one row per
+# location and hour, which is the spacing the lag and rolling features assume
+HOURLY_FEATURES = """
+    l.name AS location_name, h.bucket AS timestamp,
+    avg_temperature AS temperature, avg_humidity AS humidity, avg_pressure AS pressure,
+    avg_pm25 AS pm25, avg_pm10 AS pm10, avg_no2 AS no2, avg_so2 AS so2, avg_co AS co, avg_o3 AS o3,
+    avg_aqi AS aqi, avg_traffic_level AS traffic_level
+"""
+# Every feature is read as float64, including columns a location never reported,
+# which would otherwise come back as all-None object columns
+FEATURE_DTYPES = {
+    column: 'float64'
+    for column in ['temperature', 'humidity', 'pressure', 'pm25', 'pm10', 'no2', 'so2', 'co', 'o3', 'aqi', 'traffic_level']
+}
+
 class DatabaseConnection:
     def __init__(self):
         self.engine = create_engine(DATABASE_URL)
     
     def get_training_data(self, location=None, days=90):
-        """Fetch historical data for training"""
-        base_query = """
-            SELECT 
-                location_name, timestamp, temperature, humidity, pressure,
-                pm25, pm10, no2, so2, co, o3, traffic_level
-            FROM measurements
-            WHERE timestamp >= NOW() - INTERVAL %(days)s
+        """Fetch historical data for training.
+
+        Months the pipeline has archived to Parquet are read from disk and
+        averaged per hour, the way the hourly rollup would; only the hours
+        not archived yet come from the database.
         """
-        
-        params = {'days': f'{days} days'}
-        
-        if location and location != 'all':
-            base_query += " AND location_name = %(location)s"
-            params['location'] = location
-        
-        query = base_query + " ORDER BY location_name, timestamp"
+        start = (pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=days)).ceil('h')
+        if location == 'all':
+            location = None
         
         try:
-            # Use direct string substitution for PostgreSQL
-            if location and location != 'all':
-                final_query = f"""
-                    SELECT 
-                        location_name, timestamp, temperature, humidity, pressure,
-                        pm25, pm10, no2, so2, co, o3, traffic_level
-                    FROM measurements
-                    WHERE timestamp >= NOW() - INTERVAL '{days} days'
-                    AND location_name = '{location}'
-                    ORDER BY location_name, timestamp
-                """
-            else:
-                final_query = f"""
-                    SELECT 
-                        location_name, timestamp, temperature, humidity, pressure,
-                        pm25, pm10, no2, so2, co, o3, traffic_level
-                    FROM measurements
-                    WHERE timestamp >= NOW() - INTERVAL '{days} days'
-                    ORDER BY location_name, timestamp
-                """
+            archived, months = self.read_archive(start, location)
+            
+            final_query = f"""
+                SELECT {HOURLY_FEATURES}
+                FROM measurements_hourly h JOIN locations l ON l.id = h.location_id
+                WHERE h.bucket >= :start
+            """
+            params = {'start': start.to_pydatetime()}
+            if months:
+                final_query += " AND NOT to_char(h.bucket AT TIME ZONE 'UTC', 'YYYY-MM') = ANY(:months)"
+                params['months'] = months
+            if location:
+                final_query += " AND l.name = :location"
+                params['location'] = location
             
-            df = pd.read_sql(final_query, self.engine)
-            logger.info(f"Fetched {len(df)} records for training")
+            recent = pd.read_sql(text(final_query), self.engine, params=params, dtype=FEATURE_DTYPES)
+            df = pd.concat([archived, recent], ignore_index=True) if not archived.empty else recent
+            df = df.sort_values(['location_name', 'timestamp'], ignore_index=True)
+            logger.info(f"Fetched {len(df)} records for training ({len(archived)} from the archive)")
             return df
         except Exception as e:
             logger.error(f"Error fetching training data: {str(e)}")
             return pd.DataFrame()
     
+    def archived_months(self):
+        """Months the pipeline has fully written to the Parquet archive"""
+        manifest_path = os.path.join(ARCHIVE_DIR, 'measurements', '_manifest.json')
+        if not ARCHIVE_DIR or not os.path.exists(manifest_path):
+            return []
+        with open(manifest_path) as f:
+            return sorted(json.load(f)['months'])
+    
+    def read_archive(self, start, location=None):
+        """Hourly features from archived months since ``start``, and the months read"""
+        months = [
+            month for month in self.archived_months()
+            if pd.Timestamp(f"{month}-01", tz='UTC') + pd.offsets.MonthBegin(1) > start
+        ]
+        if not months:
+            return pd.DataFrame(), []
+        
+        # Month and location prune whole directories and row groups before anything is read
+        dataset = ds.dataset(os.path.join(ARCHIVE_DIR, 'measurements'), format='parquet', partitioning='hive')
+        predicate = ds.field('month').isin(months) & (
+            ds.field('timestamp') >= pa.scalar(start.to_pydatetime(), type=pa.timestamp('us', tz='UTC'))
+        )
+        if location:
+            # Filtering on the location_id partition skips other locations' files unopened
+            location_id = pd.read_sql(
+                text("SELECT id FROM locations WHERE name = :location"), self.engine, params={'location': location}
+            )['id']
+            if location_id.empty:
+                return pd.DataFrame(), months
+            predicate &= ds.field('location_id') == int(location_id.iloc[0])
+        table = dataset.to_table(columns=['location_name', 'timestamp', *FEATURE_DTYPES], filter=predicate)
+        
+        readings = table.to_pandas().astype(FEATURE_DTYPES)
+        readings['timestamp'] = readings['timestamp'].dt.floor('h')
+        hourly = readings.groupby(['location_name', 'timestamp'], as_index=False).mean()
+        return hourly, months
+    
     def get_latest_features(self, location, hours=24):
         """Get latest features for prediction"""
-        query = """
-            SELECT * FROM measurements
-            WHERE location_name = %(location)s
-            AND timestamp >= NOW() - INTERVAL %(hours)s
-            ORDER BY timestamp DESC
+        query = f"""
+            SELECT {HOURLY_FEATURES} FROM measurements_hourly h JOIN locations l ON l.id = h.location_id
+            WHERE l.name = %(location)s
+            AND h.bucket >= NOW() - INTERVAL %(hours)s
+            ORDER BY h.bucket DESC
             LIMIT %(limit)s
         """
         
         try:
             # Use direct string substitution
             final_query = f"""
-                SELECT * FROM measurements
-                WHERE location_name = '{location}'
-                AND timestamp >= NOW() - INTERVAL '{hours} hours'
-                ORDER BY timestamp DESC
+                SELECT {HOURLY_FEATURES} FROM measurements_hourly h JOIN locations l ON l.id = h.location_id
+                WHERE l.name = '{location}'
+                AND h.bucket >= NOW() - INTERVAL '{hours} hours'
+                ORDER BY h.bucket DESC
                 LIMIT {hours}
             """
             
-            df = pd.read_sql(final_query, self.engine)
+            df = pd.read_sql(final_query, self.engine, dtype=FEATURE_DTYPES)
             return df.sort_values('timestamp')  # Sort ascending for feature engineering
         except Exception as e:
             logger.error(f"Error fetching latest features: {str(e)}")
             return pd.DataFrame()
     
     def save_predictions(self, predictions):
-        """Save predictions to database"""
+        """Save predictions to database, mapping location names to location ids"""
         try:
+            locations = pd.read_sql("SELECT id AS location_id, name AS location_name FROM locations", self.engine)
+            predictions = predictions.merge(locations, on='location_name').drop(columns='location_name')
             predictions.to_sql(
                 'predictions',
                 self.engine,
@@ -0,0 +1,304 @@
+import logging
+import os
+import pickle
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from config import ALERT_RING_SIZE, ALERT_STATE_PATH, SOURCE_INTERVALS
+
+logger = logging.getLogger(__name__)
+
+class RingBuffer:
+    """Last ``capacity`` (time, value) readings per location for one parameter.
+
+    Readings live in two (locations x capacity) arrays so lookups for a
+    whole batch are single numpy operations. Times are epoch seconds.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.rows = {}
+        self.times = np.full((0, capacity), np.nan)
+        self.values = np.full((0, capacity), np.nan)
+        self.cursor = np.zeros(0, dtype=int)
+        self.latest = np.zeros(0)
+
+    def row_ids(self, locations):
+        """Row index of each location, adding rows for new ones"""
+        new = [location for location in dict.fromkeys(locations) if location not in self.rows]
+        if new:
+            for location in new:
+                self.rows[location] = len(self.rows)
+            grow = np.full((len(new), self.capacity), np.nan)
+            self.times = np.vstack([self.times, grow])
+            self.values = np.vstack([self.values, grow.copy()])
+            self.cursor = np.concatenate([self.cursor, np.zeros(len(new), dtype=int)])
+            self.latest = np.concatenate([self.latest, np.full(len(new), -np.inf)])
+        return np.array([self.rows[location] for location in locations], dtype=int)
+
+    def value_at(self, rows, cutoffs):
+        """Latest reading at or before each cutoff as ``(values, times)``, NaN where none"""
+        times = self.times[rows]
+        eligible = times <= cutoffs[:, None]
+        best = np.where(eligible, times, -np.inf).argmax(axis=1)
+        found = eligible.any(axis=1)
+        picked = np.arange(len(rows))
+        return (
+            np.where(found, self.values[rows][picked, best], np.nan),
+            np.where(found, times[picked, best], np.nan)
+        )
+
+    def resize(self, capacity):
+        """Grow every row to ``capacity`` slots, keeping readings oldest first"""
+        if capacity <= self.capacity:
+            return
+        order = (self.cursor[:, None] + np.arange(self.capacity)[None, :]) % self.capacity
+        picked = np.arange(len(self.cursor))[:, None]
+        grow = np.full((len(self.cursor), capacity - self.capacity), np.nan)
+        self.times = np.hstack([self.times[picked, order], grow])
+        self.values = np.hstack([self.values[picked, order], grow.copy()])
+        self.cursor = np.full(len(self.cursor), self.capacity, dtype=int)
+        self.capacity = capacity
+
+    def push(self, rows, times, values):
+        """Record readings; each location must appear at most once per call"""
+        slots = self.cursor[rows] % self.capacity
+        self.times[rows, slots] = times
+        self.values[rows, slots] = values
+        self.cursor[rows] += 1
+        self.latest[rows] = np.maximum(self.latest[rows], times)
+
+class AlertEngine:
+    """Evaluates alert_configs incrementally against newly loaded measurements.
+
+    Only the rows of each new batch are examined. Per-location state is a
+    ring buffer of recent readings per parameter (for rate-of-change rules)
+    and, per (location, config), when the value started exceeding the
+    threshold and whether an alert is open. Rules:
+
+    - ``threshold``: fires on the first reading above the threshold
+    - ``duration``: fires once readings stayed above it for ``window_minutes``
+    - ``rate_of_change``: fires when the rise over ``window_minutes`` exceeds
+      the threshold, in units per hour
+
+    An open alert resolves once the value falls to ``clear_value`` (the
+    threshold by default) and doesn't fire again until then. An alert only
+    counts as open once its row is written, so a failed insert fires again
+    on the next reading. Rings hold at least ``ring_size`` readings and grow
+    to cover the longest rate-of-change window. State is pickled to
+    ``state_path`` after every batch and reloaded on start.
+    """
+
+    def __init__(self, db, state_path=ALERT_STATE_PATH, ring_size=ALERT_RING_SIZE):
+        self.db = db
+        self.state_path = state_path
+        self.ring_size = ring_size
+        self.rings = {}
+        # (location_name, config_id) -> [exceeding_since, is_open]
+        self.states = {}
+        if not self._restore():
+            self._bootstrap_open_alerts()
+
+    def load_configs(self):
+        with self.db.engine.connect() as conn:
+            result = conn.execute(text("""
+                SELECT id, parameter, threshold_value, severity, rule_type, window_minutes, clear_value
+                FROM alert_configs
+                WHERE is_enabled = true
+            """))
+            configs = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+        configs['rule_type'] = configs['rule_type'].fillna('threshold')
+        configs['threshold_value'] = configs['threshold_value'].astype(float)
+        configs['clear_value'] = configs['clear_value'].astype(float).fillna(configs['threshold_value'])
+        configs['window_seconds'] = configs['window_minutes'].astype(float).fillna(0) * 60
+        return configs
+
+    def evaluate(self, frame):
+        """Run every enabled rule over a batch of new measurements; returns (opened, resolved) counts"""
+        if frame.empty:
+            return 0, 0
+        configs = self.load_configs()
+        capacity = self._ring_capacity(configs)
+        opened, resolved, pending = [], [], set()
+
+        for parameter, rules in configs.groupby('parameter'):
+            if parameter not in frame.columns:
+                continue
+            batch = frame.loc[frame[parameter].notna(), ['location_name', 'timestamp', parameter]]
+            batch = batch.sort_values('timestamp').drop_duplicates(['location_name', 'timestamp'], keep='last')
+            if batch.empty:
+                continue
+            ring = self.rings.setdefault(parameter, RingBuffer(capacity))
+            if ring.capacity < capacity:
+                logger.info(f"Growing the {parameter} alert ring to {capacity} readings per location")
+                ring.resize(capacity)
+
+            # One reading per location per pass keeps ring pushes and state updates ordered
+            for _, wave in batch.groupby(batch.groupby('location_name').cumcount()):
+                rows = ring.row_ids(wave['location_name'].tolist())
+                times = wave['timestamp'].to_numpy().astype('datetime64[ns]').astype('int64') / 1e9
+                values = pd.to_numeric(wave[parameter]).to_numpy(dtype=float)
+
+                # Replayed batches carry readings this engine has already seen
+                fresh = times > ring.latest[rows]
+                if not fresh.any():
+                    continue
+                rows, times, values = rows[fresh], times[fresh], values[fresh]
+                locations = wave['location_name'].to_numpy()[fresh]
+
+                metrics = self._metrics(ring, rules, rows, times, values)
+                ring.push(rows, times, values)
+                self._transition(locations, times, metrics, rules, opened, resolved, pending)
+
+        self._record(opened, resolved, pending)
+        self._snapshot()
+        return len(opened), len(resolved)
+
+    def _ring_capacity(self, configs):
+        """Readings per location a ring needs to reach back over the longest rate-of-change window"""
+        windows = configs.loc[configs['rule_type'] == 'rate_of_change', 'window_seconds']
+        if windows.empty:
+            return self.ring_size
+        # Every source reporting a parameter adds its own readings to the ring
+        per_second = sum(1 / (interval * 60) for interval in SOURCE_INTERVALS.values())
+        return max(self.ring_size, int(np.ceil(windows.max() * per_second)) + 2)
+
+    def _metrics(self, ring, rules, rows, times, values):
+        """(readings x rules) matrix of the value each rule compares against its threshold"""
+        metrics = np.repeat(values[:, None], len(rules), axis=1)
+        for column, window in enumerate(rules['window_seconds'].to_numpy()):
+            if rules['rule_type'].iloc[column] != 'rate_of_change':
+                continue
+            before, before_times = ring.value_at(rows, times - window)
+            elapsed = times - before_times
+            with np.errstate(invalid='ignore', divide='ignore'):
+                metrics[:, column] = np.where(elapsed > 0, (values - before) / elapsed * 3600, np.nan)
+        return metrics
+
+    def _transition(self, locations, times, metrics, rules, opened, resolved, pending):
+        """Advance the per-(location, config) state machine for one wave of readings.
+
+        Alerts to open are only noted in ``pending``; ``_record`` marks them
+        open once their rows are written.
+        """
+        above = metrics > rules['threshold_value'].to_numpy()[None, :]
+        cleared = metrics <= rules['clear_value'].to_numpy()[None, :]
+
+        # Only readings that change something leave numpy
+        for i, j in zip(*np.nonzero(above | cleared)):
+            rule = rules.iloc[j]
+            key = (locations[i], int(rule['id']))
+            state = self.states.get(key)
+            if above[i, j]:
+                if state is None:
+                    state = self.states[key] = [times[i], False]
+                if not state[1] and key not in pending and (
+                    rule['rule_type'] != 'duration' or times[i] - state[0] >= rule['window_seconds']
+                ):
+                    pending.add(key)
+                    opened.append((locations[i], rule, metrics[i, j]))
+            elif state is not None:
+                if state[1] or key in pending:
+                    resolved.append((locations[i], rule))
+                pending.discard(key)
+                del self.states[key]
+
+    def _record(self, opened, resolved, pending):
+        now = datetime.utcnow()
+        if opened:
+            alerts = pd.DataFrame([
+                {
+                    'alert_type': rule['parameter'],
+                    'severity': rule['severity'],
+                    'location_name': location,
+                    'config_id': int(rule['id']),
+                    'message': self._message(location, rule, value),
+                    'threshold_value': rule['threshold_value'],
+                    'actual_value': round(float(value), 2),
+                    'is_active': True,
+                    'created_at': now
+                }
+                for location, rule, value in opened
+            ])
+            try:
+                self.db.bulk_insert('alerts', self.db.locations.attach(alerts))
+            except Exception as e:
+                # Left closed, so the next reading above the threshold fires again
+                logger.error(f"Error creating alerts: {str(e)}")
+            else:
+                for key in pending:
+                    self.states[key][1] = True
+                logger.info(f"Created {len(opened)} new alerts")
+        if resolved:
+            with self.db.engine.begin() as conn:
+                conn.execute(
+                    text("""
+                        UPDATE alerts SET is_active = false, resolved_at = :now
+                        WHERE is_active = true
+                        AND location_id = (SELECT id FROM locations WHERE name = :location)
+                        AND config_id = :config_id
+                    """),
+                    [
+                        {"now": now, "location": location, "config_id": int(rule['id'])}
+                        for location, rule in resolved
+                    ]
+                )
+            logger.info(f"Resolved {len(resolved)} alerts")
+
+    def _message(self, location, rule, value):
+        if rule['rule_type'] == 'rate_of_change':
+            return f"{rule['parameter'].upper()} rising fast at {location}: {value:.2f}/h"
+        if rule['rule_type'] == 'duration':
+            return (
+                f"{rule['parameter'].upper()} above threshold for {int(rule['window_minutes'])} minutes "
+                f"at {location}: {value:.2f}"
+            )
+        return f"{rule['parameter'].upper()} exceeded threshold at {location}: {value:.2f}"
+
+    def _snapshot(self):
+        if not self.state_path:
+            return
+        try:
+            directory = os.path.dirname(os.path.abspath(self.state_path))
+            os.makedirs(directory, exist_ok=True)
+            partial = f"{self.state_path}.tmp"
+            with open(partial, 'wb') as f:
+                pickle.dump({'rings': self.rings, 'states': self.states}, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(partial, self.state_path)
+        except OSError as e:
+            logger.error(f"Error saving alert state: {str(e)}")
+
+    def _restore(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return False
+        try:
+            with open(self.state_path, 'rb') as f:
+                snapshot = pickle.load(f)
+            self.rings, self.states = snapshot['rings'], snapshot['states']
+            logger.info(f"Restored alert state for {len(self.states)} location rules from {self.state_path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error restoring alert state: {str(e)}")
+            return False
+
+    def _bootstrap_open_alerts(self):
+        """Without a snapshot, adopt the alerts already active in the database"""
+        try:
+            configs = self.load_configs()
+            with self.db.engine.connect() as conn:
+                active = conn.execute(text("""
+                    SELECT DISTINCT l.name AS location_name, a.config_id FROM alerts a
+                    JOIN locations l ON l.id = a.location_id
+                    WHERE a.is_active = true AND a.config_id IS NOT NULL
+                """)).fetchall()
+        except Exception as e:
+            logger.error(f"Error loading active alerts: {str(e)}")
+            return
+        enabled = set(configs['id'].astype(int))
+        for row in active:
+            if row.config_id in enabled:
+                self.states[(row.location_name, int(row.config_id))] = [0.0, True]
+        logger.info(f"Adopted {len(self.states)} open alerts from the database")
@@ -0,0 +1,146 @@
+"""
+US EPA Air Quality Index computed over whole arrays of concentrations.
+
+Concentrations are taken in the units stored in ``measurements``: µg/m³ for
+every pollutant. Gases are converted to the ppb/ppm units of the EPA
+breakpoint tables at 25°C and 1 atm. The same functions serve the live
+pipeline (one batch per run) and historical re-scoring (millions of rows).
+"""
+
+import numpy as np
+import pandas as pd
+
+POLLUTANTS = ['pm25', 'pm10', 'no2', 'so2', 'co', 'o3']
+
+# Molar volume of an ideal gas at 25°C and 1 atm, in litres
+MOLAR_VOLUME = 24.45
+
+MOLECULAR_WEIGHTS = {
+    'no2': 46.0055,
+    'so2': 64.066,
+    'co': 28.010,
+    'o3': 47.997
+}
+
+# Factor from µg/m³ to the unit of each breakpoint table
+TABLE_UNIT_FACTORS = {
+    'pm25': 1.0,                                               # µg/m³
+    'pm10': 1.0,                                               # µg/m³
+    'no2': MOLAR_VOLUME / MOLECULAR_WEIGHTS['no2'],            # ppb
+    'so2': MOLAR_VOLUME / MOLECULAR_WEIGHTS['so2'],            # ppb
+    'co': MOLAR_VOLUME / MOLECULAR_WEIGHTS['co'] / 1000,       # ppm
+    'o3': MOLAR_VOLUME / MOLECULAR_WEIGHTS['o3']               # ppb
+}
+
+# (concentration low, concentration high, index low, index high) per category
+BREAKPOINTS = {
+    'pm25': [
+        (0.0, 12.0, 0, 50), (12.1, 35.4, 51, 100), (35.5, 55.4, 101, 150),
+        (55.5, 150.4, 151, 200), (150.5, 250.4, 201, 300), (250.5, 350.4, 301, 400),
+        (350.5, 500.4, 401, 500)
+    ],
+    'pm10': [
+        (0, 54, 0, 50), (55, 154, 51, 100), (155, 254, 101, 150),
+        (255, 354, 151, 200), (355, 424, 201, 300), (425, 504, 301, 400),
+        (505, 604, 401, 500)
+    ],
+    'no2': [
+        (0, 53, 0, 50), (54, 100, 51, 100), (101, 360, 101, 150),
+        (361, 649, 151, 200), (650, 1249, 201, 300), (1250, 1649, 301, 400),
+        (1650, 2049, 401, 500)
+    ],
+    'so2': [
+        (0, 35, 0, 50), (36, 75, 51, 100), (76, 185, 101, 150),
+        (186, 304, 151, 200), (305, 604, 201, 300), (605, 804, 301, 400),
+        (805, 1004, 401, 500)
+    ],
+    'co': [
+        (0.0, 4.4, 0, 50), (4.5, 9.4, 51, 100), (9.5, 12.4, 101, 150),
+        (12.5, 15.4, 151, 200), (15.5, 30.4, 201, 300), (30.5, 40.4, 301, 400),
+        (40.5, 50.4, 401, 500)
+    ],
+    # 8-hour table, whose 201-300 category is stretched from 200 to 404 ppb so
+    # it meets the 1-hour table's 301-400 and 401-500 categories without a gap
+    'o3': [
+        (0, 54, 0, 50), (55, 70, 51, 100), (71, 85, 101, 150),
+        (86, 105, 151, 200), (106, 404, 201, 300), (405, 504, 301, 400),
+        (505, 604, 401, 500)
+    ]
+}
+
+_TABLES = {
+    pollutant: tuple(np.array(column, dtype=float) for column in zip(*rows))
+    for pollutant, rows in BREAKPOINTS.items()
+}
+
+# Physical ceiling in µg/m³, far above the index scale (which caps at 500):
+# wildfire smoke and dust storms legitimately go past the top breakpoints,
+# so only readings beyond these are treated as sensor or unit faults
+MAX_CONCENTRATIONS = {
+    'pm25': 10000.0,
+    'pm10': 50000.0,
+    'no2': 20000.0,    # ~10 ppm
+    'so2': 30000.0,    # ~11 ppm
+    'co': 600000.0,    # ~500 ppm
+    'o3': 10000.0      # ~5 ppm
+}
+
+# Below these values (in ppm) a gas series stored before readings were
+# normalised to µg/m³ must have been reported in ppm: 1 ppm of NO2, SO2 or
+# O3 is far beyond any ambient level, and CO never falls under 50 µg/m³
+LEGACY_PPM_LIMITS = {'no2': 1.0, 'so2': 1.0, 'o3': 1.0, 'co': 50.0}
+
+def to_micrograms(parameter, value, unit):
+    """Convert a gas reading reported in ppm/ppb to µg/m³"""
+    if parameter not in MOLECULAR_WEIGHTS or unit not in ('ppm', 'ppb'):
+        return value
+    ppb = value * 1000 if unit == 'ppm' else value
+    return ppb * MOLECULAR_WEIGHTS[parameter] / MOLAR_VOLUME
+
+def sub_index(pollutant, concentrations):
+    """Return the AQI sub-index for each concentration (µg/m³), NaN where unknown"""
+    c_low, c_high, i_low, i_high = _TABLES[pollutant]
+    values = np.asarray(concentrations, dtype=float) * TABLE_UNIT_FACTORS[pollutant]
+
+    # First category whose upper bound covers the value; beyond the table caps at 500
+    category = np.searchsorted(c_high, values, side='left')
+    category = np.minimum(category, len(c_high) - 1)
+
+    index = (i_high[category] - i_low[category]) / (c_high[category] - c_low[category]) \
+        * (values - c_low[category]) + i_low[category]
+    # Values falling in the gaps between categories snap to the nearest bound
+    index = np.clip(index, i_low[category], i_high[category])
+
+    valid = ~np.isnan(values) & (values >= 0)
+    return np.where(valid, np.floor(index), np.nan)
+
+def compute_aqi(data):
+    """Return ``(aqi, dominant_pollutant)`` arrays for a frame or mapping of pollutant columns.
+
+    The overall AQI is the highest sub-index; rows without any pollutant get
+    NaN and None.
+    """
+    pollutants = [p for p in POLLUTANTS if p in data]
+    if not pollutants:
+        length = len(data) if isinstance(data, pd.DataFrame) else 0
+        return np.full(length, np.nan), np.full(length, None, dtype=object)
+
+    indices = np.vstack([
+        sub_index(p, pd.to_numeric(pd.Series(data[p]), errors='coerce').to_numpy(dtype=float))
+        for p in pollutants
+    ])
+
+    known = ~np.isnan(indices)
+    any_known = known.any(axis=0)
+    filled = np.where(known, indices, -1)
+
+    aqi = np.where(any_known, filled.max(axis=0), np.nan)
+    dominant = np.where(any_known, np.array(pollutants, dtype=object)[filled.argmax(axis=0)], None)
+    return aqi, dominant
+
+def calculate_aqi(**concentrations):
+    """Scalar convenience wrapper: ``calculate_aqi(pm25=18.2, no2=40.0)``"""
+    aqi, dominant = compute_aqi({p: [v] for p, v in concentrations.items() if v is not None})
+    if not len(aqi) or np.isnan(aqi[0]):
+        return None, None
+    return int(aqi[0]), dominant[0]
@@ -0,0 +1,166 @@
+import json
+import logging
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+from partitions import add_months
+from config import ARCHIVE_DIR, ARCHIVE_DELAY_DAYS, ARCHIVE_CHUNK_ROWS
+
+logger = logging.getLogger(__name__)
+
+# pg_try_advisory_lock key, held for a whole run so only one worker writes the archive
+ARCHIVE_LOCK = 0x61726368
+
+# Columns written for every reading; the month and location_id are encoded in the path
+ARCHIVE_SCHEMA = pa.schema([
+    ('location_name', pa.string()),
+    ('latitude', pa.float64()),
+    ('longitude', pa.float64()),
+    ('timestamp', pa.timestamp('us', tz='UTC')),
+    ('temperature', pa.float64()),
+    ('humidity', pa.float64()),
+    ('pressure', pa.float64()),
+    ('pm25', pa.float64()),
+    ('pm10', pa.float64()),
+    ('no2', pa.float64()),
+    ('so2', pa.float64()),
+    ('co', pa.float64()),
+    ('o3', pa.float64()),
+    ('aqi', pa.int32()),
+    ('dominant_pollutant', pa.string()),
+    ('traffic_level', pa.int32()),
+    ('source', pa.string()),
+    ('created_at', pa.timestamp('us', tz='UTC')),
+])
+INTEGER_COLUMNS = ['aqi', 'traffic_level']
+
+class ParquetArchiver:
+    """Exports closed months of measurements to a Parquet cold tier.
+
+    Files are laid out hive-style as
+    ``<dir>/measurements/month=YYYY-MM/location_id=N/part-0.parquet`` so
+    readers can prune by month and location. A month is closed once it
+    ended ``delay_days`` ago. Each month is written to a hidden staging
+    directory, moved into place, then recorded in ``_manifest.json``;
+    readers only trust months listed there, so a crash mid-export never
+    exposes a partial month.
+    """
+
+    def __init__(self, engine, directory=ARCHIVE_DIR, delay_days=ARCHIVE_DELAY_DAYS, chunk_rows=ARCHIVE_CHUNK_ROWS):
+        self.engine = engine
+        self.root = os.path.join(directory, 'measurements') if directory else ''
+        self.manifest_path = os.path.join(self.root, '_manifest.json')
+        self.delay_days = delay_days
+        self.chunk_rows = chunk_rows
+
+    def run(self):
+        """Archive every closed month not archived yet; returns the months written"""
+        if not self.root:
+            return []
+        if self.engine.dialect.name != 'postgresql':
+            logger.info("Archiving needs PostgreSQL, skipping")
+            return []
+
+        with self.engine.connect() as lock:
+            if not lock.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": ARCHIVE_LOCK}).scalar():
+                logger.info("Archive already running elsewhere")
+                return []
+            lock.commit()
+            try:
+                return self._archive_closed_months()
+            finally:
+                lock.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ARCHIVE_LOCK})
+                lock.commit()
+
+    def _archive_closed_months(self):
+        manifest = self._load_manifest()
+        with self.engine.connect() as conn:
+            oldest = conn.execute(text("SELECT MIN(timestamp) FROM measurements")).scalar()
+        if oldest is None:
+            return []
+
+        month = oldest.replace(tzinfo=None, day=1, hour=0, minute=0, second=0, microsecond=0)
+        closed = datetime.utcnow() - timedelta(days=self.delay_days)
+        archived = []
+        while add_months(month, 1) <= closed:
+            key = f"{month:%Y-%m}"
+            if key not in manifest['months']:
+                started = time.perf_counter()
+                rows, files = self._export(month)
+                manifest['months'][key] = {
+                    'rows': rows,
+                    'files': files,
+                    'archived_at': datetime.utcnow().isoformat()
+                }
+                self._save_manifest(manifest)
+                archived.append(key)
+                logger.info(f"Archived {rows} measurements for {key} into {files} files in {time.perf_counter() - started:.1f}s")
+            month = add_months(month, 1)
+        return archived
+
+    def _export(self, month):
+        """Write one month to a staging directory, one file per location, then move it into place"""
+        final = os.path.join(self.root, f"month={month:%Y-%m}")
+        staging = os.path.join(self.root, f".staging-{month:%Y-%m}")
+        for path in (staging, final):
+            shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(staging)
+
+        with self.engine.connect() as conn:
+            names = dict(conn.execute(text("SELECT id, name FROM locations")).fetchall())
+            result = conn.execution_options(stream_results=True, yield_per=self.chunk_rows).execute(
+                text(f"""
+                    SELECT location_id, {', '.join(name for name in ARCHIVE_SCHEMA.names if name != 'location_name')}
+                    FROM measurements
+                    WHERE timestamp >= :start AND timestamp < :end
+                    ORDER BY location_id, timestamp
+                """),
+                {"start": month, "end": add_months(month, 1)}
+            )
+            columns = list(result.keys())
+
+            rows, files, pending = 0, 0, None
+            for chunk in result.partitions():
+                frame = pd.DataFrame(chunk, columns=columns)
+                rows += len(frame)
+                if pending is not None:
+                    frame = pd.concat([pending, frame], ignore_index=True)
+                # Rows arrive ordered by location, so only the chunk's last location may continue
+                last = frame['location_id'].iloc[-1]
+                for _, location in frame[frame['location_id'] != last].groupby('location_id', sort=False):
+                    files += self._write(staging, location, names)
+                pending = frame[frame['location_id'] == last]
+            if pending is not None:
+                files += self._write(staging, pending, names)
+
+        os.replace(staging, final)
+        return rows, files
+
+    def _write(self, staging, frame, names):
+        location_id = int(frame['location_id'].iloc[0])
+        frame = frame.assign(location_name=names.get(location_id)).drop(columns='location_id')
+        for column in INTEGER_COLUMNS:
+            frame[column] = frame[column].astype('Int32')
+        directory = os.path.join(staging, f"location_id={location_id}")
+        os.makedirs(directory)
+        table = pa.Table.from_pandas(frame[ARCHIVE_SCHEMA.names], schema=ARCHIVE_SCHEMA, preserve_index=False)
+        pq.write_table(table, os.path.join(directory, 'part-0.parquet'), compression='zstd')
+        return 1
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {'months': {}}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest):
+        os.makedirs(self.root, exist_ok=True)
+        partial = f"{self.manifest_path}.tmp"
+        with open(partial, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(partial, self.manifest_path)
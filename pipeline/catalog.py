@@ -0,0 +1,112 @@
+import json
+import logging
+import threading
+from datetime import datetime
+from sqlalchemy import bindparam, text
+from config import LOCATIONS_SOURCE, LOCATIONS_FILE, MONITORED_LOCATIONS
+
+logger = logging.getLogger(__name__)
+
+def load_catalog(engine=None):
+    """Load the monitored location catalog.
+
+    Locations are read from the ``locations`` table or from LOCATIONS_FILE
+    depending on LOCATIONS_SOURCE, falling back to MONITORED_LOCATIONS when
+    that source is unavailable or empty.
+    """
+    locations = []
+    try:
+        if LOCATIONS_SOURCE == 'file' and LOCATIONS_FILE:
+            locations = _load_from_file(LOCATIONS_FILE)
+        elif LOCATIONS_SOURCE == 'database' and engine is not None:
+            locations = _load_from_database(engine)
+    except Exception as e:
+        logger.error(f"Error loading location catalog from {LOCATIONS_SOURCE}: {str(e)}")
+
+    if not locations:
+        logger.info("Using built-in MONITORED_LOCATIONS catalog")
+        return list(MONITORED_LOCATIONS)
+
+    logger.info(f"Loaded {len(locations)} locations from {LOCATIONS_SOURCE}")
+    return locations
+
+def _load_from_file(path):
+    with open(path) as f:
+        entries = json.load(f)
+    return [
+        {
+            'name': entry['name'],
+            'lat': float(entry['lat']),
+            'lon': float(entry['lon']),
+            'openaq_location_id': entry.get('openaq_location_id')
+        }
+        for entry in entries
+    ]
+
+def _load_from_database(engine):
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT name, latitude, longitude, openaq_location_id
+            FROM locations
+            WHERE is_active = true
+            ORDER BY name
+        """)).fetchall()
+    return [
+        {
+            'name': row.name,
+            'lat': float(row.latitude),
+            'lon': float(row.longitude),
+            'openaq_location_id': row.openaq_location_id
+        }
+        for row in rows
+    ]
+
+class LocationCache:
+    """Maps location names to ``locations`` ids for the fact tables.
+
+    Ids are cached for the life of the process. Names missing from the
+    table are registered on first sight with the coordinates they were
+    reported at, so new sensors need no manual setup.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.ids = {}
+        self._lock = threading.Lock()
+
+    def attach(self, frame):
+        """``frame`` with its ``location_name`` column replaced by ``location_id``"""
+        if 'location_name' not in frame.columns:
+            return frame
+        names = frame['location_name']
+        missing = names[~names.isin(self.ids.keys())].unique()
+        if len(missing):
+            with self._lock:
+                self._resolve(frame[names.isin(missing)].drop_duplicates('location_name'))
+        return frame.assign(location_id=names.map(self.ids).astype('int64')).drop(columns='location_name')
+
+    def _resolve(self, frame):
+        names = frame['location_name'].tolist()
+        lookup = text("SELECT id, name FROM locations WHERE name IN :names").bindparams(bindparam('names', expanding=True))
+        with self.engine.begin() as conn:
+            known = dict(conn.execute(lookup, {"names": names}).fetchall())
+            # Names reported without coordinates are registered at (0, 0)
+            new = frame[~frame['location_name'].isin(known.values())].reindex(
+                columns=['location_name', 'latitude', 'longitude']
+            ).fillna({'latitude': 0, 'longitude': 0})
+            if not new.empty:
+                now = datetime.utcnow()
+                conn.execute(
+                    text("""
+                        INSERT INTO locations (name, latitude, longitude, is_active, created_at, updated_at)
+                        VALUES (:name, :latitude, :longitude, true, :now, :now)
+                        ON CONFLICT (name) DO NOTHING
+                    """),
+                    [
+                        {"name": row.location_name, "latitude": float(row.latitude), "longitude": float(row.longitude), "now": now}
+                        for row in new.itertuples()
+                    ]
+                )
+                logger.info(f"Registered {len(new)} new locations: {new['location_name'].tolist()}")
+                known = dict(conn.execute(lookup, {"names": names}).fetchall())
+        self.ids.update({name: location_id for location_id, name in known.items()})
@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import MONITORED_LOCATIONS, SOURCE_INTERVALS, SCHEDULE_JITTER_SECONDS
+from metrics import FETCH_SECONDS, FETCHES, INFLIGHT, COLLECTOR_QUEUE
+from collectors.cache import get_cache
+from collectors.http_client import get_client
+
+logger = logging.getLogger(__name__)
+
+class BaseCollector:
+    """Concurrent collection engine shared by all upstream providers.
+
+    Subclasses implement ``fetch`` (one request for a target through
+    ``self.client``) and ``transform`` (API payload to measurement dict).
+    ``plan`` decides which targets to request; by default every location is
+    its own target. Targets fetched within ``cache_ttl`` seconds are skipped,
+    as are responses whose ``observation_marker`` matches the cached one.
+    New markers are only held until ``commit_markers``, which the pipeline
+    calls once the readings are stored; ``discard_markers`` drops them
+    after a failed load so the readings are collected again.
+    Requests are issued at once and bounded by
+    ``max_concurrency``, so a run takes roughly as long as its slowest batch
+    of requests.
+    """
+    source = None
+    max_concurrency = 10
+    cache_ttl = 0
+
+    def __init__(self, locations=None):
+        self.locations = locations if locations is not None else MONITORED_LOCATIONS
+        self.client = get_client(self.source)
+        self.cache = get_cache()
+        self.stats = {}
+        self.pending_markers = {}
+        self._check_cache_ttl()
+
+    def _check_cache_ttl(self):
+        """Reject a TTL that would outlive the gap between two scheduled runs"""
+        interval = SOURCE_INTERVALS.get(self.source)
+        if not self.cache_ttl or interval is None:
+            return
+        # Jitter can bring consecutive runs up to a tenth of the interval closer
+        gap = interval * 60 - min(SCHEDULE_JITTER_SECONDS, interval * 6)
+        if self.cache_ttl >= gap:
+            raise ValueError(
+                f"{self.source} cache TTL ({self.cache_ttl:g}s) must be below {gap:g}s "
+                f"to collect every {interval} minutes"
+            )
+
+    def commit_markers(self):
+        """Record the markers of readings that are now stored"""
+        markers, self.pending_markers = self.pending_markers, {}
+        for key, marker in markers.items():
+            self.cache.put(self.source, key, marker)
+        self.cache.flush()
+
+    def discard_markers(self):
+        """Forget the markers of readings that failed to load"""
+        self.pending_markers = {}
+
+    def set_locations(self, locations):
+        """Replace the locations this collector covers"""
+        self.locations = locations
+
+    def collect(self):
+        """Collect data for all monitored locations"""
+        return asyncio.run(self._collect_once())
+
+    async def _collect_once(self):
+        try:
+            return await self.collect_async()
+        finally:
+            # The loop dies with asyncio.run, so its pooled session must too
+            await self.client.close()
+
+    async def collect_async(self, timeout=None):
+        """Collect data for all monitored locations.
+
+        When ``timeout`` (seconds) elapses, requests still in flight are
+        cancelled and the measurements gathered so far are returned.
+        """
+        self.stats = {'fetched': 0, 'fresh': 0, 'unchanged': 0, 'errors': 0}
+        self.pending_markers = {}
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = [
+            asyncio.create_task(self._collect_target(semaphore, target, locations))
+            for target, locations in await self.plan(timeout)
+        ]
+        if not tasks:
+            return []
+
+        # Planning spends part of the same budget
+        remaining = max(timeout - (loop.time() - started), 0) if timeout is not None else None
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=remaining)
+            if pending:
+                logger.warning(f"{self.source} collection timed out after {timeout}s, dropping {len(pending)} pending locations")
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            self.cache.flush()
+
+        logger.info(
+            f"{self.source}: {self.stats['fetched']} fetched, {self.stats['unchanged']} unchanged, "
+            f"{self.stats['fresh']} skipped within cache TTL"
+        )
+
+        # Keep location order stable regardless of completion order
+        return [
+            measurement
+            for task in tasks if task in done
+            for measurement in task.result()
+        ]
+
+    async def stream(self, timeout=None):
+        """Yield lists of measurements as responses arrive, in completion order.
+
+        A fixed pool of ``max_concurrency`` workers pulls targets from the plan
+        and hands results over a bounded queue, so only a few responses are
+        held at once however many locations there are and a slow consumer
+        throttles the requests. Stops early once ``timeout`` seconds pass.
+        """
+        self.stats = {'fetched': 0, 'fresh': 0, 'unchanged': 0, 'errors': 0}
+        self.pending_markers = {}
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        queue = asyncio.Queue(maxsize=self.max_concurrency * 2)
+        targets = iter(await self.plan(timeout))
+
+        async def worker():
+            for target, locations in targets:
+                measurements = await self._collect_target(semaphore, target, locations)
+                if measurements:
+                    await queue.put(measurements)
+                    COLLECTOR_QUEUE.labels(self.source).set(queue.qsize())
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.max_concurrency)]
+        finished = asyncio.ensure_future(asyncio.gather(*workers))
+        try:
+            while not (finished.done() and queue.empty()):
+                remaining = deadline - loop.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    logger.warning(f"{self.source} collection timed out after {timeout}s, dropping remaining locations")
+                    break
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait([getter, finished], timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    COLLECTOR_QUEUE.labels(self.source).set(queue.qsize())
+                    yield getter.result()
+                else:
+                    getter.cancel()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(finished, return_exceptions=True)
+            COLLECTOR_QUEUE.labels(self.source).set(0)
+            self.cache.flush()
+            logger.info(
+                f"{self.source}: {self.stats['fetched']} fetched, {self.stats['unchanged']} unchanged, "
+                f"{self.stats['fresh']} skipped within cache TTL"
+            )
+
+    async def plan(self, timeout=None):
+        """Return ``(target, locations)`` pairs; one fetch per target serves all its locations.
+
+        ``timeout`` is the run's budget in seconds, which planning counts against.
+        """
+        return [(location, [location]) for location in self.locations]
+
+    async def _collect_target(self, semaphore, target, locations):
+        key = self.cache_key(target)
+        if self.cache_ttl and self.cache.is_fresh(self.source, key, self.cache_ttl):
+            self.stats['fresh'] += 1
+            FETCHES.labels(self.source, 'fresh').inc()
+            return []
+
+        async with semaphore:
+            try:
+                INFLIGHT.labels(self.source).inc()
+                started = time.perf_counter()
+                try:
+                    data = await self.fetch(target)
+                finally:
+                    INFLIGHT.labels(self.source).dec()
+                    FETCH_SECONDS.labels(self.source).observe(time.perf_counter() - started)
+                if not data:
+                    FETCHES.labels(self.source, 'empty').inc()
+                    return []
+                self.stats['fetched'] += 1
+
+                marker = self.observation_marker(data)
+                if marker is not None:
+                    cached = self.cache.get(self.source, key)
+                    if cached is not None and cached[0] == marker:
+                        self.cache.put(self.source, key, marker)
+                        self.stats['unchanged'] += 1
+                        FETCHES.labels(self.source, 'unchanged').inc()
+                        return []
+
+                measurements = [self.transform(data, location) for location in locations]
+                if marker is not None:
+                    # Held back until the readings are stored, so a failed load isn't mistaken for a duplicate
+                    self.pending_markers[key] = marker
+                FETCHES.labels(self.source, 'fetched').inc()
+                return measurements
+            except Exception as e:
+                self.stats['errors'] += 1
+                FETCHES.labels(self.source, 'error').inc()
+                logger.error(f"Error collecting {self.source} data for {target['name']}: {str(e)}")
+        return []
+
+    def cache_key(self, target):
+        """Key identifying a target in the response cache"""
+        return target['name']
+
+    def observation_marker(self, data):
+        """Provider timestamp identifying the reading in ``data``, or None if unknown"""
+        return None
+
+    async def fetch(self, target):
+        """Fetch the raw API payload for a target"""
+        raise NotImplementedError
+
+    def transform(self, data, location):
+        """Transform API response to measurement format"""
+        raise NotImplementedError
@@ -0,0 +1,114 @@
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """LRU cache of the last observation seen per (provider, target).
+
+    Entries record the provider's observation marker and when it was
+    fetched. When ``path`` is set, entries are persisted to a SQLite file on
+    ``flush`` and reloaded on startup so restarts don't re-ingest readings.
+    """
+
+    def __init__(self, max_entries, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()
+        self.dirty = set()
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    def get(self, provider, key):
+        """Return ``(marker, fetched_at)`` for a target or None"""
+        with self._lock:
+            entry = self.entries.get((provider, key))
+            if entry is not None:
+                self.entries.move_to_end((provider, key))
+            return entry
+
+    def is_fresh(self, provider, key, ttl):
+        """True if the target was fetched less than ``ttl`` seconds ago"""
+        entry = self.get(provider, key)
+        return entry is not None and time.time() - entry[1] < ttl
+
+    def put(self, provider, key, marker):
+        with self._lock:
+            self.entries[(provider, key)] = (marker, time.time())
+            self.entries.move_to_end((provider, key))
+            self.dirty.add((provider, key))
+            while len(self.entries) > self.max_entries:
+                evicted, _ = self.entries.popitem(last=False)
+                self.dirty.discard(evicted)
+
+    def flush(self):
+        """Write entries changed since the last flush to disk"""
+        if not self.path:
+            return
+        with self._lock:
+            rows = [
+                (provider, key, self.entries[(provider, key)][0], self.entries[(provider, key)][1])
+                for provider, key in self.dirty
+                if (provider, key) in self.entries
+            ]
+            self.dirty.clear()
+        if not rows:
+            return
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO response_cache (provider, key, marker, fetched_at) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Error persisting response cache: {str(e)}")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS response_cache (
+                provider TEXT NOT NULL,
+                key TEXT NOT NULL,
+                marker TEXT,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (provider, key)
+            )
+        """)
+        return conn
+
+    def _load(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT provider, key, marker, fetched_at FROM response_cache ORDER BY fetched_at DESC LIMIT ?",
+                    (self.max_entries,)
+                ).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Error loading response cache: {str(e)}")
+            return
+
+        # Oldest first so the most recent entries end up most recently used
+        for provider, key, marker, fetched_at in reversed(rows):
+            self.entries[(provider, key)] = (marker, fetched_at)
+        logger.info(f"Loaded {len(rows)} cached responses from {self.path}")
+
+_cache = None
+
+def get_cache():
+    """Return the process-wide response cache"""
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache(RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_PATH or None)
+    return _cache
@@ -0,0 +1,251 @@
+import asyncio
+import aiohttp
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    HTTP_REQUEST_TIMEOUT, HTTP_POOL_SIZE, HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_MAX_RETRIES, HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX,
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT, PROVIDER_RATE_LIMITS
+)
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'CityLungs/1.0'
+
+# Status codes worth retrying: throttling and transient upstream failures
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+class ProviderError(Exception):
+    """Request to an upstream provider failed after all retries"""
+
+class CircuitOpenError(ProviderError):
+    """Provider circuit is open, request was not attempted"""
+
+class TokenBucket:
+    """Asyncio token-bucket rate limiter"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = None
+        self._lock_loop = None
+
+    def _get_lock(self):
+        # asyncio locks are bound to the loop they are first used on
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    def _refill(self, now):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        """Wait until a token is available and consume it"""
+        async with self._get_lock():
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Stop handing out tokens for ``seconds`` (e.g. after a 429)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        # Refilling starts when the pause ends, not from the last acquire
+        self.tokens = 0
+        self.updated_at = self.paused_until
+
+class CircuitBreaker:
+    """Stops calling a provider after repeated failures until it cools down.
+
+    Once ``reset_timeout`` passes, a single probe request is let through;
+    every other request is rejected until the probe succeeds, or until
+    another ``reset_timeout`` passes without the probe reporting back. A
+    throttled probe says nothing about the provider's health, so it is
+    released and the next request probes again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold, reset_timeout):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.probe_started_at = 0.0
+
+    def allow(self):
+        """Return True if a request may be sent"""
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            if now - self.opened_at < self.reset_timeout:
+                return False
+        elif now - self.probe_started_at < self.reset_timeout:
+            # A probe is already in flight
+            return False
+        # Let a probe request through
+        self.state = self.HALF_OPEN
+        self.probe_started_at = now
+        return True
+
+    def release_probe(self):
+        """End an in-flight probe without a verdict"""
+        if self.state == self.HALF_OPEN:
+            self.probe_started_at = 0.0
+
+    def record_success(self):
+        self.failures = 0
+        self.state = self.CLOSED
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"{self.name} circuit opened after {self.failures} consecutive failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+class ProviderClient:
+    """Rate-limited, retrying HTTP client for one upstream provider.
+
+    The underlying session and its keep-alive pool are created lazily and
+    reused across pipeline runs for as long as the event loop lives.
+    """
+
+    def __init__(self, provider, rate, burst):
+        self.provider = provider
+        self.limiter = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(provider, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+        self.timeout = aiohttp.ClientTimeout(total=HTTP_REQUEST_TIMEOUT)
+        self._session = None
+        self._loop = None
+
+    async def get_session(self):
+        """Return the pooled session, replacing one that is closed or bound to another loop"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            # Sessions are bound to the loop they were created on
+            stale = self._session
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_SIZE,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers={'User-Agent': USER_AGENT}
+            )
+            self._loop = loop
+            # Swapped in first, so concurrent callers never see the stale session while it closes
+            if stale is not None and not stale.closed:
+                try:
+                    await stale.close()
+                except RuntimeError as e:
+                    # Its loop is already closed and took the connections with it
+                    logger.debug(f"Dropped {self.provider} session from a closed loop: {str(e)}")
+        return self._session
+
+    async def get_json(self, url, params=None, headers=None):
+        """GET ``url`` and return the decoded JSON body, retrying transient failures"""
+        last_error = None
+
+        for attempt in range(HTTP_MAX_RETRIES + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{self.provider} circuit is open")
+
+            await self.limiter.acquire()
+            session = await self.get_session()
+            retry_after = None
+
+            try:
+                async with session.get(url, params=params, headers=headers) as response:
+                    if response.status in RETRYABLE_STATUSES:
+                        retry_after = self._parse_retry_after(response.headers.get('Retry-After'))
+                        last_error = ProviderError(f"{self.provider} returned HTTP {response.status}")
+                        if response.status == 429:
+                            # Throttled: hold back every request to this provider, not just this one
+                            self.limiter.pause(retry_after or self._backoff(attempt))
+                            self.breaker.release_probe()
+                        else:
+                            self.breaker.record_failure()
+                    else:
+                        response.raise_for_status()
+                        data = await response.json()
+                        self.breaker.record_success()
+                        return data
+            except aiohttp.ClientResponseError as e:
+                # Non-retryable 4xx: the provider is up, the request itself is bad
+                self.breaker.record_success()
+                raise ProviderError(f"{self.provider} returned HTTP {e.status}") from e
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.breaker.record_failure()
+                last_error = ProviderError(f"{self.provider} request failed: {str(e) or type(e).__name__}")
+
+            if attempt < HTTP_MAX_RETRIES:
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                logger.warning(f"{last_error}, retrying in {delay:.1f}s (attempt {attempt + 1}/{HTTP_MAX_RETRIES})")
+                await asyncio.sleep(delay)
+
+        raise last_error
+
+    def _backoff(self, attempt):
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** attempt))
+
+    def _parse_retry_after(self, value):
+        """Parse a Retry-After header given in seconds or as an HTTP date"""
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(max(seconds, 0.0), HTTP_BACKOFF_MAX)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+# Clients are shared per provider so limits and pools hold across collectors and runs
+_clients = {}
+
+def get_client(provider):
+    """Return the shared client for ``provider``"""
+    if provider not in _clients:
+        rate, burst = PROVIDER_RATE_LIMITS.get(provider, PROVIDER_RATE_LIMITS['default'])
+        _clients[provider] = ProviderClient(provider, rate, burst)
+    return _clients[provider]
+
+async def close_clients():
+    """Close every pooled provider session"""
+    for client in _clients.values():
+        await client.close()
@@ -1,72 +1,212 @@
-import requests
+import asyncio
 import logging
-from datetime import datetime
+import math
+from datetime import datetime, timedelta, timezone
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import OPENAQ_API_KEY, MONITORED_LOCATIONS
+from config import (
+    OPENAQ_API_KEY, OPENAQ_MAX_CONCURRENCY, OPENAQ_COLLECTION_TIMEOUT,
+    OPENAQ_SEARCH_RADIUS, OPENAQ_STATION_REFRESH_HOURS, OPENAQ_CACHE_TTL
+)
+from collectors.base import BaseCollector
+from collectors.http_client import ProviderError
+from collectors.registry import register_collector
+from collectors.spatial import GridIndex
+from aqi import POLLUTANTS, MAX_CONCENTRATIONS, to_micrograms
 
 logger = logging.getLogger(__name__)
 
-class OpenAQCollector:
-    def __init__(self):
+# OpenAQ rejects radius searches wider than 25 km
+MAX_SEARCH_RADIUS = 25000
+
+@register_collector('openaq', timeout=OPENAQ_COLLECTION_TIMEOUT)
+class OpenAQCollector(BaseCollector):
+    max_concurrency = OPENAQ_MAX_CONCURRENCY
+    cache_ttl = OPENAQ_CACHE_TTL
+
+    def __init__(self, locations=None):
+        super().__init__(locations)
         self.api_key = OPENAQ_API_KEY
         self.base_url = "https://api.openaq.org/v2/latest"
+        self.locations_url = "https://api.openaq.org/v2/locations"
+        self.station_groups = None
+        self.stations_refreshed_at = None
+    
+    def set_locations(self, locations):
+        """Replace the covered locations, remapping stations if they changed"""
+        if [location['name'] for location in locations] != [location['name'] for location in self.locations]:
+            self.station_groups = None
+        super().set_locations(locations)
+    
+    @property
+    def headers(self):
+        headers = {}
+        if self.api_key:
+            headers['X-API-Key'] = self.api_key
+        return headers
+    
+    async def plan(self, timeout=None):
+        """Group monitored locations by the OpenAQ station that serves them.
+
+        A station refresh may use at most half of ``timeout``, leaving the
+        rest for the readings. If it runs out, the cached station index is
+        kept (or, without one, every location is queried on its own) and
+        the refresh is retried next run.
+        """
+        if self.station_groups is None or self._stations_stale():
+            try:
+                await asyncio.wait_for(self.refresh_stations(), timeout / 2 if timeout is not None else None)
+            except asyncio.TimeoutError:
+                if self.station_groups is None:
+                    logger.warning(f"OpenAQ station refresh timed out after {timeout / 2:g}s, querying each location")
+                    return [(location, [location]) for location in self.locations]
+                logger.warning(f"OpenAQ station refresh timed out after {timeout / 2:g}s, keeping the cached stations")
+        return self.station_groups
+    
+    def _stations_stale(self):
+        if self.stations_refreshed_at is None:
+            return True
+        return datetime.utcnow() - self.stations_refreshed_at > timedelta(hours=OPENAQ_STATION_REFRESH_HOURS)
+    
+    async def refresh_stations(self):
+        """Discover nearby stations and map each monitored location to its nearest one.
+
+        Discovery costs one query per occupied grid cell rather than per
+        location. Each station is then fetched once per run and its reading
+        fanned out to every location it serves. Locations in cells whose
+        discovery failed fall back to a radius query of their own.
+        """
+        radius_km = OPENAQ_SEARCH_RADIUS / 1000
+        points = GridIndex(radius_km)
+        for location in self.locations:
+            points.insert(location['lat'], location['lon'], location)
         
-    def collect(self):
-        """Collect air quality data for all monitored locations"""
-        measurements = []
+        # Widen each cell query so it covers stations near the cell corners
+        search_radius = min(int(OPENAQ_SEARCH_RADIUS * (1 + math.sqrt(2) / 2)), MAX_SEARCH_RADIUS)
+        cells = list(points.cells)
+        results = await asyncio.gather(*[
+            self._discover_stations(points.cell_center(cell), search_radius) for cell in cells
+        ], return_exceptions=True)
         
-        for location in MONITORED_LOCATIONS:
-            try:
-                data = self.fetch_air_quality_data(location)
-                if data:
-                    measurement = self.transform_air_quality_data(data, location)
-                    measurements.append(measurement)
-            except Exception as e:
-                logger.error(f"Error collecting air quality data for {location['name']}: {str(e)}")
+        stations = GridIndex(radius_km)
+        seen = set()
+        fallback = []
+        for cell, result in zip(cells, results):
+            if isinstance(result, Exception):
+                logger.error(f"OpenAQ station discovery failed: {str(result)}")
+                fallback.extend(location for _, _, location in points.cells[cell])
+                continue
+            for station in result:
+                if station['station_id'] not in seen:
+                    seen.add(station['station_id'])
+                    stations.insert(station['lat'], station['lon'], station)
         
-        return measurements
+        groups = {}
+        unserved = 0
+        fallback_ids = {id(location) for location in fallback}
+        for location in self.locations:
+            if id(location) in fallback_ids:
+                continue
+            station = stations.nearest(location['lat'], location['lon'], radius_km)
+            if station is None:
+                unserved += 1
+                continue
+            groups.setdefault(station['station_id'], (station, []))[1].append(location)
+        
+        self.station_groups = list(groups.values()) + [(location, [location]) for location in fallback]
+        # Retry discovery next run if any cell failed
+        self.stations_refreshed_at = None if fallback else datetime.utcnow()
+        
+        logger.info(
+            f"Mapped {len(self.locations) - unserved - len(fallback)} locations onto "
+            f"{len(groups)} OpenAQ stations ({len(fallback)} on fallback, {unserved} without a station)"
+        )
     
-    def fetch_air_quality_data(self, location):
-        """Fetch air quality data from OpenAQ API"""
+    async def _discover_stations(self, center, radius):
+        """List stations within ``radius`` meters of ``center``"""
         params = {
-            'coordinates': f"{location['lat']},{location['lon']}",
-            'radius': 5000,  # 5km radius
-            'limit': 1,
-            'order_by': 'lastUpdated',
-            'sort': 'desc'
+            'coordinates': f"{center[0]:.5f},{center[1]:.5f}",
+            'radius': radius,
+            'limit': 1000
         }
+        data = await self.client.get_json(self.locations_url, params=params, headers=self.headers)
         
-        headers = {'User-Agent': 'CityLungs/1.0'}
-        if self.api_key:
-            headers['X-API-Key'] = self.api_key
+        stations = []
+        for result in data.get('results', []):
+            coordinates = result.get('coordinates') or {}
+            if coordinates.get('latitude') is None or coordinates.get('longitude') is None:
+                continue
+            stations.append({
+                'station_id': result['id'],
+                'name': result.get('name') or str(result['id']),
+                'lat': coordinates['latitude'],
+                'lon': coordinates['longitude']
+            })
+        return stations
+    
+    async def fetch(self, target):
+        """Fetch air quality data from OpenAQ API for a station or a location"""
+        if 'station_id' in target:
+            url = f"{self.base_url}/{target['station_id']}"
+            params = None
+        else:
+            url = self.base_url
+            params = {
+                'coordinates': f"{target['lat']},{target['lon']}",
+                'radius': OPENAQ_SEARCH_RADIUS,
+                'limit': 1,
+                'order_by': 'lastUpdated',
+                'sort': 'desc'
+            }
         
         try:
-            response = requests.get(self.base_url, params=params, headers=headers, timeout=30)
-            response.raise_for_status()
-            data = response.json()
+            data = await self.client.get_json(url, params=params, headers=self.headers)
             
             if data.get('results') and len(data['results']) > 0:
                 return data['results'][0]
             else:
-                logger.warning(f"No air quality data found for {location['name']}")
+                logger.warning(f"No air quality data found for {target['name']}")
                 return None
             
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed for {location['name']}: {str(e)}")
+        except ProviderError as e:
+            logger.error(f"API request failed for {target['name']}: {str(e)}")
             return None
         except Exception as e:
             logger.error(f"Unexpected error fetching air quality data: {str(e)}")
             return None
     
-    def transform_air_quality_data(self, data, location):
+    def cache_key(self, target):
+        """Stations are cached once no matter how many locations they serve"""
+        if 'station_id' in target:
+            return f"station:{target['station_id']}"
+        return target['name']
+    
+    def observation_marker(self, data):
+        """Most recent ``lastUpdated`` across the station's parameters"""
+        updated = [m.get('lastUpdated') for m in data.get('measurements', []) if m.get('lastUpdated')]
+        return max(updated) if updated else None
+    
+    def observed_at(self, data):
+        """Latest ``lastUpdated`` as naive UTC, or now if the payload has none"""
+        marker = self.observation_marker(data)
+        if marker:
+            try:
+                observed = datetime.fromisoformat(marker.replace('Z', '+00:00'))
+                if observed.tzinfo is not None:
+                    observed = observed.astimezone(timezone.utc).replace(tzinfo=None)
+                return observed
+            except ValueError:
+                logger.warning(f"Unparseable OpenAQ lastUpdated: {marker}")
+        return datetime.utcnow()
+    
+    def transform(self, data, location):
         """Transform API response to measurement format"""
         measurement = {
             'location_name': location['name'],
             'latitude': location['lat'],
             'longitude': location['lon'],
-            'timestamp': datetime.utcnow(),
+            'timestamp': self.observed_at(data),
             'source': 'openaq'
         }
         
@@ -80,38 +220,12 @@ class OpenAQCollector:
             parameter = m.get('parameter')
             value = m.get('value')
             
-            if value is not None and isinstance(value, (int, float)):
-                if parameter == 'pm25':
-                    measurement['pm25'] = float(value)
-                elif parameter == 'pm10':
-                    measurement['pm10'] = float(value)
-                elif parameter == 'no2':
-                    measurement['no2'] = float(value)
-                elif parameter == 'so2':
-                    measurement['so2'] = float(value)
-                elif parameter == 'co':
-                    measurement['co'] = float(value)
-                elif parameter == 'o3':
-                    measurement['o3'] = float(value)
-        
-        # Calculate AQI if PM2.5 is available
-        if measurement.get('pm25'):
-            measurement['aqi'] = self.calculate_aqi(measurement['pm25'])
+            if parameter in POLLUTANTS and value is not None and isinstance(value, (int, float)):
+                # Gases may be reported in ppm; measurements are stored in µg/m³
+                value = float(to_micrograms(parameter, value, m.get('unit')))
+                if not (math.isfinite(value) and 0 <= value <= MAX_CONCENTRATIONS[parameter]):
+                    logger.warning(f"Dropping implausible {parameter} reading for {location['name']}: {value:.2f} µg/m³")
+                    continue
+                measurement[parameter] = value
         
         return measurement
-    
-    def calculate_aqi(self, pm25):
-        """Calculate AQI from PM2.5 concentration"""
-        # US EPA AQI calculation for PM2.5
-        if pm25 <= 12.0:
-            return int((50 - 0) / (12.0 - 0) * (pm25 - 0) + 0)
-        elif pm25 <= 35.4:
-            return int((100 - 51) / (35.4 - 12.1) * (pm25 - 12.1) + 51)
-        elif pm25 <= 55.4:
-            return int((150 - 101) / (55.4 - 35.5) * (pm25 - 35.5) + 101)
-        elif pm25 <= 150.4:
-            return int((200 - 151) / (150.4 - 55.5) * (pm25 - 55.5) + 151)
-        elif pm25 <= 250.4:
-            return int((300 - 201) / (250.4 - 150.5) * (pm25 - 150.5) + 201)
-        else:
-            return int((500 - 301) / (500.4 - 250.5) * (pm25 - 250.5) + 301)
\ No newline at end of file
@@ -1,34 +1,29 @@
-import requests
 import logging
 from datetime import datetime
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import OPENWEATHER_API_KEY, MONITORED_LOCATIONS
+from config import (
+    OPENWEATHER_API_KEY, OPENWEATHER_MAX_CONCURRENCY, OPENWEATHER_COLLECTION_TIMEOUT,
+    OPENWEATHER_CACHE_TTL
+)
+from collectors.base import BaseCollector
+from collectors.http_client import ProviderError
+from collectors.registry import register_collector
 
 logger = logging.getLogger(__name__)
 
-class OpenWeatherCollector:
-    def __init__(self):
+@register_collector('openweather', timeout=OPENWEATHER_COLLECTION_TIMEOUT)
+class OpenWeatherCollector(BaseCollector):
+    max_concurrency = OPENWEATHER_MAX_CONCURRENCY
+    cache_ttl = OPENWEATHER_CACHE_TTL
+
+    def __init__(self, locations=None):
+        super().__init__(locations)
         self.api_key = OPENWEATHER_API_KEY
         self.base_url = "https://api.openweathermap.org/data/2.5/weather"
-        
-    def collect(self):
-        """Collect weather data for all monitored locations"""
-        measurements = []
-        
-        for location in MONITORED_LOCATIONS:
-            try:
-                data = self.fetch_weather_data(location)
-                if data:
-                    measurement = self.transform_weather_data(data, location)
-                    measurements.append(measurement)
-            except Exception as e:
-                logger.error(f"Error collecting weather data for {location['name']}: {str(e)}")
-        
-        return measurements
     
-    def fetch_weather_data(self, location):
+    async def fetch(self, location):
         """Fetch weather data from OpenWeatherMap API"""
         if not self.api_key:
             logger.error("OpenWeather API key not configured")
@@ -41,26 +36,33 @@ class OpenWeatherCollector:
             'units': 'metric'
         }
         
-        headers = {'User-Agent': 'CityLungs/1.0'}
-        
         try:
-            response = requests.get(self.base_url, params=params, headers=headers, timeout=30)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return await self.client.get_json(self.base_url, params=params)
+        except ProviderError as e:
             logger.error(f"API request failed for {location['name']}: {str(e)}")
             return None
         except Exception as e:
             logger.error(f"Unexpected error fetching weather data: {str(e)}")
             return None
     
-    def transform_weather_data(self, data, location):
+    def observation_marker(self, data):
+        """OpenWeather's ``dt`` is the time of the underlying observation"""
+        dt = data.get('dt')
+        return str(dt) if dt is not None else None
+    
+    def observed_at(self, data):
+        """Provider observation time (naive UTC), or now if the payload has none"""
+        if data.get('dt'):
+            return datetime.utcfromtimestamp(data['dt'])
+        return datetime.utcnow()
+    
+    def transform(self, data, location):
         """Transform API response to measurement format"""
         measurement = {
             'location_name': location['name'],
             'latitude': location['lat'],
             'longitude': location['lon'],
-            'timestamp': datetime.utcnow(),
+            'timestamp': self.observed_at(data),
             'source': 'openweather'
         }
         
@@ -0,0 +1,32 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Registered collectors by source name, in registration order
+COLLECTOR_REGISTRY = {}
+
+def register_collector(source, timeout):
+    """Class decorator registering a collector under ``source``.
+
+    ``timeout`` is the per-run budget in seconds for that source; when it runs
+    out the pipeline keeps whatever the collector gathered so far.
+    """
+    def decorator(cls):
+        if source in COLLECTOR_REGISTRY:
+            logger.warning(f"Collector for {source} registered twice, replacing {COLLECTOR_REGISTRY[source]['class'].__name__}")
+        cls.source = source
+        COLLECTOR_REGISTRY[source] = {'class': cls, 'timeout': timeout}
+        return cls
+    return decorator
+
+def create_collectors(sources=None):
+    """Instantiate registered collectors, optionally restricted to ``sources``"""
+    return {
+        source: entry['class']()
+        for source, entry in COLLECTOR_REGISTRY.items()
+        if sources is None or source in sources
+    }
+
+def get_timeout(source):
+    """Return the per-run timeout configured for ``source``"""
+    return COLLECTOR_REGISTRY[source]['timeout']
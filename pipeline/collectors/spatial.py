@@ -0,0 +1,60 @@
+import math
+from collections import defaultdict
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+class GridIndex:
+    """Uniform lat/lon grid for radius lookups over point sets.
+
+    Cells are ``cell_size_km`` tall; a lookup only inspects the cells that can
+    intersect the search circle instead of every point.
+    """
+
+    def __init__(self, cell_size_km):
+        self.cell_size_km = cell_size_km
+        self.cell_deg = cell_size_km / KM_PER_DEGREE_LAT
+        self.cells = defaultdict(list)
+
+    def __len__(self):
+        return sum(len(items) for items in self.cells.values())
+
+    def cell_of(self, lat, lon):
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def cell_center(self, cell):
+        return ((cell[0] + 0.5) * self.cell_deg, (cell[1] + 0.5) * self.cell_deg)
+
+    def insert(self, lat, lon, item):
+        self.cells[self.cell_of(lat, lon)].append((lat, lon, item))
+
+    def within(self, lat, lon, radius_km):
+        """Return ``(distance_km, item)`` pairs within ``radius_km``, closest first"""
+        row, col = self.cell_of(lat, lon)
+        lat_steps = math.ceil(radius_km / self.cell_size_km)
+        # Longitude degrees shrink towards the poles, so search wider in columns
+        lon_km = self.cell_size_km * max(math.cos(math.radians(lat)), 1e-6)
+        lon_steps = math.ceil(radius_km / lon_km)
+
+        matches = []
+        for r in range(row - lat_steps, row + lat_steps + 1):
+            for c in range(col - lon_steps, col + lon_steps + 1):
+                for item_lat, item_lon, item in self.cells.get((r, c), ()):
+                    distance = haversine_km(lat, lon, item_lat, item_lon)
+                    if distance <= radius_km:
+                        matches.append((distance, item))
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    def nearest(self, lat, lon, radius_km):
+        """Return the closest item within ``radius_km`` or None"""
+        matches = self.within(lat, lon, radius_km)
+        return matches[0][1] if matches else None
@@ -30,6 +30,120 @@ MONITORED_LOCATIONS = [
     }
 ]
 
-# Collection intervals (in minutes)
-WEATHER_COLLECTION_INTERVAL = 30
-AIR_QUALITY_COLLECTION_INTERVAL = 30
\ No newline at end of file
+# Location catalog: 'database' reads the locations table, 'file' reads LOCATIONS_FILE
+# (a JSON list shaped like MONITORED_LOCATIONS). Either falls back to MONITORED_LOCATIONS.
+LOCATIONS_SOURCE = config('LOCATIONS_SOURCE', default='database')
+LOCATIONS_FILE = config('LOCATIONS_FILE', default='')
+
+# Sharding across pipeline workers
+SHARDING_ENABLED = config('SHARDING_ENABLED', default=False, cast=bool)
+SHARD_COUNT = config('SHARD_COUNT', default=64, cast=int)
+SHARD_LEASE_SECONDS = config('SHARD_LEASE_SECONDS', default=300, cast=int)  # renewed every third of a lease
+PIPELINE_WORKER_ID = config('PIPELINE_WORKER_ID', default='')
+PIPELINE_LOCAL_WORKERS = config('PIPELINE_LOCAL_WORKERS', default=1, cast=int)
+
+# Rows per COPY statement when bulk loading into PostgreSQL
+COPY_CHUNK_ROWS = config('COPY_CHUNK_ROWS', default=50000, cast=int)
+
+# Write-ahead spool: batches land on local disk first and a background drainer
+# loads them, so collection keeps going while the database is down. Empty SPOOL_DIR
+# loads directly.
+SPOOL_DIR = config('SPOOL_DIR', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'spool'))
+SPOOL_SEGMENT_BYTES = config('SPOOL_SEGMENT_BYTES', default=16 * 1024 * 1024, cast=int)
+SPOOL_HIGH_WATERMARK_BYTES = config('SPOOL_HIGH_WATERMARK_BYTES', default=1024 * 1024 * 1024, cast=int)  # warn above this backlog
+SPOOL_RETRY_MAX_SECONDS = config('SPOOL_RETRY_MAX_SECONDS', default=60, cast=int)
+
+# Local state that must survive restarts (alert engine snapshot, last job runs)
+STATE_DIR = config('STATE_DIR', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'state'))
+
+# Alerting: 'incremental' evaluates each new batch with AlertEngine, 'window' rescans the last hour
+ALERT_MODE = config('ALERT_MODE', default='incremental')
+ALERT_STATE_PATH = os.path.join(STATE_DIR, 'alert_state.pkl')
+ALERT_RING_SIZE = config('ALERT_RING_SIZE', default=32, cast=int)  # recent readings kept per location and parameter
+
+# Monthly partitions of the measurements table: created PARTITION_MONTHS_AHEAD in advance;
+# expired ones are dropped, or only detached with PARTITION_EXPIRY=detach
+PARTITION_MONTHS_AHEAD = config('PARTITION_MONTHS_AHEAD', default=3, cast=int)
+PARTITION_EXPIRY = config('PARTITION_EXPIRY', default='drop')
+
+# Retention: raw measurements are kept RAW_RETENTION_DAYS and hourly rollups HOURLY_RETENTION_MONTHS
+# (0 keeps them forever); daily rollups are always kept. Expired rows are folded into the rollups
+# first, then purged by the maintenance job RETENTION_CHUNK_ROWS per transaction.
+RAW_RETENTION_DAYS = config('RAW_RETENTION_DAYS', default=90, cast=int)
+HOURLY_RETENTION_MONTHS = config('HOURLY_RETENTION_MONTHS', default=24, cast=int)
+RETENTION_CHUNK_ROWS = config('RETENTION_CHUNK_ROWS', default=5000, cast=int)
+RETENTION_CHUNK_PAUSE = config('RETENTION_CHUNK_PAUSE', default=0.05, cast=float)  # seconds between chunks
+MAINTENANCE_INTERVAL = config('MAINTENANCE_INTERVAL', default=24 * 60, cast=int)  # minutes
+
+# Parquet cold tier: months that ended ARCHIVE_DELAY_DAYS ago are exported under
+# ARCHIVE_DIR before retention purges them. Empty ARCHIVE_DIR disables archiving.
+ARCHIVE_DIR = config('ARCHIVE_DIR', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archive'))
+ARCHIVE_DELAY_DAYS = config('ARCHIVE_DELAY_DAYS', default=2, cast=int)
+ARCHIVE_CHUNK_ROWS = config('ARCHIVE_CHUNK_ROWS', default=50000, cast=int)  # rows fetched per round trip
+
+# Pipeline mode: 'batch' loads once all sources finish, 'stream' loads micro-batches as responses arrive
+PIPELINE_MODE = config('PIPELINE_MODE', default='batch')
+STREAM_BATCH_ROWS = config('STREAM_BATCH_ROWS', default=1000, cast=int)  # flush after this many rows
+STREAM_FLUSH_MS = config('STREAM_FLUSH_MS', default=2000, cast=int)  # or after this many milliseconds
+STREAM_MAX_PENDING = config('STREAM_MAX_PENDING', default=5000, cast=int)  # locations waiting for another source
+
+# Collection intervals (in minutes); sources sharing an interval are collected and merged together
+WEATHER_COLLECTION_INTERVAL = config('WEATHER_COLLECTION_INTERVAL', default=30, cast=int)
+AIR_QUALITY_COLLECTION_INTERVAL = config('AIR_QUALITY_COLLECTION_INTERVAL', default=5, cast=int)
+SOURCE_INTERVALS = {
+    'openweather': WEATHER_COLLECTION_INTERVAL,
+    'openaq': AIR_QUALITY_COLLECTION_INTERVAL
+}
+
+# Monitoring: Prometheus metrics on METRICS_PORT (0 disables, local workers use the following ports)
+# and one JSON summary line per run appended to RUN_SUMMARY_PATH
+METRICS_PORT = config('METRICS_PORT', default=9108, cast=int)
+RUN_SUMMARY_PATH = config('RUN_SUMMARY_PATH', default=os.path.join(STATE_DIR, 'runs.jsonl'))
+
+# Job scheduling
+SCHEDULE_JITTER_SECONDS = config('SCHEDULE_JITTER_SECONDS', default=30, cast=float)  # random delay before each run
+SCHEDULE_DEADLINE_RATIO = config('SCHEDULE_DEADLINE_RATIO', default=0.9, cast=float)  # run budget as a share of the interval
+SCHEDULE_STATE_PATH = os.path.join(STATE_DIR, 'schedule.json')
+
+# HTTP collection
+HTTP_REQUEST_TIMEOUT = config('HTTP_REQUEST_TIMEOUT', default=10, cast=float)  # seconds per request
+HTTP_POOL_SIZE = config('HTTP_POOL_SIZE', default=100, cast=int)
+HTTP_KEEPALIVE_TIMEOUT = config('HTTP_KEEPALIVE_TIMEOUT', default=30, cast=float)
+OPENWEATHER_MAX_CONCURRENCY = config('OPENWEATHER_MAX_CONCURRENCY', default=20, cast=int)
+OPENAQ_MAX_CONCURRENCY = config('OPENAQ_MAX_CONCURRENCY', default=10, cast=int)
+
+# Response cache: skip re-fetching a target within its TTL (seconds) and drop
+# readings whose provider observation time hasn't changed. TTLs default to half the
+# source's interval and must stay below it, or scheduled runs would be skipped
+OPENWEATHER_CACHE_TTL = config('OPENWEATHER_CACHE_TTL', default=WEATHER_COLLECTION_INTERVAL * 60 / 2, cast=float)
+OPENAQ_CACHE_TTL = config('OPENAQ_CACHE_TTL', default=AIR_QUALITY_COLLECTION_INTERVAL * 60 / 2, cast=float)
+RESPONSE_CACHE_MAX_ENTRIES = config('RESPONSE_CACHE_MAX_ENTRIES', default=100000, cast=int)
+RESPONSE_CACHE_PATH = config('RESPONSE_CACHE_PATH', default='')  # SQLite file, empty keeps the cache in memory
+
+# OpenAQ station lookup
+OPENAQ_SEARCH_RADIUS = config('OPENAQ_SEARCH_RADIUS', default=5000, cast=int)  # meters
+OPENAQ_STATION_REFRESH_HOURS = config('OPENAQ_STATION_REFRESH_HOURS', default=24, cast=float)
+
+# Per-source collection budget per run (in seconds)
+OPENWEATHER_COLLECTION_TIMEOUT = config('OPENWEATHER_COLLECTION_TIMEOUT', default=120, cast=float)
+OPENAQ_COLLECTION_TIMEOUT = config('OPENAQ_COLLECTION_TIMEOUT', default=120, cast=float)
+
+# Retry, backoff and circuit breaking for upstream requests
+HTTP_MAX_RETRIES = config('HTTP_MAX_RETRIES', default=3, cast=int)
+HTTP_BACKOFF_BASE = config('HTTP_BACKOFF_BASE', default=0.5, cast=float)  # seconds
+HTTP_BACKOFF_MAX = config('HTTP_BACKOFF_MAX', default=30, cast=float)  # seconds
+CIRCUIT_FAILURE_THRESHOLD = config('CIRCUIT_FAILURE_THRESHOLD', default=5, cast=int)
+CIRCUIT_RESET_TIMEOUT = config('CIRCUIT_RESET_TIMEOUT', default=60, cast=float)  # seconds
+
+# Provider quotas as (requests per second, burst size)
+PROVIDER_RATE_LIMITS = {
+    'openweather': (
+        config('OPENWEATHER_RATE_LIMIT', default=1.0, cast=float),  # free tier: 60 calls/minute
+        config('OPENWEATHER_RATE_BURST', default=5, cast=int)
+    ),
+    'openaq': (
+        config('OPENAQ_RATE_LIMIT', default=1.0, cast=float),  # 60 calls/minute
+        config('OPENAQ_RATE_BURST', default=5, cast=int)
+    ),
+    'default': (1.0, 5)
+}
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Convert gas readings stored in ppm before unit normalisation to µg/m³, then rescore their AQI
+"""
+
+import argparse
+import logging
+from datetime import datetime
+from database import DatabaseManager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--before', type=datetime.fromisoformat,
+        help='Only rows loaded before this ISO timestamp (default: when api.0003 was applied)'
+    )
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    before = args.before or db.legacy_units_cutover()
+    if before is None:
+        logger.error("Migration api.0003 hasn't been applied, pass --before")
+        return 1
+
+    changed = db.convert_legacy_units(before)
+    logger.info(f"Converted rows loaded before {before}: {changed}")
+    if changed['measurements']:
+        db.rescore_aqi(until=before)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,14 +1,114 @@
+import io
 import logging
+import time
 from datetime import datetime
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import QueuePool
 import pandas as pd
-from config import DATABASE_URL
+from config import DATABASE_URL, COPY_CHUNK_ROWS
+from aqi import POLLUTANTS, LEGACY_PPM_LIMITS, compute_aqi, to_micrograms
+from retention import raw_retention_cutoff
+from catalog import LocationCache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Measurement columns alert_configs may set thresholds on
+ALERT_PARAMETERS = ['pm25', 'pm10', 'no2', 'so2', 'co', 'o3', 'aqi', 'temperature', 'humidity']
+
+# Natural key of a measurement: one row per provider observation
+MEASUREMENT_KEY = ['location_id', 'timestamp', 'source']
+
+# Columns refreshed when an observation is loaded again. traffic_level is
+# synthetic and created_at records the first load, so both are kept.
+UPSERT_COLUMNS = [
+    'latitude', 'longitude', 'temperature', 'humidity', 'pressure',
+    'pm25', 'pm10', 'no2', 'so2', 'co', 'o3', 'aqi', 'dominant_pollutant'
+]
+
+# current_measurements holds the latest reading per CURRENT_KEY
+CURRENT_KEY = ['location_id', 'source']
+
+# Measurement fields summarised by the hourly and daily rollup tables
+ROLLUP_FIELDS = [
+    'temperature', 'humidity', 'pressure', 'pm25', 'pm10',
+    'no2', 'so2', 'co', 'o3', 'aqi', 'traffic_level'
+]
+ROLLUP_COLUMNS = ', '.join(f'avg_{f}, min_{f}, max_{f}, count_{f}' for f in ROLLUP_FIELDS)
+ROLLUP_UPDATE = ', '.join(
+    f'{column} = EXCLUDED.{column}'
+    for column in ['sample_count'] + [f'{agg}_{f}' for f in ROLLUP_FIELDS for agg in ('avg', 'min', 'max', 'count')] + ['updated_at']
+)
+
+# Hourly buckets aggregate raw rows (m), daily buckets combine hourly ones (h)
+HOURLY_AGGREGATES = ', '.join(
+    f'AVG(m.{f})::float8, MIN(m.{f})::float8, MAX(m.{f})::float8, COUNT(m.{f})' for f in ROLLUP_FIELDS
+)
+DAILY_AGGREGATES = ', '.join(
+    f'SUM(h.avg_{f} * h.count_{f}) / NULLIF(SUM(h.count_{f}), 0), MIN(h.min_{f}), MAX(h.max_{f}), SUM(h.count_{f})'
+    for f in ROLLUP_FIELDS
+)
+
+# Each statement recomputes only the (location, bucket) pairs passed in :buckets,
+# the hourly ones from raw rows and the daily ones from the hourly rollup
+HOURLY_ROLLUP_SQL = f"""
+    INSERT INTO measurements_hourly (location_id, bucket, sample_count, {ROLLUP_COLUMNS}, updated_at)
+    SELECT t.location_id, t.bucket, COUNT(*), {HOURLY_AGGREGATES}, now()
+    FROM json_to_recordset(CAST(:buckets AS json)) AS t(location_id bigint, bucket timestamptz)
+    JOIN measurements m ON m.location_id = t.location_id
+        AND m.timestamp >= t.bucket AND m.timestamp < t.bucket + interval '1 hour'
+    GROUP BY t.location_id, t.bucket
+    ON CONFLICT (location_id, bucket) DO UPDATE SET {ROLLUP_UPDATE}
+"""
+DAILY_ROLLUP_SQL = f"""
+    INSERT INTO measurements_daily (location_id, bucket, sample_count, {ROLLUP_COLUMNS}, updated_at)
+    SELECT t.location_id, t.bucket, SUM(h.sample_count), {DAILY_AGGREGATES}, now()
+    FROM json_to_recordset(CAST(:buckets AS json)) AS t(location_id bigint, bucket timestamptz)
+    JOIN measurements_hourly h ON h.location_id = t.location_id
+        AND h.bucket >= t.bucket AND h.bucket < t.bucket + interval '1 day'
+    GROUP BY t.location_id, t.bucket
+    ON CONFLICT (location_id, bucket) DO UPDATE SET {ROLLUP_UPDATE}
+"""
+
+# Range variants rebuild every bucket in [:start, :end), used before raw rows are purged.
+# A purge interrupted partway through leaves fewer raw rows than its buckets were
+# built from, so an hourly bucket is only replaced by one covering as many rows.
+HOURLY_RANGE_SQL = f"""
+    INSERT INTO measurements_hourly (location_id, bucket, sample_count, {ROLLUP_COLUMNS}, updated_at)
+    SELECT m.location_id, date_trunc('hour', m.timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+        COUNT(*), {HOURLY_AGGREGATES}, now()
+    FROM measurements m
+    WHERE m.timestamp >= :start AND m.timestamp < :end
+    GROUP BY 1, 2
+    ON CONFLICT (location_id, bucket) DO UPDATE SET {ROLLUP_UPDATE}
+    WHERE EXCLUDED.sample_count >= measurements_hourly.sample_count
+"""
+DAILY_RANGE_SQL = f"""
+    INSERT INTO measurements_daily (location_id, bucket, sample_count, {ROLLUP_COLUMNS}, updated_at)
+    SELECT h.location_id, date_trunc('day', h.bucket AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+        SUM(h.sample_count), {DAILY_AGGREGATES}, now()
+    FROM measurements_hourly h
+    WHERE h.bucket >= :start AND h.bucket < :end
+    GROUP BY 1, 2
+    ON CONFLICT (location_id, bucket) DO UPDATE SET {ROLLUP_UPDATE}
+"""
+
+def _array_literal(values):
+    """Format a Series of numbers or plain words as a Postgres array literal.
+
+    Postgres parses one literal far faster than an ARRAY[...] expression with
+    an element per row, which is how drivers bind Python lists.
+    """
+    return '{' + ','.join(values.astype(str).where(values.notna(), 'NULL').to_numpy(dtype=object)) + '}'
+
+def _utc_naive(timestamps):
+    """Timestamps as naive UTC, the way the pipeline stamps measurements"""
+    timestamps = pd.to_datetime(timestamps)
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_convert('UTC').dt.tz_localize(None)
+    return timestamps
+
 class DatabaseManager:
     def __init__(self):
         self.engine = create_engine(
@@ -19,57 +119,326 @@ class DatabaseManager:
             pool_pre_ping=True
         )
         self.Session = sessionmaker(bind=self.engine)
+        self.locations = LocationCache(self.engine)
         
     def insert_measurements(self, measurements):
-        """Insert multiple measurements into the database"""
-        if not measurements:
+        """Insert multiple measurements (a DataFrame or list of dicts) into the database"""
+        if len(measurements) == 0:
             logger.warning("No measurements to insert")
             return
             
-        session = self.Session()
-        try:
-            # Convert to DataFrame for easier handling
-            df = pd.DataFrame(measurements)
-            
-            # Ensure all required columns exist
-            required_columns = [
-                'location_name', 'latitude', 'longitude', 'timestamp',
-                'source'
-            ]
-            
-            for col in required_columns:
-                if col not in df.columns:
-                    logger.error(f"Missing required column: {col}")
+        df = measurements if isinstance(measurements, pd.DataFrame) else pd.DataFrame(measurements)
+        
+        # Ensure all required columns exist
+        required_columns = [
+            'location_name', 'latitude', 'longitude', 'timestamp',
+            'source'
+        ]
+        
+        for col in required_columns:
+            if col not in df.columns:
+                logger.error(f"Missing required column: {col}")
+                return
+        
+        # Raw rows past retention have been downsampled and purged; loading one back
+        # would rebuild its rollup bucket from that single reading
+        cutoff = raw_retention_cutoff()
+        if cutoff is not None:
+            expired = _utc_naive(df['timestamp']) < cutoff
+            if expired.any():
+                logger.warning(f"Dropping {int(expired.sum())} measurements older than the raw retention window")
+                df = df[~expired]
+                if df.empty:
                     return
-            
-            # Insert using pandas to_sql for efficiency
-            df.to_sql(
-                'measurements',
-                self.engine,
-                if_exists='append',
-                index=False,
-                method='multi'
-            )
-            
-            session.commit()
-            logger.info(f"Successfully inserted {len(measurements)} measurements")
-            
+        
+        try:
+            df = self.locations.attach(df)
+            with self.engine.begin() as conn:
+                changed = self.upsert_measurements(df, conn=conn)
+                if changed:
+                    self.refresh_rollups(df, conn)
+            logger.info(f"Successfully upserted {len(df)} measurements ({changed} new or changed)")
         except Exception as e:
-            session.rollback()
             logger.error(f"Error inserting measurements: {str(e)}")
             raise
+    
+    def upsert_measurements(self, frame, conn=None):
+        """Insert measurements, updating rows that already hold the same observation.
+
+        Rows are keyed on MEASUREMENT_KEY. On PostgreSQL the batch is COPYed
+        into a temporary staging table and merged with one
+        ``INSERT ... ON CONFLICT DO UPDATE``; rows whose values didn't change
+        are left untouched. current_measurements is advanced in the same
+        transaction. Returns the number of rows inserted or updated.
+        Locations given by ``location_name`` are mapped to their ids first.
+        """
+        frame = self.locations.attach(frame).drop_duplicates(MEASUREMENT_KEY, keep='last')
+        if 'created_at' not in frame.columns:
+            frame = frame.assign(created_at=datetime.utcnow())
+        if conn is None:
+            with self.engine.begin() as conn:
+                return self._upsert_measurements(conn, frame)
+        return self._upsert_measurements(conn, frame)
+    
+    def _upsert_measurements(self, conn, frame):
+        columns = ', '.join(frame.columns)
+        updates = [column for column in UPSERT_COLUMNS if column in frame.columns]
+        conflict = f"ON CONFLICT ({', '.join(MEASUREMENT_KEY)}) DO NOTHING"
+        if updates:
+            conflict = f"""
+                ON CONFLICT ({', '.join(MEASUREMENT_KEY)}) DO UPDATE
+                SET {', '.join(f'{column} = EXCLUDED.{column}' for column in updates)}
+            """
+
+        if conn.dialect.name != 'postgresql':
+            changed = self._write_rows(conn, 'measurements', frame, conflict)
+            latest = frame.sort_values('timestamp').drop_duplicates(CURRENT_KEY, keep='last')
+            latest = latest.drop(columns='created_at').assign(updated_at=datetime.utcnow())
+            self._write_rows(conn, 'current_measurements', latest, self._current_conflict(latest))
+            return changed
+
+        if updates:
+            conflict += f"""
+                WHERE ({', '.join(f'measurements.{column}' for column in updates)})
+                IS DISTINCT FROM ({', '.join(f'EXCLUDED.{column}' for column in updates)})
+            """
+        conn.execute(text(f"""
+            CREATE TEMPORARY TABLE measurements_staging ON COMMIT DROP AS
+            SELECT {columns} FROM measurements WITH NO DATA
+        """))
+        self.bulk_insert('measurements_staging', frame, conn=conn)
+        result = conn.execute(text(f"""
+            INSERT INTO measurements ({columns})
+            SELECT {columns} FROM measurements_staging
+            {conflict}
+        """))
+        current = [column for column in frame.columns if column != 'created_at']
+        conn.execute(text(f"""
+            INSERT INTO current_measurements ({', '.join(current)}, updated_at)
+            SELECT DISTINCT ON ({', '.join(CURRENT_KEY)}) {', '.join(current)}, now()
+            FROM measurements_staging
+            ORDER BY {', '.join(CURRENT_KEY)}, timestamp DESC
+            {self._current_conflict(frame)}
+        """))
+        conn.execute(text("DROP TABLE measurements_staging"))
+        return result.rowcount
+    
+    def _current_conflict(self, frame):
+        """ON CONFLICT clause that only moves a current_measurements row forward in time"""
+        updates = [column for column in frame.columns if column not in CURRENT_KEY + ['created_at', 'updated_at']]
+        return f"""
+            ON CONFLICT ({', '.join(CURRENT_KEY)}) DO UPDATE
+            SET {', '.join(f'{column} = EXCLUDED.{column}' for column in updates)}, updated_at = EXCLUDED.updated_at
+            WHERE EXCLUDED.timestamp >= current_measurements.timestamp
+            AND ({', '.join(f'current_measurements.{column}' for column in updates)})
+            IS DISTINCT FROM ({', '.join(f'EXCLUDED.{column}' for column in updates)})
+        """
+    
+    def refresh_rollups(self, frame, conn):
+        """Recompute the hourly and daily rollup buckets the measurements in ``frame`` fall in"""
+        if conn.dialect.name != 'postgresql' or frame.empty:
+            return
+        timestamps = _utc_naive(frame['timestamp'])
+        hours = pd.DataFrame({
+            'location_id': frame['location_id'].to_numpy(),
+            'bucket': timestamps.dt.floor('h').to_numpy()
+        }).drop_duplicates()
+        days = hours.assign(bucket=hours['bucket'].dt.floor('D')).drop_duplicates()
+
+        started = time.perf_counter()
+        for sql, buckets in ((HOURLY_ROLLUP_SQL, hours), (DAILY_ROLLUP_SQL, days)):
+            payload = buckets.assign(bucket=buckets['bucket'].dt.strftime('%Y-%m-%dT%H:%M:%S+00:00'))
+            conn.execute(text(sql), {"buckets": payload.to_json(orient='records')})
+        logger.info(
+            f"Refreshed {len(hours)} hourly and {len(days)} daily rollups in {time.perf_counter() - started:.2f}s"
+        )
+    
+    def downsample(self, conn, start, end):
+        """Rebuild the hourly and daily rollups for [start, end) from raw rows; both must be UTC midnights"""
+        bounds = {"start": start, "end": end}
+        hourly = conn.execute(text(HOURLY_RANGE_SQL), bounds).rowcount
+        daily = conn.execute(text(DAILY_RANGE_SQL), bounds).rowcount
+        return hourly, daily
+    
+    def bulk_insert(self, table, frame, conn=None):
+        """Append a DataFrame to ``table``; returns the number of rows written.
+
+        PostgreSQL loads through ``COPY FROM STDIN`` in chunks of
+        COPY_CHUNK_ROWS, other databases through executemany. ``created_at``
+        is filled in when the frame doesn't carry it. Pass ``conn`` to load
+        inside an existing transaction.
+        """
+        if frame.empty:
+            return 0
+        if 'created_at' not in frame.columns:
+            frame = frame.assign(created_at=datetime.utcnow())
+
+        started = time.perf_counter()
+        if conn is None:
+            with self.engine.begin() as conn:
+                self._write_rows(conn, table, frame)
+        else:
+            self._write_rows(conn, table, frame)
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Loaded {len(frame)} rows into {table} in {elapsed:.2f}s ({len(frame) / max(elapsed, 1e-6):.0f} rows/s)")
+        return len(frame)
+    
+    def _write_rows(self, conn, table, frame, conflict=''):
+        """Write ``frame`` into ``table``; ``conflict`` is an ON CONFLICT clause (non-COPY path only)"""
+        # Columns that are empty for the whole batch take their NULL default for free
+        frame = frame[[column for column in frame.columns if frame[column].notna().any()]]
+        columns = list(frame.columns)
+        if conn.dialect.name != 'postgresql':
+            rows = frame.astype(object).where(frame.notna(), None).to_dict('records')
+            for row in rows:
+                for column, value in row.items():
+                    if isinstance(value, pd.Timestamp):
+                        row[column] = value.to_pydatetime()
+            result = conn.execute(
+                text(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)}) {conflict}"),
+                rows
+            )
+            return result.rowcount
+
+        # Unquoted empty CSV fields are NULL to COPY
+        copy = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+        cursor = conn.connection.cursor()
+        try:
+            for start in range(0, len(frame), COPY_CHUNK_ROWS):
+                buffer = io.StringIO()
+                frame.iloc[start:start + COPY_CHUNK_ROWS].to_csv(buffer, header=False, index=False)
+                buffer.seek(0)
+                cursor.copy_expert(copy, buffer)
         finally:
-            session.close()
+            cursor.close()
+        return len(frame)
+    
+    def legacy_units_cutover(self):
+        """When the migration that came with µg/m³ normalisation was applied, or None"""
+        with self.engine.connect() as conn:
+            return conn.execute(text("""
+                SELECT applied FROM django_migrations
+                WHERE app = 'api' AND name = '0003_measurement_dominant_pollutant'
+            """)).scalar()
     
+    def convert_legacy_units(self, before):
+        """Convert gas readings stored in ppm before ``before`` to µg/m³.
+
+        Rows loaded before the pipeline normalised units hold gases as
+        OpenAQ reported them, in ppm or µg/m³. A station reports a parameter
+        in one unit, so a location's series - its raw rows, current row and
+        rollups together - is converted as a whole in every table when all of
+        it lies below LEGACY_PPM_LIMITS. Rollups cover buckets whose raw rows
+        were purged. Converted series end up far above the limits, so running
+        this again changes nothing. Returns the number of rows changed per table.
+        """
+        changed = dict.fromkeys(('measurements', 'current_measurements', 'measurements_hourly', 'measurements_daily'), 0)
+        with self.engine.begin() as conn:
+            for gas, limit in LEGACY_PPM_LIMITS.items():
+                params = {"before": before, "limit": limit, "factor": to_micrograms(gas, 1.0, 'ppm')}
+                # Decide on every location before any table is scaled
+                params["locations"] = conn.execute(text(f"""
+                    SELECT location_id FROM (
+                        SELECT location_id, {gas} AS value FROM measurements WHERE created_at < :before
+                        UNION ALL
+                        SELECT location_id, {gas} FROM current_measurements WHERE updated_at < :before
+                        UNION ALL
+                        SELECT location_id, max_{gas} FROM measurements_hourly WHERE bucket < :before
+                        UNION ALL
+                        SELECT location_id, max_{gas} FROM measurements_daily WHERE bucket < :before
+                    ) series
+                    WHERE value IS NOT NULL
+                    GROUP BY location_id HAVING MAX(value) < :limit
+                """), params).scalars().all()
+                if not params["locations"]:
+                    continue
+                statements = {
+                    'measurements': f"""
+                        UPDATE measurements SET {gas} = {gas} * :factor
+                        WHERE created_at < :before AND {gas} IS NOT NULL AND location_id = ANY(:locations)
+                    """,
+                    'current_measurements': f"""
+                        UPDATE current_measurements SET {gas} = {gas} * :factor
+                        WHERE updated_at < :before AND {gas} IS NOT NULL AND location_id = ANY(:locations)
+                    """
+                }
+                for table in ('measurements_hourly', 'measurements_daily'):
+                    statements[table] = f"""
+                        UPDATE {table}
+                        SET avg_{gas} = avg_{gas} * :factor, min_{gas} = min_{gas} * :factor, max_{gas} = max_{gas} * :factor
+                        WHERE bucket < :before AND max_{gas} IS NOT NULL AND location_id = ANY(:locations)
+                    """
+                for table, sql in statements.items():
+                    rows = conn.execute(text(sql), params).rowcount
+                    changed[table] += rows
+                    if rows:
+                        logger.info(f"Converted {gas} from ppm in {rows} {table} rows")
+        return changed
+    
+    def rescore_aqi(self, since=None, until=None, chunk_size=50000):
+        """Recompute AQI and dominant pollutant for stored measurements.
+
+        Rows are read in id-ordered chunks, scored as whole arrays and written
+        back with one UPDATE per chunk. Returns the number of rows rescored.
+        """
+        conditions = ["id > :last_id"]
+        if since is not None:
+            conditions.append("timestamp >= :since")
+        if until is not None:
+            conditions.append("timestamp < :until")
+        select = text(f"""
+            SELECT id, {', '.join(f'CAST({p} AS double precision) AS {p}' for p in POLLUTANTS)}
+            FROM measurements
+            WHERE {' AND '.join(conditions)}
+            ORDER BY id
+            LIMIT :chunk_size
+        """)
+        update = text("""
+            UPDATE measurements m
+            SET aqi = s.aqi, dominant_pollutant = s.dominant_pollutant
+            FROM (
+                SELECT unnest(CAST(:ids AS bigint[])) AS id,
+                       unnest(CAST(:aqis AS integer[])) AS aqi,
+                       unnest(CAST(:dominant AS varchar[])) AS dominant_pollutant
+            ) s
+            WHERE m.id = s.id
+            AND (m.aqi IS DISTINCT FROM s.aqi OR m.dominant_pollutant IS DISTINCT FROM s.dominant_pollutant)
+        """)
+
+        params = {"last_id": 0, "since": since, "until": until, "chunk_size": chunk_size}
+        total = 0
+        started = datetime.utcnow()
+        while True:
+            with self.engine.begin() as conn:
+                result = conn.execute(select, params)
+                chunk = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+                if chunk.empty:
+                    break
+                aqi, dominant = compute_aqi(chunk)
+                conn.execute(update, {
+                    "ids": _array_literal(chunk['id']),
+                    "aqis": _array_literal(pd.Series(aqi).astype('Int64')),
+                    "dominant": _array_literal(pd.Series(dominant))
+                })
+            total += len(chunk)
+            params["last_id"] = int(chunk['id'].iloc[-1])
+            logger.info(f"Rescored {total} measurements (up to id {params['last_id']})")
+
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        logger.info(f"Rescored AQI for {total} measurements in {elapsed:.1f}s")
+        return total
+
     def get_latest_measurement(self, location_name):
-        """Get the latest measurement for a location"""
+        """Get the latest measurement for a location, across its sources"""
         session = self.Session()
         try:
             result = session.execute(
                 text("""
-                    SELECT * FROM measurements 
-                    WHERE location_name = :location_name 
-                    ORDER BY timestamp DESC 
+                    SELECT l.name AS location_name, c.* FROM current_measurements c
+                    JOIN locations l ON l.id = c.location_id
+                    WHERE l.name = :location_name 
+                    ORDER BY c.timestamp DESC 
                     LIMIT 1
                 """),
                 {"location_name": location_name}
@@ -84,82 +453,57 @@ class DatabaseManager:
             session.close()
     
     def check_alert_thresholds(self):
-        """Check if any measurements exceed alert thresholds"""
-        session = self.Session()
+        """Check if any measurements exceed alert thresholds.
+
+        One statement unpivots the last hour of measurements into
+        (parameter, value) readings, joins them with the enabled configs, keeps
+        the highest threshold breached per location and parameter, skips
+        pairs that already have an active alert from the last 6 hours and
+        inserts the rest.
+        """
+        readings = ', '.join(
+            f"('{parameter}', CAST(m.{parameter} AS numeric))" for parameter in ALERT_PARAMETERS
+        )
         try:
-            # Get active alert configurations
-            configs = session.execute(
-                text("SELECT * FROM alert_configs WHERE is_enabled = true")
-            ).fetchall()
-            
-            alerts = []
-            
-            for config in configs:
-                # Validate parameter name to prevent SQL injection
-                allowed_parameters = ['pm25', 'pm10', 'no2', 'so2', 'co', 'o3', 'temperature', 'humidity']
-                if config.parameter not in allowed_parameters:
-                    logger.warning(f"Invalid parameter in alert config: {config.parameter}")
-                    continue
-                    
-                # Check recent measurements against thresholds
-                query = f"""
-                    SELECT * FROM measurements 
-                    WHERE {config.parameter} > :threshold 
-                    AND timestamp > NOW() - INTERVAL '1 hour'
-                    ORDER BY timestamp DESC
-                """
-                
-                result = session.execute(
-                    text(query),
-                    {"threshold": config.threshold_value}
-                ).fetchall()
-                
-                for measurement in result:
-                    # Create alert if not already exists
-                    existing = session.execute(
-                        text("""
-                            SELECT id FROM alerts 
-                            WHERE location_name = :location 
-                            AND alert_type = :type 
-                            AND is_active = true
-                            AND created_at > NOW() - INTERVAL '6 hours'
-                        """),
-                        {
-                            "location": measurement.location_name,
-                            "type": config.parameter
-                        }
-                    ).fetchone()
-                    
-                    if not existing:
-                        # Safely get measurement value
-                        actual_value = getattr(measurement, config.parameter, None)
-                        if actual_value is not None:
-                            alert = {
-                                'alert_type': config.parameter,
-                                'severity': config.severity,
-                                'location_name': measurement.location_name,
-                                'message': f"{config.parameter.upper()} exceeded threshold at {measurement.location_name}: {actual_value:.2f}",
-                                'threshold_value': float(config.threshold_value),
-                                'actual_value': float(actual_value),
-                                'is_active': True,
-                                'created_at': datetime.utcnow()
-                            }
-                            alerts.append(alert)
-            
-            if alerts:
-                # Insert alerts
-                pd.DataFrame(alerts).to_sql(
-                    'alerts',
-                    self.engine,
-                    if_exists='append',
-                    index=False
-                )
-                logger.info(f"Created {len(alerts)} new alerts")
-            
-            session.commit()
-            
+            with self.engine.begin() as conn:
+                result = conn.execute(text(f"""
+                    WITH readings AS (
+                        SELECT m.location_id, m.timestamp, r.parameter, r.value
+                        FROM measurements m
+                        CROSS JOIN LATERAL (VALUES {readings}) AS r(parameter, value)
+                        WHERE m.timestamp > NOW() - INTERVAL '1 hour'
+                        AND r.value IS NOT NULL
+                    ),
+                    breaches AS (
+                        SELECT DISTINCT ON (r.location_id, c.parameter)
+                            c.id AS config_id, c.parameter, c.severity, c.threshold_value, r.location_id, r.value
+                        FROM readings r
+                        JOIN alert_configs c
+                            ON c.parameter = r.parameter
+                            AND c.is_enabled = true
+                            AND r.value > c.threshold_value
+                        ORDER BY r.location_id, c.parameter, c.threshold_value DESC, r.timestamp DESC
+                    )
+                    INSERT INTO alerts (
+                        alert_type, severity, location_id, config_id, message,
+                        threshold_value, actual_value, is_active, created_at
+                    )
+                    SELECT
+                        b.parameter, b.severity, b.location_id, b.config_id,
+                        UPPER(b.parameter) || ' exceeded threshold at ' || l.name
+                            || ': ' || CAST(ROUND(b.value, 2) AS text),
+                        b.threshold_value, b.value, true, NOW()
+                    FROM breaches b
+                    JOIN locations l ON l.id = b.location_id
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM alerts a
+                        WHERE a.location_id = b.location_id
+                        AND a.alert_type = b.parameter
+                        AND a.is_active = true
+                        AND a.created_at > NOW() - INTERVAL '6 hours'
+                    )
+                """))
+            if result.rowcount:
+                logger.info(f"Created {result.rowcount} new alerts")
         except Exception as e:
-            session.rollback()
             logger.error(f"Error checking alert thresholds: {str(e)}")
-        finally:
-            session.close()
\ No newline at end of file
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from config import SCHEDULE_JITTER_SECONDS, SCHEDULE_DEADLINE_RATIO, SCHEDULE_STATE_PATH
+
+logger = logging.getLogger(__name__)
+
+async def run_in_thread(func, *args):
+    """Run ``func`` in the default executor.
+
+    A thread can't be interrupted, so when the awaiting job is cancelled
+    this waits for ``func`` to return before passing the cancellation on.
+    """
+    future = asyncio.get_running_loop().run_in_executor(None, func, *args)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        await asyncio.gather(future, return_exceptions=True)
+        raise
+
+class Job:
+    """A coroutine function run every ``interval`` seconds.
+
+    Each run is cancelled once ``deadline`` seconds pass (a fraction of the
+    interval by default), so a slow run never spills into the next one.
+    Work a run hands to ``run_in_thread`` is finished before it counts as
+    cancelled, so the next run never overlaps it.
+    """
+
+    def __init__(self, name, func, interval, jitter=SCHEDULE_JITTER_SECONDS, deadline=None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        # Never jitter by more than a tenth of the cadence
+        self.jitter = min(jitter, interval / 10)
+        self.deadline = deadline if deadline is not None else interval * SCHEDULE_DEADLINE_RATIO
+
+class AsyncScheduler:
+    """Runs jobs on independent cadences inside one event loop.
+
+    Every job has its own loop, so a job is never running twice at once and
+    a slow job doesn't delay the others. Ticks that pass while a run is in
+    progress are skipped rather than queued. The start time of each job's
+    last run is kept in ``state_path``; after downtime an overdue job runs
+    once straight away, otherwise it waits out the rest of its interval.
+    """
+
+    def __init__(self, jobs, state_path=SCHEDULE_STATE_PATH):
+        self.jobs = list(jobs)
+        self.state_path = state_path
+        self.last_runs = self._load_state()
+
+    async def run(self):
+        """Run every job until cancelled"""
+        tasks = [asyncio.create_task(self._run_job(job), name=f"job-{job.name}") for job in self.jobs]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run_job(self, job):
+        due = self._first_due(job)
+        while True:
+            await asyncio.sleep(max(due - time.time(), 0) + random.uniform(0, job.jitter))
+
+            started = time.time()
+            self.last_runs[job.name] = started
+            self._save_state()
+            try:
+                await asyncio.wait_for(job.func(), timeout=job.deadline)
+                logger.info(f"Job {job.name} finished in {time.time() - started:.1f}s")
+            except asyncio.TimeoutError:
+                logger.warning(f"Job {job.name} cancelled after its {job.deadline:.0f}s deadline")
+            except Exception as e:
+                logger.error(f"Job {job.name} failed: {str(e)}", exc_info=True)
+
+            # Stay on the job's own grid, skipping ticks that passed during the run
+            due += job.interval
+            if due <= time.time():
+                skipped = int((time.time() - due) // job.interval) + 1
+                logger.warning(f"Job {job.name} overran, skipping {skipped} scheduled runs")
+                due += skipped * job.interval
+
+    def _first_due(self, job):
+        last = self.last_runs.get(job.name)
+        now = time.time()
+        if last is None:
+            return now
+        if last + job.interval <= now:
+            missed = int((now - last) // job.interval)
+            logger.info(f"Job {job.name} missed {missed} runs while stopped, catching up now")
+            return now
+        logger.info(f"Job {job.name} last ran {now - last:.0f}s ago, next run in {last + job.interval - now:.0f}s")
+        return last + job.interval
+
+    def _load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading schedule state: {str(e)}")
+            return {}
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+            partial = f"{self.state_path}.tmp"
+            with open(partial, 'w') as f:
+                json.dump(self.last_runs, f)
+            os.replace(partial, self.state_path)
+        except OSError as e:
+            logger.error(f"Error saving schedule state: {str(e)}")
@@ -0,0 +1,129 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+from config import METRICS_PORT, RUN_SUMMARY_PATH
+
+logger = logging.getLogger(__name__)
+
+# Stages of a run: collect (per source), transform, load, alerts, plus drain for the spool thread
+STAGE_SECONDS = Histogram(
+    'pipeline_stage_duration_seconds', 'Time spent in each pipeline stage',
+    ['stage', 'source'], buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+)
+STAGE_ROWS = Counter('pipeline_rows_total', 'Rows leaving each pipeline stage', ['stage', 'source'])
+STAGE_ERRORS = Counter('pipeline_errors_total', 'Failures in each pipeline stage', ['stage', 'source'])
+RUNS = Counter('pipeline_runs_total', 'Completed pipeline runs', ['job', 'status'])
+
+FETCH_SECONDS = Histogram(
+    'collector_fetch_duration_seconds', 'Upstream request latency per target',
+    ['source'], buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+)
+FETCHES = Counter('collector_fetches_total', 'Targets processed by outcome', ['source', 'outcome'])
+INFLIGHT = Gauge('collector_inflight_requests', 'Upstream requests in progress', ['source'])
+COLLECTOR_QUEUE = Gauge('collector_queue_depth', 'Responses waiting for the stream consumer', ['source'])
+
+STREAM_PENDING = Gauge('stream_pending_locations', 'Locations waiting for another source to report')
+STREAM_BUFFERED = Gauge('stream_buffered_rows', 'Rows buffered for the next micro-batch load')
+SPOOL_PENDING_BYTES = Gauge('spool_pending_bytes', 'Spooled bytes not yet loaded')
+SPOOL_PENDING_SEGMENTS = Gauge('spool_pending_segments', 'Spool segments not yet loaded')
+
+def start_metrics_server(port=METRICS_PORT):
+    """Serve every metric in Prometheus text format on ``port``; 0 disables it"""
+    if not port:
+        return
+    start_http_server(port)
+    logger.info(f"Serving metrics on port {port}")
+
+def watch_spool(spool):
+    """Report the spool backlog whenever metrics are scraped"""
+    SPOOL_PENDING_BYTES.set_function(spool.pending_bytes)
+    SPOOL_PENDING_SEGMENTS.set_function(lambda: spool.metrics()['pending_segments'])
+
+@contextmanager
+def timed(stage, source='all'):
+    """Observe the duration of a block, counting it as an error if it raises"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(stage, source).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(stage, source).observe(time.perf_counter() - started)
+
+class RunSummary:
+    """Stage timings, row counts and errors for one pipeline run.
+
+    Everything recorded is also exported to Prometheus. ``finish`` logs the
+    summary and appends it as one JSON line to ``RUN_SUMMARY_PATH``.
+    """
+
+    _write_lock = threading.Lock()
+
+    def __init__(self, job, path=RUN_SUMMARY_PATH):
+        self.job = job
+        self.path = path
+        self.started_at = datetime.utcnow()
+        self._started = time.perf_counter()
+        self.stages = defaultdict(float)
+        self.rows = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.extra = {}
+
+    @contextmanager
+    def stage(self, stage, source='all'):
+        """Time a block as part of this run"""
+        key = self._key(stage, source)
+        started = time.perf_counter()
+        try:
+            with timed(stage, source):
+                yield
+        except Exception:
+            self.errors[key] += 1
+            raise
+        finally:
+            self.stages[key] += time.perf_counter() - started
+
+    def count(self, stage, rows, source='all'):
+        STAGE_ROWS.labels(stage, source).inc(rows)
+        self.rows[self._key(stage, source)] += rows
+
+    def error(self, stage, exception, source='all'):
+        """Count a failure outside any timed stage and keep its message for the summary"""
+        STAGE_ERRORS.labels(stage, source).inc()
+        self.errors[self._key(stage, source)] += 1
+        self.extra['error'] = f"{type(exception).__name__}: {exception}"
+
+    def _key(self, stage, source):
+        return stage if source == 'all' else f"{stage}.{source}"
+
+    def finish(self, status='ok'):
+        duration = time.perf_counter() - self._started
+        RUNS.labels(self.job, status).inc()
+        STAGE_SECONDS.labels('run', self.job).observe(duration)
+        summary = {
+            'job': self.job,
+            'status': status,
+            'started_at': self.started_at.isoformat(),
+            'duration_seconds': round(duration, 3),
+            'stages': {stage: round(seconds, 3) for stage, seconds in self.stages.items()},
+            'rows': dict(self.rows),
+            'errors': dict(self.errors),
+            **self.extra
+        }
+        line = json.dumps(summary, default=str)
+        logger.info(f"Run summary: {line}")
+        if self.path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with self._write_lock, open(self.path, 'a') as f:
+                    f.write(line + '\n')
+            except OSError as e:
+                logger.error(f"Error writing run summary: {str(e)}")
+        return summary
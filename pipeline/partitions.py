@@ -0,0 +1,102 @@
+import logging
+import re
+from datetime import datetime
+from sqlalchemy import text
+from config import PARTITION_MONTHS_AHEAD, PARTITION_EXPIRY
+
+logger = logging.getLogger(__name__)
+
+PARENT = 'measurements'
+DEFAULT_PARTITION = 'measurements_default'
+PARTITION_NAME = re.compile(r'^measurements_(\d{4})_(\d{2})$')
+# pg_try_advisory_xact_lock key, so only one worker maintains partitions at a time
+MAINTENANCE_LOCK = 0x6d656173
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+class PartitionManager:
+    """Keeps the monthly partitions of ``measurements`` rolling.
+
+    Partitions are created ``months_ahead`` months in advance. Rows that
+    already landed in the default partition for a month that gets created
+    are moved into it. ``expire`` detaches (kept as a plain table) or drops
+    a partition according to ``expiry``; the retention policy decides when.
+    """
+
+    def __init__(self, engine, months_ahead=PARTITION_MONTHS_AHEAD, expiry=PARTITION_EXPIRY):
+        self.engine = engine
+        self.months_ahead = months_ahead
+        self.expiry = expiry
+
+    def partitions(self, conn):
+        """Month (first day) of every attached monthly partition"""
+        rows = conn.execute(text("""
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :parent
+        """), {"parent": PARENT}).scalars()
+        months = []
+        for name in rows:
+            match = PARTITION_NAME.match(name)
+            if match:
+                months.append(datetime(int(match.group(1)), int(match.group(2)), 1))
+        return sorted(months)
+
+    def is_partitioned(self, conn):
+        if conn.dialect.name != 'postgresql':
+            return False
+        kind = conn.execute(text("SELECT relkind FROM pg_class WHERE relname = :parent"), {"parent": PARENT}).scalar()
+        return kind == 'p'
+
+    def maintain(self):
+        """Create upcoming partitions; returns the months created"""
+        with self.engine.begin() as conn:
+            if not self.is_partitioned(conn):
+                logger.info("measurements isn't partitioned, skipping partition maintenance")
+                return []
+            if not conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": MAINTENANCE_LOCK}).scalar():
+                logger.info("Partition maintenance already running elsewhere")
+                return []
+
+            existing = set(self.partitions(conn))
+            current = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            created = []
+            for offset in range(self.months_ahead + 1):
+                month = add_months(current, offset)
+                if month not in existing:
+                    self._create(conn, month)
+                    created.append(month)
+
+        if created:
+            logger.info(f"Created measurement partitions {[f'{m:%Y_%m}' for m in created]}")
+        return created
+
+    def _create(self, conn, month):
+        name = f"{PARENT}_{month:%Y_%m}"
+        bounds = {"start": month, "end": add_months(month, 1)}
+        conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS)"))
+        # Attaching validates the default partition holds no rows for the new range, so move them first
+        if conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": DEFAULT_PARTITION}).scalar():
+            conn.execute(text(f"""
+                WITH moved AS (
+                    DELETE FROM {DEFAULT_PARTITION}
+                    WHERE timestamp >= CAST(:start AS timestamp) AT TIME ZONE 'UTC'
+                    AND timestamp < CAST(:end AS timestamp) AT TIME ZONE 'UTC'
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+            """), bounds)
+        conn.execute(text(f"""
+            ALTER TABLE {PARENT} ATTACH PARTITION {name}
+            FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') TO ('{add_months(month, 1):%Y-%m-%d} 00:00:00+00')
+        """))
+
+    def expire(self, conn, month):
+        """Detach the partition for ``month``, dropping it unless ``expiry`` is 'detach'"""
+        name = f"{PARENT}_{month:%Y_%m}"
+        conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+        if self.expiry == 'drop':
+            conn.execute(text(f"DROP TABLE {name}"))
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Recompute AQI and dominant pollutant for historical measurements
+"""
+
+import argparse
+import logging
+from datetime import datetime
+from database import DatabaseManager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--since', type=datetime.fromisoformat, help='Only rows at or after this ISO timestamp')
+    parser.add_argument('--until', type=datetime.fromisoformat, help='Only rows before this ISO timestamp')
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    db.rescore_aqi(since=args.since, until=args.until, chunk_size=args.chunk_size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from partitions import add_months
+from config import (
+    RAW_RETENTION_DAYS, HOURLY_RETENTION_MONTHS,
+    RETENTION_CHUNK_ROWS, RETENTION_CHUNK_PAUSE
+)
+
+logger = logging.getLogger(__name__)
+
+# pg_try_advisory_lock key, held for a whole run so only one worker purges at a time
+RETENTION_LOCK = 0x72657465
+
+def raw_retention_cutoff(days=RAW_RETENTION_DAYS):
+    """UTC midnight before which raw measurements expire, or None when they're kept forever"""
+    if days <= 0:
+        return None
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=days)
+
+class RetentionManager:
+    """Downsamples and purges aged data so storage stays bounded.
+
+    Raw measurements older than ``raw_days`` are folded into the hourly and
+    daily rollups, then deleted: monthly partitions that are entirely past
+    the cutoff are dropped whole, anything else is deleted a day at a time
+    in transactions of ``chunk_rows`` rows so no lock is held for long.
+    A run that dies partway through a day resumes safely: downsampling never
+    replaces a bucket with one built from fewer raw rows.
+    Hourly rollups older than ``hourly_months`` are purged the same way.
+    Daily rollups are kept forever, so long-range trends stay queryable.
+    """
+
+    def __init__(self, db, partitions, raw_days=RAW_RETENTION_DAYS, hourly_months=HOURLY_RETENTION_MONTHS,
+                 chunk_rows=RETENTION_CHUNK_ROWS, pause=RETENTION_CHUNK_PAUSE):
+        self.db = db
+        self.partitions = partitions
+        self.raw_days = raw_days
+        self.hourly_months = hourly_months
+        self.chunk_rows = chunk_rows
+        self.pause = pause
+
+    def run(self):
+        """Apply the policy once; returns what was removed"""
+        if self.db.engine.dialect.name != 'postgresql':
+            logger.info("Retention needs the PostgreSQL rollups, skipping")
+            return {}
+
+        started = time.perf_counter()
+        purged = {'partitions': [], 'raw_rows': 0, 'hourly_rows': 0}
+        with self.db.engine.connect() as lock:
+            if not lock.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": RETENTION_LOCK}).scalar():
+                logger.info("Retention already running elsewhere")
+                return {}
+            lock.commit()
+            try:
+                cutoff = raw_retention_cutoff(self.raw_days)
+                if cutoff is not None:
+                    purged['partitions'] = self._drop_partitions(cutoff)
+                    purged['raw_rows'] = self._purge_raw(cutoff)
+                if self.hourly_months > 0:
+                    month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+                    purged['hourly_rows'] = self._purge_chunks(
+                        'measurements_hourly', 'bucket', add_months(month, -self.hourly_months)
+                    )
+            finally:
+                lock.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": RETENTION_LOCK})
+                lock.commit()
+
+        logger.info(
+            f"Retention dropped partitions {[f'{m:%Y_%m}' for m in purged['partitions']]}, "
+            f"purged {purged['raw_rows']} raw and {purged['hourly_rows']} hourly rows "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        return purged
+
+    def _drop_partitions(self, cutoff):
+        with self.db.engine.connect() as conn:
+            if not self.partitions.is_partitioned(conn):
+                return []
+            expired = [month for month in self.partitions.partitions(conn) if add_months(month, 1) <= cutoff]
+
+        dropped = []
+        for month in expired:
+            with self.db.engine.begin() as conn:
+                self.db.downsample(conn, month, add_months(month, 1))
+            try:
+                with self.db.engine.begin() as conn:
+                    # Detaching locks the parent; give up rather than queue behind long queries
+                    conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+                    self.partitions.expire(conn, month)
+                dropped.append(month)
+            except Exception as e:
+                logger.warning(f"Couldn't expire partition {month:%Y_%m}, retrying next run: {str(e)}")
+        return dropped
+
+    def _purge_raw(self, cutoff):
+        """Downsample and delete raw rows before ``cutoff`` one UTC day at a time, oldest first"""
+        with self.db.engine.connect() as conn:
+            oldest = conn.execute(
+                text("SELECT MIN(timestamp) FROM measurements WHERE timestamp < :cutoff"), {"cutoff": cutoff}
+            ).scalar()
+        if oldest is None:
+            return 0
+
+        purged = 0
+        day = oldest.replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+        while day < cutoff:
+            end = day + timedelta(days=1)
+            with self.db.engine.begin() as conn:
+                self.db.downsample(conn, day, end)
+            purged += self._purge_chunks('measurements', 'timestamp', end, since=day)
+            day = end
+        return purged
+
+    def _purge_chunks(self, table, column, before, since=None):
+        """Delete rows of ``table`` with ``column`` in [since, before), ``chunk_rows`` per transaction"""
+        window = f"{column} < :before" + (f" AND {column} >= :since" if since is not None else '')
+        # Repeating the window outside the subquery lets PostgreSQL prune partitions
+        delete = text(f"""
+            DELETE FROM {table}
+            WHERE id IN (SELECT id FROM {table} WHERE {window} LIMIT :limit)
+            AND {window}
+        """)
+        params = {"before": before, "since": since, "limit": self.chunk_rows}
+        total = 0
+        while True:
+            with self.db.engine.begin() as conn:
+                deleted = conn.execute(delete, params).rowcount
+            total += deleted
+            if deleted < self.chunk_rows:
+                return total
+            time.sleep(self.pause)
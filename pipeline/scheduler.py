@@ -1,11 +1,31 @@
-import schedule
-import time
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
 import logging
-from collectors.openweather import OpenWeatherCollector
-from collectors.openaq import OpenAQCollector
+from collectors.http_client import close_clients
+from collectors.registry import create_collectors, get_timeout
+# Importing the collector modules registers them with the pipeline
+from collectors import openweather, openaq  # noqa: F401
 from transformers.data_transformer import DataTransformer
 from database import DatabaseManager
-from config import WEATHER_COLLECTION_INTERVAL, AIR_QUALITY_COLLECTION_INTERVAL
+from catalog import load_catalog
+from sharding import ShardLeaseManager, default_worker_id
+from streaming import stream_collectors
+from spool import Spool, SpoolDrainer
+from partitions import PartitionManager
+from retention import RetentionManager
+from archive import ParquetArchiver
+from alerting import AlertEngine
+from jobs import Job, AsyncScheduler, run_in_thread
+from metrics import RunSummary, STAGE_ROWS, start_metrics_server, timed, watch_spool
+from config import (
+    WEATHER_COLLECTION_INTERVAL, SOURCE_INTERVALS,
+    SHARDING_ENABLED, PIPELINE_LOCAL_WORKERS, PIPELINE_MODE, SPOOL_DIR,
+    ALERT_MODE, ALERT_STATE_PATH, SCHEDULE_STATE_PATH, METRICS_PORT, RUN_SUMMARY_PATH,
+    MAINTENANCE_INTERVAL
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -13,71 +33,279 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def slot_path(path, slot):
+    """Per-worker variant of a local state path; local workers each own a slot"""
+    if not path or slot is None:
+        return path
+    directory, name = os.path.split(path)
+    return os.path.join(directory, slot, name)
+
 class ETLPipeline:
-    def __init__(self):
+    def __init__(self, worker_id=None, slot=None):
         self.db = DatabaseManager()
         self.transformer = DataTransformer()
-        self.weather_collector = OpenWeatherCollector()
-        self.air_quality_collector = OpenAQCollector()
+        self.shards = ShardLeaseManager(self.db.engine, worker_id) if SHARDING_ENABLED else None
+        self.partitions = PartitionManager(self.db.engine)
+        self.retention = RetentionManager(self.db, self.partitions)
+        self.archive = ParquetArchiver(self.db.engine)
+        self.collectors = create_collectors()
+        self.weather_collector = self.collectors.get('openweather')
+        self.air_quality_collector = self.collectors.get('openaq')
+        # A long-lived loop keeps provider connection pools warm between runs
+        self.loop = asyncio.new_event_loop()
+        # Scheduled jobs load from executor threads; the alert engine isn't thread-safe
+        self._load_lock = threading.Lock()
+        self.summary_path = slot_path(RUN_SUMMARY_PATH, slot)
+        
+        self.alert_engine = None
+        if ALERT_MODE == 'incremental':
+            self.alert_engine = AlertEngine(self.db, slot_path(ALERT_STATE_PATH, slot))
+        
+        # Batches go to the local spool and a background thread loads them, so
+        # collection never waits on (or loses data to) the database
+        spool_dir = os.path.join(SPOOL_DIR, slot) if SPOOL_DIR and slot else SPOOL_DIR
+        self.spool = Spool(spool_dir) if spool_dir else None
+        self.drainer = None
+        if self.spool is not None:
+            watch_spool(self.spool)
+            self.drainer = SpoolDrainer(self.spool, self.load_spooled, on_loaded=[self.check_spooled_alerts])
+            self.drainer.start()
+    
+    def close(self):
+        """Stop the spool drainer, release shard leases and close pooled HTTP sessions and the event loop"""
+        if self.drainer is not None:
+            self.drainer.stop()
+            self.spool.close()
+        if self.shards is not None:
+            self.shards.release_all()
+        # Jobs interrupted by Ctrl+C are still pending on the loop
+        pending = asyncio.all_tasks(self.loop)
+        if pending:
+            for task in pending:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        self.loop.run_until_complete(close_clients())
+        self.loop.close()
+    
+    def load_measurements(self, frame, summary):
+        """Hand a transformed batch to the spool, or load it and check alerts without one"""
+        if self.spool is not None:
+            with summary.stage('spool'):
+                self.spool.append(frame)
+            summary.count('spool', len(frame))
+            return
+        with self._load_lock:
+            with summary.stage('load'):
+                self.db.insert_measurements(frame)
+            summary.count('load', len(frame))
+            with summary.stage('alerts'):
+                self.check_alerts(frame)
+    
+    def load_spooled(self, frame):
+        """Load one spooled batch; runs in the spool drainer thread"""
+        with timed('drain'):
+            self.db.insert_measurements(frame)
+        STAGE_ROWS.labels('drain', 'all').inc(len(frame))
+    
+    def check_spooled_alerts(self, frame):
+        with timed('alerts'):
+            self.check_alerts(frame)
+    
+    def check_alerts(self, frame):
+        """Evaluate alert rules once ``frame`` is in the database"""
+        if self.alert_engine is not None:
+            self.alert_engine.evaluate(frame)
+        else:
+            self.db.check_alert_thresholds()
+    
+    def assign_locations(self, sources=None):
+        """Reload the catalog and point the collectors for ``sources`` (default all) at this worker's share of it"""
+        locations = load_catalog(self.db.engine)
+        if self.shards is not None:
+            self.shards.acquire()
+            locations = self.shards.assign(locations)
         
-    def run_pipeline(self):
+        for source in sources or self.collectors:
+            self.collectors[source].set_locations(locations)
+        return locations
+    
+    async def collect_all(self, sources, summary):
+        """Run the collectors for ``sources`` concurrently, each within its own timeout"""
+        results = await asyncio.gather(*[
+            self._run_collector(source, summary) for source in sources
+        ])
+        return dict(zip(sources, results))
+    
+    async def _run_collector(self, source, summary):
+        """Run one collector, isolating its failures from the other sources"""
+        try:
+            with summary.stage('collect', source):
+                data = await self.collectors[source].collect_async(timeout=get_timeout(source))
+            summary.count('collect', len(data), source)
+            logger.info(f"Collected {len(data)} {source} measurements")
+            return data
+        except Exception as e:
+            logger.error(f"Collector {source} failed: {str(e)}", exc_info=True)
+            return []
+        
+    def run_pipeline(self, sources=None):
         """Main ETL pipeline execution"""
+        self.loop.run_until_complete(self.run_sources(sources))
+    
+    async def run_sources(self, sources=None):
+        """Collect, transform and load ``sources`` (default all) once"""
+        sources = list(sources or self.collectors)
+        summary = RunSummary('+'.join(sources), self.summary_path)
+        status = 'ok'
         try:
-            logger.info("Starting ETL pipeline run...")
+            logger.info(f"Starting ETL pipeline run for {', '.join(sources)}...")
+            
+            # Catalog reads and lease renewals block, so they run off the loop
+            locations = await run_in_thread(self.assign_locations, sources)
+            summary.extra['locations'] = len(locations)
+            logger.info(f"Assigned {len(locations)} locations")
             
-            # Collect data from sources
-            logger.info("Collecting weather data...")
-            weather_data = self.weather_collector.collect()
-            logger.info(f"Collected {len(weather_data)} weather measurements")
+            if PIPELINE_MODE == 'stream':
+                await self.run_stream(sources, summary)
+                return
             
-            logger.info("Collecting air quality data...")
-            air_quality_data = self.air_quality_collector.collect()
-            logger.info(f"Collected {len(air_quality_data)} air quality measurements")
+            # Collect data from all sources in parallel
+            logger.info(f"Collecting data from {', '.join(sources)}...")
+            collected = await self.collect_all(sources, summary)
             
-            # Transform data
+            # Transform and load off the loop so other jobs keep collecting
             logger.info("Transforming data...")
-            transformed_data = self.transformer.transform(weather_data, air_quality_data)
+            with summary.stage('transform'):
+                transformed_data = await run_in_thread(self.transformer.transform_frame, *collected.values())
+            summary.count('transform', len(transformed_data))
             logger.info(f"Transformed {len(transformed_data)} total measurements")
             
             # Load to database
-            if transformed_data:
+            if not transformed_data.empty:
                 logger.info("Loading data to database...")
-                self.db.insert_measurements(transformed_data)
-                
-                # Check for alerts
-                logger.info("Checking alert thresholds...")
-                self.db.check_alert_thresholds()
+                await run_in_thread(self.load_measurements, transformed_data, summary)
             else:
                 logger.warning("No data to load")
             
             logger.info("Pipeline run completed successfully")
             
+        except asyncio.CancelledError:
+            status = 'cancelled'
+            raise
         except Exception as e:
+            status = 'failed'
+            summary.error('run', e)
             logger.error(f"Pipeline failed: {str(e)}", exc_info=True)
-
-def main():
-    """Main scheduler function"""
-    logger.info("Initializing Smart City ETL Pipeline...")
+        finally:
+            # Readings only count as seen once the sink or spool has them
+            for source in sources:
+                if status == 'ok':
+                    self.collectors[source].commit_markers()
+                else:
+                    self.collectors[source].discard_markers()
+            summary.extra['collectors'] = {source: dict(self.collectors[source].stats) for source in sources}
+            if self.spool is not None:
+                summary.extra['spool'] = self.spool.metrics()
+            summary.finish(status)
+    
+    async def run_stream(self, sources, summary):
+        """Load measurements in micro-batches while the collectors are still running"""
+        logger.info(f"Streaming data from {', '.join(sources)}...")
+        collectors = {source: self.collectors[source] for source in sources}
+        sink = functools.partial(self.load_measurements, summary=summary)
+        with summary.stage('stream'):
+            loaded = await stream_collectors(collectors, sink, self.transformer)
+        
+        if not loaded:
+            logger.warning("No data to load")
+        
+        logger.info("Pipeline run completed successfully")
     
-    pipeline = ETLPipeline()
+    def jobs(self):
+        """One job per collection interval; sources sharing an interval are collected and merged together"""
+        groups = {}
+        for source in self.collectors:
+            groups.setdefault(SOURCE_INTERVALS.get(source, WEATHER_COLLECTION_INTERVAL), []).append(source)
+        
+        def runner(sources):
+            return lambda: self.run_sources(sources)
+        
+        jobs = [
+            Job('+'.join(sources), runner(sources), interval * 60)
+            for interval, sources in sorted(groups.items())
+        ] + [Job('maintenance', self.run_maintenance, MAINTENANCE_INTERVAL * 60)]
+        if self.shards is not None:
+            # Leases are renewed several times per lease, independently of collection cadences
+            jobs.append(Job('shards', self.renew_shards, self.shards.lease_seconds / 3))
+        return jobs
+    
+    async def renew_shards(self):
+        """Heartbeat and renew this worker's shard leases off the loop"""
+        await run_in_thread(self.shards.acquire)
     
-    # Run once on startup
-    pipeline.run_pipeline()
+    async def run_maintenance(self):
+        """Database housekeeping; partition DDL and purges run off the loop so collection isn't held up"""
+        with timed('maintenance'):
+            await run_in_thread(self.partitions.maintain)
+        # Archive closed months before retention purges their raw rows
+        with timed('archive'):
+            await run_in_thread(self.archive.run)
+        with timed('retention'):
+            await run_in_thread(self.retention.run)
+
+def run_worker(worker_id=None, slot=None, metrics_port=METRICS_PORT):
+    """Run one scheduled pipeline worker until interrupted"""
+    logger.info("Initializing Smart City ETL Pipeline...")
+    start_metrics_server(metrics_port)
     
-    # Schedule regular runs
-    schedule.every(WEATHER_COLLECTION_INTERVAL).minutes.do(pipeline.run_pipeline)
+    pipeline = ETLPipeline(worker_id, slot)
+    jobs = pipeline.jobs()
+    scheduler = AsyncScheduler(jobs, slot_path(SCHEDULE_STATE_PATH, slot))
     
-    logger.info(f"Pipeline scheduled to run every {WEATHER_COLLECTION_INTERVAL} minutes")
+    for job in jobs:
+        logger.info(f"Collecting {job.name} every {job.interval / 60:g} minutes")
     logger.info("Scheduler is running. Press Ctrl+C to stop.")
     
     try:
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
+        pipeline.loop.run_until_complete(scheduler.run())
     except KeyboardInterrupt:
         logger.info("Scheduler stopped by user")
     except Exception as e:
         logger.error(f"Scheduler error: {str(e)}", exc_info=True)
+    finally:
+        pipeline.close()
+
+def main():
+    """Main scheduler function"""
+    if PIPELINE_LOCAL_WORKERS <= 1:
+        run_worker()
+        return
+    
+    # Several local workers share the catalog through shard leases
+    if not SHARDING_ENABLED:
+        logger.warning("PIPELINE_LOCAL_WORKERS > 1 without SHARDING_ENABLED, every worker will collect every location")
+    
+    base_id = default_worker_id()
+    # Spool and alert state are kept per worker slot, so a restarted worker picks up its predecessor's
+    workers = [
+        multiprocessing.Process(
+            target=run_worker,
+            args=(f"{base_id}-{index}", f"worker-{index}", METRICS_PORT + index if METRICS_PORT else 0),
+            name=f"pipeline-worker-{index}"
+        )
+        for index in range(PIPELINE_LOCAL_WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+    logger.info(f"Started {len(workers)} pipeline workers")
+    
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        logger.info("Scheduler stopped by user")
+        for worker in workers:
+            worker.join()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
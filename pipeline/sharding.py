@@ -0,0 +1,186 @@
+import bisect
+import hashlib
+import logging
+import os
+import socket
+import threading
+from sqlalchemy import text
+from config import SHARD_COUNT, SHARD_LEASE_SECONDS, PIPELINE_WORKER_ID
+
+logger = logging.getLogger(__name__)
+
+def stable_hash(value):
+    """64-bit hash that is identical across processes and hosts"""
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def default_worker_id():
+    return PIPELINE_WORKER_ID or f"{socket.gethostname()}-{os.getpid()}"
+
+class HashRing:
+    """Consistent-hash ring mapping location names onto shards.
+
+    Each shard owns ``replicas`` points on the ring, so changing the shard
+    count only moves the locations between neighbouring points.
+    """
+
+    def __init__(self, shard_count, replicas=64):
+        self.ring = sorted(
+            (stable_hash(f"shard-{shard}-{replica}"), shard)
+            for shard in range(shard_count)
+            for replica in range(replicas)
+        )
+        self.points = [point for point, _ in self.ring]
+
+    def shard_for(self, key):
+        index = bisect.bisect(self.points, stable_hash(key)) % len(self.points)
+        return self.ring[index][1]
+
+class ShardLeaseManager:
+    """Leases catalog shards to this worker through the ``pipeline_shards`` table.
+
+    Shards are spread over live workers by rendezvous hashing, so a joining or
+    departing worker only moves its own share. A shard always has at most one
+    unexpired lease: workers hand shards they no longer want directly to
+    their new owner, and the shards of a dead worker become claimable once
+    its lease expires. Claims use ``FOR UPDATE SKIP LOCKED`` so concurrent
+    workers never block on or double-claim a shard.
+    """
+
+    def __init__(self, engine, worker_id=None, shard_count=SHARD_COUNT, lease_seconds=SHARD_LEASE_SECONDS):
+        self.engine = engine
+        self.worker_id = worker_id or default_worker_id()
+        self.shard_count = shard_count
+        self.lease_seconds = lease_seconds
+        self.ring = HashRing(shard_count)
+        self.owned = set()
+        # The heartbeat job and collection runs both acquire, from different threads
+        self._lock = threading.Lock()
+        self._ensure_shards()
+
+    def _ensure_shards(self):
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(
+                    text("""
+                        INSERT INTO pipeline_shards (shard_id)
+                        SELECT generate_series(0, :shard_count - 1)
+                        ON CONFLICT (shard_id) DO NOTHING
+                    """),
+                    {"shard_count": self.shard_count}
+                )
+        except Exception as e:
+            logger.error(f"Error creating pipeline shards: {str(e)}")
+
+    def _desired_owner(self, shard_id, workers):
+        return max(workers, key=lambda worker: stable_hash(f"{worker}:{shard_id}"))
+
+    def acquire(self):
+        """Heartbeat, rebalance and renew this worker's leases; return the owned shard ids"""
+        with self._lock:
+            return self._acquire()
+
+    def _acquire(self):
+        params = {"me": self.worker_id, "lease": self.lease_seconds}
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(
+                    text("""
+                        INSERT INTO pipeline_workers (worker_id, heartbeat_at)
+                        VALUES (:me, NOW())
+                        ON CONFLICT (worker_id) DO UPDATE SET heartbeat_at = EXCLUDED.heartbeat_at
+                    """),
+                    params
+                )
+                conn.execute(
+                    text("DELETE FROM pipeline_workers WHERE heartbeat_at < NOW() - make_interval(secs => :lease)"),
+                    params
+                )
+                workers = [row.worker_id for row in conn.execute(text("SELECT worker_id FROM pipeline_workers"))]
+
+                desired = {
+                    shard_id: self._desired_owner(shard_id, workers)
+                    for shard_id in range(self.shard_count)
+                }
+
+                # Hand shards that now belong to another live worker straight to it
+                owned = [row.shard_id for row in conn.execute(
+                    text("SELECT shard_id FROM pipeline_shards WHERE owner = :me FOR UPDATE"),
+                    params
+                )]
+                handoffs = [
+                    {"shard_id": shard_id, "owner": desired[shard_id], **params}
+                    for shard_id in owned if desired.get(shard_id, self.worker_id) != self.worker_id
+                ]
+                if handoffs:
+                    conn.execute(
+                        text("""
+                            UPDATE pipeline_shards
+                            SET owner = :owner, lease_expires_at = NOW() + make_interval(secs => :lease)
+                            WHERE shard_id = :shard_id AND owner = :me
+                        """),
+                        handoffs
+                    )
+
+                renewed = {row.shard_id for row in conn.execute(
+                    text("""
+                        UPDATE pipeline_shards
+                        SET lease_expires_at = NOW() + make_interval(secs => :lease)
+                        WHERE owner = :me
+                        RETURNING shard_id
+                    """),
+                    params
+                )}
+
+                wanted = [shard_id for shard_id, owner in desired.items() if owner == self.worker_id]
+                claimable = [row.shard_id for row in conn.execute(
+                    text("""
+                        SELECT shard_id FROM pipeline_shards
+                        WHERE shard_id = ANY(:wanted)
+                        AND (owner IS NULL OR lease_expires_at < NOW())
+                        ORDER BY shard_id
+                        FOR UPDATE SKIP LOCKED
+                    """),
+                    {"wanted": wanted}
+                )]
+                if claimable:
+                    conn.execute(
+                        text("""
+                            UPDATE pipeline_shards
+                            SET owner = :me, lease_expires_at = NOW() + make_interval(secs => :lease)
+                            WHERE shard_id = ANY(:claimable)
+                        """),
+                        {"claimable": claimable, **params}
+                    )
+
+            self.owned = renewed | set(claimable)
+            logger.info(
+                f"Worker {self.worker_id} holds {len(self.owned)}/{self.shard_count} shards "
+                f"({len(workers)} live workers, {len(handoffs)} handed off, {len(claimable)} claimed)"
+            )
+        except Exception as e:
+            # Keep collecting the shards we had; their leases outlive a run
+            logger.error(f"Error acquiring shard leases: {str(e)}")
+        return self.owned
+
+    def release_all(self):
+        """Give up every lease held by this worker"""
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(
+                    text("UPDATE pipeline_shards SET owner = NULL, lease_expires_at = NULL WHERE owner = :me"),
+                    {"me": self.worker_id}
+                )
+                conn.execute(
+                    text("DELETE FROM pipeline_workers WHERE worker_id = :me"),
+                    {"me": self.worker_id}
+                )
+            self.owned = set()
+        except Exception as e:
+            logger.error(f"Error releasing shard leases: {str(e)}")
+
+    def assign(self, locations):
+        """Return the locations that fall in shards currently leased to this worker"""
+        return [
+            location for location in locations
+            if self.ring.shard_for(location['name']) in self.owned
+        ]
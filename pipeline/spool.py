@@ -0,0 +1,200 @@
+import json
+import logging
+import os
+import threading
+import time
+import pandas as pd
+from config import SPOOL_SEGMENT_BYTES, SPOOL_HIGH_WATERMARK_BYTES, SPOOL_RETRY_MAX_SECONDS
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = '.seg'
+
+class Spool:
+    """Write-ahead spool of measurement batches in append-only segment files.
+
+    Each batch is one fsync'd JSON line carrying its dtypes, so it replays
+    with the frame it was written from. The open segment is sealed once it
+    passes ``segment_bytes`` or when the drainer asks for it; sealed segments
+    are replayed in order and deleted once loaded. A crash mid-segment
+    replays that segment again, which the idempotent upsert absorbs.
+    """
+
+    def __init__(self, directory, segment_bytes=SPOOL_SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.stats = {'appended_rows': 0, 'drained_rows': 0, 'load_failures': 0}
+        self._lock = threading.Lock()
+        self._has_data = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+
+        segments = self._segment_numbers()
+        self._sequence = segments[-1] + 1 if segments else 0
+        self._active = None
+        if segments:
+            logger.info(f"Found {len(segments)} spooled segments in {directory}")
+            self._has_data.set()
+
+    def _segment_numbers(self):
+        return sorted(
+            int(name[:-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _path(self, sequence):
+        return os.path.join(self.directory, f"{sequence:012d}{SEGMENT_SUFFIX}")
+
+    def append(self, frame):
+        """Durably append one batch; returns once it is on disk"""
+        if frame.empty:
+            return
+        line = json.dumps({
+            'dtypes': {column: str(dtype) for column, dtype in frame.dtypes.items()},
+            'data': json.loads(frame.to_json(orient='split', index=False, date_format='iso', date_unit='us'))
+        }) + '\n'
+
+        with self._lock:
+            if self._active is None:
+                self._active = open(self._path(self._sequence), 'a', encoding='utf-8')
+            self._active.write(line)
+            self._active.flush()
+            os.fsync(self._active.fileno())
+            if self._active.tell() >= self.segment_bytes:
+                self._seal()
+        self.stats['appended_rows'] += len(frame)
+        self._has_data.set()
+
+        pending = self.pending_bytes()
+        if pending > SPOOL_HIGH_WATERMARK_BYTES:
+            logger.warning(f"Spool backlog is {pending / 1e6:.1f} MB, the database is falling behind")
+
+    def _seal(self):
+        if self._active is not None:
+            self._active.close()
+            self._active = None
+            self._sequence += 1
+
+    def sealed_segments(self):
+        """Seal the open segment and return every segment path awaiting replay, oldest first"""
+        with self._lock:
+            self._seal()
+            return [self._path(sequence) for sequence in self._segment_numbers()]
+
+    def read(self, path):
+        """Yield the batches of a segment as DataFrames"""
+        with open(path, encoding='utf-8') as f:
+            for number, line in enumerate(f):
+                try:
+                    batch = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash mid-write; everything before it is intact
+                    logger.warning(f"Skipping unreadable batch {number} in {path}")
+                    continue
+                frame = pd.DataFrame(batch['data']['data'], columns=batch['data']['columns'])
+                for column, dtype in batch['dtypes'].items():
+                    if dtype.startswith('datetime64'):
+                        frame[column] = pd.to_datetime(frame[column])
+                    else:
+                        frame[column] = frame[column].astype(dtype)
+                yield frame
+
+    def remove(self, path):
+        os.remove(path)
+
+    def wait(self, timeout):
+        """Block until something is appended or ``timeout`` passes"""
+        triggered = self._has_data.wait(timeout)
+        self._has_data.clear()
+        return triggered
+
+    def wake(self):
+        self._has_data.set()
+
+    def pending_bytes(self):
+        total = 0
+        for sequence in self._segment_numbers():
+            try:
+                total += os.path.getsize(self._path(sequence))
+            except OSError:
+                pass
+        return total
+
+    def metrics(self):
+        """Backlog figures for monitoring the drainer"""
+        segments = self._segment_numbers()
+        oldest_age = 0.0
+        if segments:
+            try:
+                oldest_age = time.time() - os.path.getmtime(self._path(segments[0]))
+            except OSError:
+                pass
+        return {
+            'pending_segments': len(segments),
+            'pending_bytes': self.pending_bytes(),
+            'oldest_segment_age_seconds': round(oldest_age, 1),
+            **self.stats
+        }
+
+    def close(self):
+        with self._lock:
+            self._seal()
+
+class SpoolDrainer(threading.Thread):
+    """Background thread replaying spooled batches through ``load`` in order.
+
+    When a load fails the drainer backs off exponentially and retries the
+    same segment, so nothing is skipped while the database is down.
+    ``on_loaded`` hooks are called with each batch once it has loaded.
+    """
+
+    def __init__(self, spool, load, on_loaded=None, idle_seconds=5):
+        super().__init__(name='spool-drainer', daemon=True)
+        self.spool = spool
+        self.load = load
+        self.on_loaded = on_loaded or []
+        self.idle_seconds = idle_seconds
+        self._stopping = threading.Event()
+
+    def run(self):
+        backoff = 1
+        while not self._stopping.is_set():
+            try:
+                loaded = self.drain()
+                backoff = 1
+            except Exception as e:
+                self.spool.stats['load_failures'] += 1
+                logger.error(f"Spool drain failed, retrying in {backoff}s: {str(e)}")
+                self._stopping.wait(backoff)
+                backoff = min(backoff * 2, SPOOL_RETRY_MAX_SECONDS)
+                continue
+
+            if loaded:
+                logger.info(f"Drained {loaded} spooled measurements, spool metrics: {self.spool.metrics()}")
+            else:
+                self.spool.wait(self.idle_seconds)
+
+    def drain(self):
+        """Replay every sealed segment; returns the number of rows loaded"""
+        loaded = 0
+        for path in self.spool.sealed_segments():
+            if self._stopping.is_set():
+                break
+            for frame in self.spool.read(path):
+                self.load(frame)
+                loaded += len(frame)
+                self.spool.stats['drained_rows'] += len(frame)
+                for hook in self.on_loaded:
+                    try:
+                        hook(frame)
+                    except Exception as e:
+                        # A failing hook must not make the batch load again
+                        logger.error(f"Post-load hook failed: {str(e)}", exc_info=True)
+            self.spool.remove(path)
+        return loaded
+
+    def stop(self, timeout=30):
+        """Stop after the batch in progress; whatever is left stays on disk for next start"""
+        self._stopping.set()
+        self.spool.wake()
+        self.join(timeout)
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collectors.registry import get_timeout
+from jobs import run_in_thread
+from config import STREAM_BATCH_ROWS, STREAM_FLUSH_MS, STREAM_MAX_PENDING
+from metrics import STREAM_PENDING, STREAM_BUFFERED, timed
+
+logger = logging.getLogger(__name__)
+
+class StreamJoiner:
+    """Pairs up records for the same location arriving from different sources.
+
+    A location is released once every source has either reported it or
+    finished streaming. At most ``max_pending`` locations wait for a partner;
+    beyond that the oldest are released with the sources seen so far.
+    """
+
+    def __init__(self, sources, max_pending=STREAM_MAX_PENDING):
+        self.sources = list(sources)
+        self.max_pending = max_pending
+        self.finished = set()
+        self.pending = OrderedDict()
+        self.released_early = 0
+
+    def add(self, source, record):
+        """Buffer one record and return the location groups now ready"""
+        group = self.pending.setdefault(record['location_name'], {})
+        group[source] = record
+        if self._complete(group):
+            ready = [self.pending.pop(record['location_name'])]
+        else:
+            ready = []
+            while len(self.pending) > self.max_pending:
+                ready.append(self.pending.popitem(last=False)[1])
+                self.released_early += 1
+        STREAM_PENDING.set(len(self.pending))
+        return ready
+
+    def finish(self, source):
+        """Mark a source as done and return the location groups it was holding back"""
+        self.finished.add(source)
+        ready = [name for name, group in self.pending.items() if self._complete(group)]
+        groups = [self.pending.pop(name) for name in ready]
+        STREAM_PENDING.set(len(self.pending))
+        return groups
+
+    def _complete(self, group):
+        return all(source in group or source in self.finished for source in self.sources)
+
+class BatchingLoader:
+    """Transforms and loads location groups in micro-batches.
+
+    Groups are flushed every ``batch_rows`` rows or ``flush_ms`` milliseconds,
+    whichever comes first. Loads run in a worker thread so collection keeps
+    going meanwhile; ``add`` waits while a full batch is already queued
+    behind a load in progress, which bounds memory and slows producers down.
+    """
+
+    def __init__(self, sink, transformer, sources, batch_rows=STREAM_BATCH_ROWS, flush_ms=STREAM_FLUSH_MS):
+        self.sink = sink
+        self.transformer = transformer
+        self.sources = list(sources)
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_ms / 1000
+        self.buffer = []
+        self.loaded = 0
+        self.batches = 0
+        self.failed = 0
+        self._lock = asyncio.Lock()
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+    def start(self):
+        self._timer = asyncio.create_task(self._flush_periodically())
+
+    async def add(self, groups):
+        if not groups:
+            return
+        self.buffer.extend(groups)
+        STREAM_BUFFERED.set(len(self.buffer))
+        if len(self.buffer) >= self.batch_rows:
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            if not self.buffer:
+                return
+            groups, self.buffer = self.buffer, []
+            STREAM_BUFFERED.set(0)
+            self._last_flush = time.monotonic()
+            try:
+                self.loaded += await run_in_thread(self._load, groups)
+                self.batches += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error loading batch of {len(groups)} measurements: {str(e)}")
+
+    def _load(self, groups):
+        """Transform one micro-batch and hand it to the sink; runs in a worker thread"""
+        batches = [
+            [group[source] for group in groups if source in group]
+            for source in self.sources
+        ]
+        with timed('transform'):
+            frame = self.transformer.transform_frame(*batches)
+        if frame.empty:
+            return 0
+        self.sink(frame)
+        return len(frame)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(max(self.flush_interval - (time.monotonic() - self._last_flush), 0.01))
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                await self.flush()
+
+    async def close(self):
+        """Stop the timer and load whatever is still buffered"""
+        if self._timer is not None:
+            self._timer.cancel()
+            await asyncio.gather(self._timer, return_exceptions=True)
+        await self.flush()
+
+async def stream_collectors(collectors, sink, transformer):
+    """Stream every collector into ``sink`` (a callable taking a measurement frame); return the rows loaded.
+
+    Response cache markers are committed only when every batch reached the
+    sink, otherwise the run's readings are collected again next time.
+    """
+    sources = list(collectors)
+    joiner = StreamJoiner(sources)
+    loader = BatchingLoader(sink, transformer, sources)
+    loader.start()
+
+    async def pump(source):
+        received = 0
+        try:
+            async for measurements in collectors[source].stream(timeout=get_timeout(source)):
+                received += len(measurements)
+                for record in measurements:
+                    await loader.add(joiner.add(source, record))
+        except Exception as e:
+            logger.error(f"Collector {source} failed: {str(e)}", exc_info=True)
+        finally:
+            await loader.add(joiner.finish(source))
+            logger.info(f"Streamed {received} {source} measurements")
+
+    try:
+        await asyncio.gather(*[pump(source) for source in sources])
+    finally:
+        await loader.close()
+        for collector in collectors.values():
+            if loader.failed:
+                collector.discard_markers()
+            else:
+                collector.commit_markers()
+
+    if joiner.released_early:
+        logger.warning(f"Join buffer full, {joiner.released_early} locations were loaded before every source reported")
+    logger.info(f"Loaded {loader.loaded} measurements in {loader.batches} batches")
+    return loader.loaded
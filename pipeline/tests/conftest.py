@@ -0,0 +1,31 @@
+import os
+import sys
+import pytest
+
+# Pipeline modules import each other as top-level modules and read config at import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('OPENWEATHER_API_KEY', 'test')
+
+# Database tests run against a PostgreSQL database migrated by the backend
+# (DATABASE_URL=... python manage.py migrate); every table is emptied first
+TEST_DATABASE_URL = os.environ.get('PIPELINE_TEST_DATABASE_URL')
+if TEST_DATABASE_URL:
+    os.environ['DATABASE_URL'] = TEST_DATABASE_URL
+
+TABLES = [
+    'measurements', 'measurements_hourly', 'measurements_daily', 'current_measurements',
+    'alerts', 'alert_configs', 'predictions', 'locations', 'pipeline_shards', 'pipeline_workers'
+]
+
+@pytest.fixture
+def db():
+    """A DatabaseManager on an emptied test database"""
+    if not TEST_DATABASE_URL:
+        pytest.skip('PIPELINE_TEST_DATABASE_URL is not set')
+    from sqlalchemy import text
+    from database import DatabaseManager
+    manager = DatabaseManager()
+    with manager.engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE"))
+    yield manager
+    manager.engine.dispose()
@@ -0,0 +1,155 @@
+from contextlib import contextmanager
+import pandas as pd
+import pytest
+from alerting import AlertEngine
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, statement, params=None):
+        self.db.statements.append((str(statement), params))
+        return self
+
+    def fetchall(self):
+        return self.db.active
+
+class FakeDatabase:
+    """Records alert writes instead of talking to PostgreSQL"""
+
+    def __init__(self, active=()):
+        self.active = list(active)
+        self.statements = []
+        self.inserted = []
+        self.fail_inserts = False
+        self.engine = self
+        self.locations = self
+
+    @contextmanager
+    def connect(self):
+        yield FakeConnection(self)
+
+    begin = connect
+
+    def attach(self, frame):
+        return frame
+
+    def bulk_insert(self, table, frame):
+        if self.fail_inserts:
+            raise RuntimeError('database unavailable')
+        self.inserted.append(frame)
+
+    def resolved(self):
+        return [
+            (params['location'], params['config_id'])
+            for sql, batch in self.statements if sql.lstrip().startswith('UPDATE alerts')
+            for params in batch
+        ]
+
+def rule(id, parameter='pm25', threshold=35.0, rule_type='threshold', window_minutes=None, clear_value=None):
+    return {
+        'id': id, 'parameter': parameter, 'threshold_value': threshold, 'severity': 'high',
+        'rule_type': rule_type, 'window_minutes': window_minutes, 'clear_value': clear_value
+    }
+
+def configs(*rules):
+    """What load_configs returns for these alert_configs rows"""
+    frame = pd.DataFrame(list(rules))
+    frame['threshold_value'] = frame['threshold_value'].astype(float)
+    frame['clear_value'] = frame['clear_value'].astype(float).fillna(frame['threshold_value'])
+    frame['window_seconds'] = frame['window_minutes'].astype(float).fillna(0) * 60
+    return frame
+
+def readings(values, location='Paris Nord', start='2024-05-15 10:00', minutes=5, parameter='pm25'):
+    return pd.DataFrame({
+        'location_name': location,
+        'timestamp': pd.date_range(start, periods=len(values), freq=f'{minutes}min'),
+        parameter: values,
+    })
+
+@pytest.fixture
+def make_engine(tmp_path, monkeypatch):
+    def make(*rules, db=None, ring_size=32):
+        monkeypatch.setattr(AlertEngine, 'load_configs', lambda self: configs(*rules))
+        return AlertEngine(db or FakeDatabase(), str(tmp_path / 'alert_state.pkl'), ring_size)
+    return make
+
+def opened_values(db):
+    return [value for frame in db.inserted for value in frame['actual_value']]
+
+def test_threshold_alerts_open_once_and_resolve_below_the_clear_value(make_engine):
+    engine = make_engine(rule(1, clear_value=25.0))
+    assert engine.evaluate(readings([20.0, 40.0, 50.0, 30.0])) == (1, 0)
+    assert opened_values(engine.db) == [40.0]
+    # Still above the clear value, so the alert stays open
+    assert engine.evaluate(readings([28.0, 24.0], start='2024-05-15 10:20')) == (0, 1)
+    assert engine.db.resolved() == [('Paris Nord', 1)]
+
+def test_duration_alerts_wait_for_the_window(make_engine):
+    engine = make_engine(rule(1, rule_type='duration', window_minutes=15))
+    assert engine.evaluate(readings([40.0, 41.0, 42.0])) == (0, 0)
+    assert engine.evaluate(readings([43.0], start='2024-05-15 10:15')) == (1, 0)
+    assert opened_values(engine.db) == [43.0]
+
+def test_a_dip_restarts_the_duration_window(make_engine):
+    engine = make_engine(rule(1, rule_type='duration', window_minutes=15))
+    assert engine.evaluate(readings([40.0, 41.0, 30.0, 42.0, 43.0, 44.0])) == (0, 0)
+
+def test_rate_of_change_compares_against_the_reading_a_window_back(make_engine):
+    # More than 10 units per hour over the last 30 minutes
+    engine = make_engine(rule(1, threshold=10.0, rule_type='rate_of_change', window_minutes=30))
+    # A steady 6 per hour, from 10.0 at 10:00 to 15.5 at 10:55
+    steady = [10.0 + minute * 0.1 for minute in range(0, 60, 5)]
+    assert engine.evaluate(readings(steady)) == (0, 0)
+    # From 13.0 at 10:30 to 20.0 at 11:00 is 14 per hour
+    assert engine.evaluate(readings([20.0], start='2024-05-15 11:00')) == (1, 0)
+    assert opened_values(engine.db) == [pytest.approx(14.0)]
+
+def test_replayed_readings_are_ignored(make_engine):
+    engine = make_engine(rule(1))
+    batch = readings([20.0, 40.0])
+    assert engine.evaluate(batch) == (1, 0)
+    assert engine.evaluate(batch) == (0, 0)
+    assert len(engine.db.inserted) == 1
+
+def test_a_failed_insert_fires_again_on_the_next_reading(make_engine):
+    db = FakeDatabase()
+    engine = make_engine(rule(1), db=db)
+    db.fail_inserts = True
+    engine.evaluate(readings([40.0]))
+    db.fail_inserts = False
+    assert engine.evaluate(readings([41.0], start='2024-05-15 10:05')) == (1, 0)
+    assert opened_values(db) == [41.0]
+
+def test_rings_grow_to_cover_the_longest_rate_window(make_engine):
+    engine = make_engine(rule(1, rule_type='rate_of_change', window_minutes=60))
+    assert engine._ring_capacity(configs(rule(1, rule_type='rate_of_change', window_minutes=60))) == 32
+    # Six hours of 5- and 30-minute readings: 72 + 12, plus two spare slots
+    long_window = configs(rule(1, rule_type='rate_of_change', window_minutes=360))
+    assert engine._ring_capacity(long_window) == 86
+
+    engine.evaluate(readings([float(value) for value in range(40)]))
+    ring = engine.rings['pm25']
+    ring.resize(86)
+    assert ring.capacity == 86
+    # The last 32 readings survive, oldest first
+    assert list(ring.values[0, :32]) == [float(value) for value in range(8, 40)]
+
+def test_state_is_restored_from_the_snapshot(make_engine):
+    engine = make_engine(rule(1))
+    engine.evaluate(readings([40.0]))
+
+    restarted = make_engine(rule(1))
+    assert restarted.states == {('Paris Nord', 1): [engine.states[('Paris Nord', 1)][0], True]}
+    assert restarted.evaluate(readings([45.0], start='2024-05-15 10:05')) == (0, 0)
+    assert restarted.evaluate(readings([20.0], start='2024-05-15 10:10')) == (0, 1)
+
+def test_without_a_snapshot_open_alerts_are_adopted_from_the_database(make_engine):
+    active = [
+        pd.Series({'location_name': 'Paris Nord', 'config_id': 1}),
+        pd.Series({'location_name': 'Paris Est', 'config_id': 2}),
+    ]
+    engine = make_engine(rule(1), db=FakeDatabase(active))
+    # Rule 2 is disabled, so only rule 1's alert is tracked
+    assert engine.states == {('Paris Nord', 1): [0.0, True]}
+    assert engine.evaluate(readings([20.0])) == (0, 1)
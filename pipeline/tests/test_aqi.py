@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from aqi import MAX_CONCENTRATIONS, calculate_aqi, compute_aqi, sub_index, to_micrograms
+
+@pytest.mark.parametrize('concentration, expected', [
+    (0.0, 0),
+    (12.0, 50),
+    (12.1, 51),
+    (35.4, 100),
+    (35.5, 101),
+    (500.4, 500),
+])
+def test_pm25_breakpoints(concentration, expected):
+    assert sub_index('pm25', [concentration])[0] == expected
+
+def test_values_between_categories_snap_to_the_nearest_bound():
+    assert sub_index('pm25', [12.05])[0] == 51
+
+def test_values_beyond_the_table_cap_at_500():
+    assert sub_index('pm25', [900.0])[0] == 500
+
+def test_missing_and_negative_values_have_no_index():
+    assert np.isnan(sub_index('pm25', [np.nan, -1.0])).all()
+
+def test_gases_are_scored_in_table_units():
+    # 77 ppb of NO2, halfway up the 54-100 ppb category
+    assert sub_index('no2', [to_micrograms('no2', 77, 'ppb')])[0] == 75
+
+@pytest.mark.parametrize('ppb, expected', [(105, 200), (250, 248), (404, 300), (405, 301), (600, 496)])
+def test_ozone_table_has_no_gap_between_the_8_hour_and_1_hour_ranges(ppb, expected):
+    assert sub_index('o3', [to_micrograms('o3', ppb, 'ppb')])[0] == expected
+
+def test_sub_indices_never_fall_as_concentrations_rise():
+    for pollutant in MAX_CONCENTRATIONS:
+        indices = sub_index(pollutant, np.linspace(0, MAX_CONCENTRATIONS[pollutant], 20000))
+        assert (np.diff(indices) >= 0).all(), pollutant
+
+def test_to_micrograms():
+    assert to_micrograms('co', 1, 'ppm') == pytest.approx(1000 * 28.010 / 24.45)
+    assert to_micrograms('no2', 1, 'ppm') == pytest.approx(to_micrograms('no2', 1000, 'ppb'))
+    # Particulates and readings already in µg/m³ pass through
+    assert to_micrograms('pm25', 12.0, 'ppm') == 12.0
+    assert to_micrograms('no2', 40.0, 'µg/m³') == 40.0
+
+def test_physical_ceilings_sit_above_the_index_scale():
+    for pollutant, ceiling in MAX_CONCENTRATIONS.items():
+        assert sub_index(pollutant, [ceiling])[0] == 500
+
+def test_compute_aqi_takes_the_highest_sub_index():
+    frame = pd.DataFrame({
+        'pm25': [10.0, 40.0, np.nan],
+        'no2': [to_micrograms('no2', 77, 'ppb'), np.nan, np.nan]
+    })
+    aqi, dominant = compute_aqi(frame)
+    assert aqi[:2].tolist() == [75, 112]
+    assert dominant.tolist() == ['no2', 'pm25', None]
+    assert np.isnan(aqi[2])
+
+def test_compute_aqi_without_pollutant_columns():
+    aqi, dominant = compute_aqi(pd.DataFrame({'temperature': [20.0, 21.0]}))
+    assert np.isnan(aqi).all()
+    assert dominant.tolist() == [None, None]
+
+def test_calculate_aqi():
+    assert calculate_aqi(pm25=35.4, no2=None) == (100, 'pm25')
+    assert calculate_aqi(pm25=None) == (None, None)
@@ -0,0 +1,53 @@
+import json
+from datetime import datetime, timedelta
+import pandas as pd
+import pyarrow.parquet as pq
+from archive import ParquetArchiver
+from partitions import add_months
+
+def closed_month():
+    """First day of last month"""
+    return add_months(datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0), -1)
+
+def readings(month, locations, per_location):
+    frame = pd.DataFrame([
+        {
+            'location_name': location, 'latitude': 48.88, 'longitude': 2.35,
+            'timestamp': month + timedelta(hours=hour), 'pm25': float(hour),
+            'aqi': hour % 50 or None, 'source': 'openaq'
+        }
+        for location in locations
+        for hour in range(per_location)
+    ])
+    return frame.astype({'aqi': 'Int64'})
+
+def test_closed_months_are_exported_per_location(db, tmp_path):
+    month = closed_month()
+    db.upsert_measurements(readings(month, ['Paris Nord', 'Paris Est', 'Paris Sud'], 30))
+    # The current month is still open
+    db.upsert_measurements(readings(datetime.utcnow().replace(minute=0, second=0, microsecond=0), ['Paris Nord'], 1))
+
+    # Chunks smaller than a location's rows split locations across chunks
+    archiver = ParquetArchiver(db.engine, str(tmp_path), delay_days=0, chunk_rows=7)
+    assert archiver.run() == [f"{month:%Y-%m}"]
+
+    root = tmp_path / 'measurements'
+    manifest = json.loads((root / '_manifest.json').read_text())
+    assert {key: (entry['rows'], entry['files']) for key, entry in manifest['months'].items()} == {
+        f"{month:%Y-%m}": (90, 3)
+    }
+    files = sorted((root / f"month={month:%Y-%m}").glob('location_id=*/part-0.parquet'))
+    assert all(str(pq.read_schema(path).field('aqi').type) == 'int32' for path in files)
+    frames = [pq.read_table(path).to_pandas() for path in files]
+    assert sorted(frame['location_name'].iloc[0] for frame in frames) == ['Paris Est', 'Paris Nord', 'Paris Sud']
+    for frame in frames:
+        assert frame['location_name'].nunique() == 1
+        assert list(frame['pm25']) == [float(hour) for hour in range(30)]
+        assert frame['aqi'].isna().sum() == 1
+    assert not list(root.glob('.staging-*'))
+
+    # Archived months are skipped on the next run
+    assert archiver.run() == []
+
+def test_without_a_directory_nothing_is_archived(db):
+    assert ParquetArchiver(db.engine, '').run() == []
@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+from collectors import base, cache as cache_module
+from collectors.base import BaseCollector
+from collectors.cache import ResponseCache
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+class MarkedCollector(BaseCollector):
+    """Serves one payload per location, marked with its observation time"""
+    source = 'marked'
+
+    def __init__(self, observed, cache, cache_ttl=0):
+        self.cache_ttl = cache_ttl
+        super().__init__([{'name': name} for name in observed])
+        self.cache = cache
+        self.observed = observed
+        self.fetched = []
+
+    async def fetch(self, target):
+        self.fetched.append(target['name'])
+        return {'name': target['name'], 'observed': self.observed[target['name']]}
+
+    def observation_marker(self, data):
+        return data['observed']
+
+    def transform(self, data, location):
+        return {'location_name': location['name'], 'timestamp': data['observed']}
+
+def collect(collector):
+    return asyncio.run(collector.collect_async())
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResponseCache(2)
+    cache.put('openaq', 'a', '10:00')
+    cache.put('openaq', 'b', '10:00')
+    cache.get('openaq', 'a')
+    cache.put('openaq', 'c', '10:00')
+    assert cache.get('openaq', 'b') is None
+    assert cache.get('openaq', 'a')[0] == cache.get('openaq', 'c')[0] == '10:00'
+
+def test_freshness_follows_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, 'time', clock)
+    cache = ResponseCache(10)
+    cache.put('openaq', 'a', '10:00')
+    clock.now += 59
+    assert cache.is_fresh('openaq', 'a', 60)
+    clock.now += 1
+    assert not cache.is_fresh('openaq', 'a', 60)
+    assert not cache.is_fresh('openaq', 'b', 60)
+
+def test_flushed_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / 'cache' / 'responses.sqlite')
+    cache = ResponseCache(10, path)
+    cache.put('openaq', 'a', '10:00')
+    cache.put('openaq', 'b', '10:05')
+    assert ResponseCache(10, path).entries == {}
+
+    cache.flush()
+    restarted = ResponseCache(1, path)
+    # Only the most recent entries that fit are reloaded
+    assert list(restarted.entries) == [('openaq', 'b')]
+    assert restarted.get('openaq', 'b')[0] == '10:05'
+
+def test_unchanged_observations_are_skipped_once_committed():
+    cache = ResponseCache(10)
+    collector = MarkedCollector({'Paris Nord': '10:00', 'Paris Est': '10:00'}, cache)
+    assert len(collect(collector)) == 2
+    # Markers wait for the load to succeed
+    assert cache.get('marked', 'Paris Nord') is None
+    collector.commit_markers()
+
+    collector.observed['Paris Est'] = '10:05'
+    assert collect(collector) == [{'location_name': 'Paris Est', 'timestamp': '10:05'}]
+    assert collector.stats['unchanged'] == 1
+
+def test_discarded_markers_are_collected_again():
+    cache = ResponseCache(10)
+    collector = MarkedCollector({'Paris Nord': '10:00'}, cache)
+    collect(collector)
+    collector.discard_markers()
+    assert len(collect(collector)) == 1
+
+def test_targets_within_the_ttl_are_not_fetched():
+    cache = ResponseCache(10)
+    collector = MarkedCollector({'Paris Nord': '10:00'}, cache, cache_ttl=60)
+    collect(collector)
+    collector.commit_markers()
+    assert collect(collector) == []
+    assert collector.fetched == ['Paris Nord']
+    assert collector.stats['fresh'] == 1
+
+def test_a_ttl_outliving_the_collection_interval_is_rejected(monkeypatch):
+    monkeypatch.setattr(base, 'SOURCE_INTERVALS', {'marked': 5})
+    with pytest.raises(ValueError):
+        MarkedCollector({'Paris Nord': '10:00'}, ResponseCache(10), cache_ttl=300)
+    MarkedCollector({'Paris Nord': '10:00'}, ResponseCache(10), cache_ttl=240)
@@ -0,0 +1,49 @@
+import json
+import pandas as pd
+from sqlalchemy import text
+import catalog
+from catalog import LocationCache, load_catalog
+
+def test_new_names_are_registered_with_their_coordinates(db):
+    frame = pd.DataFrame({
+        'location_name': ['Paris Nord', 'Paris Est', 'Paris Nord'],
+        'latitude': [48.8809, 48.8768, 48.8809], 'longitude': [2.3553, 2.3592, 2.3553],
+    })
+    attached = db.locations.attach(frame)
+    assert 'location_name' not in attached.columns
+    assert attached['location_id'].iloc[0] == attached['location_id'].iloc[2] != attached['location_id'].iloc[1]
+
+    with db.engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, name, latitude, longitude FROM locations ORDER BY name")).all()
+    assert [(row.name, float(row.latitude), float(row.longitude)) for row in rows] == [
+        ('Paris Est', 48.8768, 2.3592), ('Paris Nord', 48.8809, 2.3553)
+    ]
+    # Another worker's cache maps the names to the same ids
+    other = LocationCache(db.engine).attach(frame[['location_name']])
+    assert list(other['location_id']) == list(attached['location_id'])
+
+def test_names_without_coordinates_are_registered_at_the_origin(db):
+    db.locations.attach(pd.DataFrame({'location_name': ['Paris Sud']}))
+    with db.engine.connect() as conn:
+        assert conn.execute(text("SELECT latitude, longitude FROM locations")).one() == (0, 0)
+
+def test_frames_without_names_pass_through(db):
+    frame = pd.DataFrame({'location_id': [1]})
+    assert db.locations.attach(frame) is frame
+
+def test_the_catalog_falls_back_to_the_built_in_locations(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog, 'LOCATIONS_SOURCE', 'file')
+    monkeypatch.setattr(catalog, 'LOCATIONS_FILE', str(tmp_path / 'missing.json'))
+    assert load_catalog() == list(catalog.MONITORED_LOCATIONS)
+
+    path = tmp_path / 'locations.json'
+    path.write_text(json.dumps([{'name': 'Paris Nord', 'lat': '48.8809', 'lon': 2.3553}]))
+    monkeypatch.setattr(catalog, 'LOCATIONS_FILE', str(path))
+    assert load_catalog() == [{'name': 'Paris Nord', 'lat': 48.8809, 'lon': 2.3553, 'openaq_location_id': None}]
+
+def test_the_catalog_reads_active_locations_from_the_database(db, monkeypatch):
+    monkeypatch.setattr(catalog, 'LOCATIONS_SOURCE', 'database')
+    db.locations.attach(pd.DataFrame({'location_name': ['Paris Nord', 'Paris Est'], 'latitude': 48.88, 'longitude': 2.35}))
+    with db.engine.begin() as conn:
+        conn.execute(text("UPDATE locations SET is_active = false WHERE name = 'Paris Est'"))
+    assert [location['name'] for location in load_catalog(db.engine)] == ['Paris Nord']
@@ -0,0 +1,54 @@
+import asyncio
+from collectors.base import BaseCollector
+from collectors.cache import ResponseCache
+
+class SlowCollector(BaseCollector):
+    """Each fetch takes ``delays[name]`` seconds; a delay of None raises"""
+    source = 'slow'
+
+    def __init__(self, delays, max_concurrency=10):
+        super().__init__([{'name': name} for name in delays])
+        self.cache = ResponseCache(100)
+        self.delays = delays
+        self.max_concurrency = max_concurrency
+        self.in_flight = self.peak = 0
+
+    async def fetch(self, target):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            if self.delays[target['name']] is None:
+                raise RuntimeError('bad payload')
+            await asyncio.sleep(self.delays[target['name']])
+            return {'name': target['name']}
+        finally:
+            self.in_flight -= 1
+
+    def transform(self, data, location):
+        return {'location_name': location['name']}
+
+def collect(collector, timeout=None):
+    return asyncio.run(collector.collect_async(timeout=timeout))
+
+def names(measurements):
+    return [measurement['location_name'] for measurement in measurements]
+
+def test_locations_are_fetched_concurrently_in_location_order():
+    delays = {f"location-{number}": 0.05 * (5 - number) for number in range(5)}
+    collector = SlowCollector(delays)
+    assert names(collect(collector)) == list(delays)
+    assert collector.peak == 5
+
+def test_requests_in_flight_are_bounded():
+    collector = SlowCollector({f"location-{number}": 0.01 for number in range(12)}, max_concurrency=3)
+    assert len(collect(collector)) == 12
+    assert collector.peak == 3
+
+def test_a_timeout_returns_what_arrived_in_time():
+    collector = SlowCollector({'fast': 0.01, 'slow': 5, 'faster': 0})
+    assert names(collect(collector, timeout=0.2)) == ['fast', 'faster']
+
+def test_a_failing_location_doesnt_stop_the_others():
+    collector = SlowCollector({'broken': None, 'fine': 0})
+    assert names(collect(collector)) == ['fine']
+    assert collector.stats['errors'] == 1
@@ -0,0 +1,61 @@
+from datetime import datetime
+import pandas as pd
+from transformers.data_transformer import MEASUREMENT_DTYPES, DataTransformer
+
+WEATHER = [
+    {
+        'location_name': 'Paris Nord', 'latitude': 48.8809, 'longitude': 2.3553,
+        'timestamp': datetime(2024, 5, 15, 14, 0), 'temperature': 18.5, 'humidity': 60.0,
+        'pm25': 99.0, 'source': 'openweather'
+    },
+    {
+        'location_name': 'Paris Est', 'latitude': 48.8768, 'longitude': 2.3592,
+        'timestamp': datetime(2024, 5, 15, 14, 0), 'temperature': 19.0, 'source': 'openweather'
+    },
+]
+AIR_QUALITY = [
+    {
+        'location_name': 'Paris Nord', 'latitude': 48.9, 'longitude': 2.4,
+        'timestamp': datetime(2024, 5, 15, 14, 20), 'pm25': 12.0, 'no2': 40.0, 'source': 'openaq'
+    },
+    {'location_name': 'Paris Sud', 'timestamp': datetime(2024, 5, 15, 14, 20), 'pm25': 8.0, 'source': 'openaq'},
+]
+
+def rows(frame):
+    return frame.set_index('location_name')
+
+def test_sources_are_merged_on_location():
+    frame = rows(DataTransformer().transform_frame(WEATHER, AIR_QUALITY))
+    # Paris Sud has no coordinates from any source and is dropped
+    assert sorted(frame.index) == ['Paris Est', 'Paris Nord']
+
+    nord = frame.loc['Paris Nord']
+    assert nord['source'] == 'combined'
+    # Earlier sources win for coordinates, later ones for overlapping readings
+    assert (nord['latitude'], nord['longitude']) == (48.8809, 2.3553)
+    assert (nord['temperature'], nord['pm25'], nord['no2']) == (18.5, 12.0, 40.0)
+    # Stamped with the latest observation among the sources
+    assert nord['timestamp'] == pd.Timestamp('2024-05-15 14:20')
+    assert frame.loc['Paris Est', 'source'] == 'openweather'
+
+def test_aqi_is_scored_on_the_merged_pollutants():
+    frame = rows(DataTransformer().transform_frame(WEATHER, AIR_QUALITY))
+    assert frame.loc['Paris Nord', 'dominant_pollutant'] == 'pm25'
+    assert frame.loc['Paris Nord', 'aqi'] == 50
+    assert pd.isna(frame.loc['Paris Est', 'aqi'])
+
+def test_the_frame_has_the_load_schema():
+    frame = DataTransformer().transform_frame(pd.DataFrame(WEATHER), AIR_QUALITY)
+    assert frame.dtypes.astype(str).to_dict() == MEASUREMENT_DTYPES
+    assert frame['traffic_level'].between(1, 10).all()
+
+def test_empty_batches_give_an_empty_typed_frame():
+    frame = DataTransformer().transform_frame([], pd.DataFrame())
+    assert frame.empty
+    assert frame.dtypes.astype(str).to_dict() == MEASUREMENT_DTYPES
+
+def test_transform_returns_plain_python_values():
+    records = DataTransformer().transform(WEATHER)
+    est = next(record for record in records if record['location_name'] == 'Paris Est')
+    assert est['pm25'] is None and est['aqi'] is None
+    assert type(est['timestamp']) is datetime
@@ -0,0 +1,188 @@
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+import pytest
+from sqlalchemy import text
+import database
+from aqi import to_micrograms
+
+def co_readings(series):
+    """Hourly CO readings per location, oldest first"""
+    start = datetime.utcnow().replace(hour=8, minute=0, second=0, microsecond=0) - timedelta(days=1)
+    return pd.DataFrame([
+        {
+            'location_name': location, 'latitude': 48.88, 'longitude': 2.35,
+            'timestamp': start + timedelta(hours=hour), 'co': value, 'source': 'openaq'
+        }
+        for location, values in series.items()
+        for hour, value in enumerate(values)
+    ])
+
+def co_by_location(db, sql):
+    with db.engine.connect() as conn:
+        rows = conn.execute(text(f"""
+            SELECT l.name, t.value FROM ({sql}) t JOIN locations l ON l.id = t.location_id
+        """)).all()
+    values = {}
+    for name, value in rows:
+        values.setdefault(name, []).append(float(value))
+    return {name: sorted(series) for name, series in values.items()}
+
+def test_legacy_units_are_converted_per_location_in_every_table(db):
+    # A ppm station, and a µg/m³ station whose latest reading happens to be tiny
+    db.insert_measurements(co_readings({'Legacy': [0.3, 0.6, 0.9], 'Modern': [300.0, 250.0, 0.4]}))
+    factor = to_micrograms('co', 1.0, 'ppm')
+
+    changed = db.convert_legacy_units(datetime.utcnow() + timedelta(minutes=1))
+    assert changed == {'measurements': 3, 'current_measurements': 1, 'measurements_hourly': 3, 'measurements_daily': 1}
+
+    raw = co_by_location(db, "SELECT location_id, co AS value FROM measurements")
+    assert raw['Legacy'] == pytest.approx([0.3 * factor, 0.6 * factor, 0.9 * factor])
+    assert raw['Modern'] == [0.4, 250.0, 300.0]
+    current = co_by_location(db, "SELECT location_id, co AS value FROM current_measurements")
+    assert current == {'Legacy': pytest.approx([0.9 * factor]), 'Modern': [0.4]}
+    hourly = co_by_location(db, "SELECT location_id, max_co AS value FROM measurements_hourly")
+    assert hourly['Legacy'] == pytest.approx(raw['Legacy'])
+    assert hourly['Modern'] == [0.4, 250.0, 300.0]
+
+    # Converted series sit above the limits, so a second run is a no-op
+    assert sum(db.convert_legacy_units(datetime.utcnow() + timedelta(minutes=1)).values()) == 0
+
+def test_bulk_insert_copies_every_chunk(db, monkeypatch):
+    monkeypatch.setattr(database, 'COPY_CHUNK_ROWS', 3)
+    alerts = db.locations.attach(pd.DataFrame({
+        'alert_type': 'pm25', 'severity': 'high', 'location_name': 'Paris Nord',
+        # CSV quoting has to survive commas, quotes and newlines
+        'message': [f'PM25, "high"\nreading {number}' for number in range(7)],
+        'threshold_value': [35.0] * 6 + [None],
+        'actual_value': 40.0, 'is_active': True,
+    }))
+    assert db.bulk_insert('alerts', alerts) == 7
+
+    with db.engine.connect() as conn:
+        rows = conn.execute(text("SELECT message, threshold_value, created_at FROM alerts ORDER BY id")).all()
+    assert [row.message for row in rows] == list(alerts['message'])
+    assert rows[-1].threshold_value is None
+    assert all(row.created_at is not None for row in rows)
+
+def observation(timestamp, pm25, **values):
+    return {
+        'location_name': 'Paris Nord', 'latitude': 48.8809, 'longitude': 2.3553,
+        'timestamp': timestamp, 'pm25': pm25, 'source': 'openaq', **values
+    }
+
+def stored(db, table, columns):
+    with db.engine.connect() as conn:
+        return conn.execute(text(f"SELECT {columns} FROM {table} ORDER BY timestamp")).all()
+
+def test_reloading_an_observation_updates_it_in_place(db):
+    noon = datetime(2024, 5, 15, 12, 0)
+    assert db.upsert_measurements(pd.DataFrame([observation(noon, 12.0, traffic_level=4)])) == 1
+    (first,) = stored(db, 'measurements', 'id, pm25, traffic_level, created_at')
+
+    # The same observation again changes nothing
+    assert db.upsert_measurements(pd.DataFrame([observation(noon, 12.0, traffic_level=9)])) == 0
+    # A corrected value updates the row but keeps its id, traffic level and first load time
+    assert db.upsert_measurements(pd.DataFrame([observation(noon, 14.0, traffic_level=9)])) == 1
+    assert stored(db, 'measurements', 'id, pm25, traffic_level, created_at') == [
+        (first.id, 14.0, 4, first.created_at)
+    ]
+
+def test_duplicates_within_a_batch_keep_the_last(db):
+    noon = datetime(2024, 5, 15, 12, 0)
+    batch = pd.DataFrame([observation(noon, 12.0), observation(noon, 13.0)])
+    assert db.upsert_measurements(batch) == 1
+    assert stored(db, 'measurements', 'pm25') == [(13.0,)]
+
+def test_current_measurements_only_move_forward(db):
+    noon, one = datetime(2024, 5, 15, 12, 0), datetime(2024, 5, 15, 13, 0)
+    db.upsert_measurements(pd.DataFrame([observation(noon, 12.0), observation(one, 20.0)]))
+    # current_measurements.timestamp is timestamptz
+    one = one.replace(tzinfo=timezone.utc)
+    assert stored(db, 'current_measurements', 'timestamp, pm25') == [(one, 20.0)]
+
+    # A late reading is stored but doesn't replace the current one
+    db.upsert_measurements(pd.DataFrame([observation(datetime(2024, 5, 15, 12, 30), 15.0)]))
+    assert stored(db, 'current_measurements', 'timestamp, pm25') == [(one, 20.0)]
+    assert len(stored(db, 'measurements', 'pm25')) == 3
+
+def rollup(db, table):
+    with db.engine.connect() as conn:
+        return [
+            tuple(row) for row in conn.execute(text(f"""
+                SELECT sample_count, avg_pm25, min_pm25, max_pm25, count_pm25, count_temperature
+                FROM {table} ORDER BY bucket
+            """))
+        ]
+
+def test_loads_refresh_the_buckets_they_touch(db):
+    day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+    db.insert_measurements(pd.DataFrame([
+        observation(day + timedelta(hours=10), 10.0), observation(day + timedelta(hours=10, minutes=30), 20.0)
+    ]))
+    db.insert_measurements(pd.DataFrame([
+        observation(day + timedelta(hours=10, minutes=45), 30.0),
+        observation(day + timedelta(hours=11), 60.0, temperature=18.5),
+    ]))
+    assert rollup(db, 'measurements_hourly') == [(3, 20.0, 10.0, 30.0, 3, 0), (1, 60.0, 60.0, 60.0, 1, 1)]
+    # Days weight each hour by its reading count
+    assert rollup(db, 'measurements_daily') == [(4, 30.0, 10.0, 60.0, 4, 1)]
+
+    # A corrected reading is reflected in both rollups
+    db.insert_measurements(pd.DataFrame([observation(day + timedelta(hours=11), 20.0, temperature=18.5)]))
+    assert rollup(db, 'measurements_hourly')[1] == (1, 20.0, 20.0, 20.0, 1, 1)
+    assert rollup(db, 'measurements_daily') == [(4, 20.0, 10.0, 30.0, 4, 1)]
+
+def add_alert_config(db, parameter, threshold, severity, enabled=True):
+    with db.engine.begin() as conn:
+        return conn.execute(text("""
+            INSERT INTO alert_configs (parameter, threshold_value, severity, rule_type, is_enabled, created_at, updated_at)
+            VALUES (:parameter, :threshold, :severity, 'threshold', :enabled, now(), now())
+            RETURNING id
+        """), {"parameter": parameter, "threshold": threshold, "severity": severity, "enabled": enabled}).scalar()
+
+def test_threshold_alerts_keep_the_highest_breach_per_location(db):
+    high = add_alert_config(db, 'pm25', 35, 'high')
+    critical = add_alert_config(db, 'pm25', 75, 'critical')
+    add_alert_config(db, 'no2', 200, 'high', enabled=False)
+    recent = datetime.utcnow() - timedelta(minutes=10)
+    db.upsert_measurements(pd.DataFrame([
+        dict(observation(recent, 80.0, no2=250.0), location_name='Paris Nord'),
+        dict(observation(recent, 40.0), location_name='Paris Est'),
+        dict(observation(recent, 20.0), location_name='Paris Sud'),
+        # Readings older than an hour are not checked
+        dict(observation(recent - timedelta(hours=2), 90.0), location_name='Paris Sud'),
+    ]))
+
+    db.check_alert_thresholds()
+    with db.engine.connect() as conn:
+        alerts = conn.execute(text("""
+            SELECT l.name, a.config_id, a.alert_type, a.severity, a.actual_value FROM alerts a
+            JOIN locations l ON l.id = a.location_id ORDER BY l.name
+        """)).all()
+    assert [tuple(alert) for alert in alerts] == [
+        ('Paris Est', high, 'pm25', 'high', 40.0), ('Paris Nord', critical, 'pm25', 'critical', 80.0)
+    ]
+
+    # Open alerts aren't raised again
+    db.check_alert_thresholds()
+    with db.engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM alerts")).scalar() == 2
+
+def test_current_measurements_keep_one_row_per_location_and_source(db):
+    noon = datetime(2024, 5, 15, 12, 0)
+    db.upsert_measurements(pd.DataFrame([
+        observation(noon, 12.0),
+        dict(observation(noon, None, temperature=18.5), source='openweather'),
+        dict(observation(noon, 30.0), location_name='Paris Est'),
+    ]))
+    db.upsert_measurements(pd.DataFrame([observation(noon + timedelta(hours=1), 14.0)]))
+    with db.engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT l.name, c.source, c.pm25, c.temperature FROM current_measurements c
+            JOIN locations l ON l.id = c.location_id ORDER BY 1, 2
+        """)).all()
+    assert [tuple(row) for row in rows] == [
+        ('Paris Est', 'openaq', 30.0, None),
+        ('Paris Nord', 'openaq', 14.0, None),
+        ('Paris Nord', 'openweather', None, 18.5),
+    ]
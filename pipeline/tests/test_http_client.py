@@ -0,0 +1,136 @@
+import asyncio
+import time
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from collectors import http_client
+from collectors.http_client import CircuitBreaker, CircuitOpenError, ProviderClient, ProviderError, TokenBucket
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(http_client, 'time', clock)
+    return clock
+
+def test_the_breaker_opens_after_repeated_failures_and_probes_once(clock):
+    breaker = CircuitBreaker('openaq', failure_threshold=3, reset_timeout=60)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == breaker.OPEN and not breaker.allow()
+
+    clock.now += 60
+    assert breaker.allow() and breaker.state == breaker.HALF_OPEN
+    # Only the one probe goes through
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == breaker.CLOSED and breaker.allow()
+
+def test_a_failed_probe_reopens_the_breaker(clock):
+    breaker = CircuitBreaker('openaq', failure_threshold=3, reset_timeout=60)
+    breaker.state, breaker.opened_at = breaker.OPEN, clock.now
+    clock.now += 60
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN and not breaker.allow()
+
+def test_a_released_probe_lets_the_next_request_probe(clock):
+    breaker = CircuitBreaker('openaq', failure_threshold=3, reset_timeout=60)
+    breaker.state, breaker.opened_at = breaker.OPEN, clock.now
+    clock.now += 60
+    assert breaker.allow()
+    breaker.release_probe()
+    assert breaker.allow() and breaker.state == breaker.HALF_OPEN
+
+def test_a_probe_that_never_reports_back_expires(clock):
+    breaker = CircuitBreaker('openaq', failure_threshold=3, reset_timeout=60)
+    breaker.state, breaker.opened_at = breaker.OPEN, clock.now
+    clock.now += 60
+    assert breaker.allow()
+    clock.now += 30
+    assert not breaker.allow()
+    clock.now += 30
+    assert breaker.allow()
+
+def test_a_paused_bucket_refills_from_the_end_of_the_pause(clock):
+    bucket = TokenBucket(rate=10, capacity=5)
+    bucket.pause(2)
+    clock.now += 2.1
+    bucket._refill(clock.now)
+    assert bucket.tokens == pytest.approx(1)
+
+def serve(statuses, headers=None):
+    """Serve one queued status per request, then 200s; returns the server and its request log"""
+    queue = list(statuses)
+    requests = []
+
+    async def handler(request):
+        requests.append(request.path)
+        status = queue.pop(0) if queue else 200
+        if status == 200:
+            return web.json_response({'results': [1, 2]})
+        return web.json_response({}, status=status, headers=headers or {})
+
+    app = web.Application()
+    app.router.add_get('/data', handler)
+    return TestServer(app), requests
+
+def fetch(statuses, client=None, headers=None):
+    async def main():
+        server, requests = serve(statuses, headers)
+        await server.start_server()
+        provider = client or ProviderClient('test', rate=1000, burst=100)
+        try:
+            try:
+                return await provider.get_json(str(server.make_url('/data'))), len(requests)
+            except ProviderError as e:
+                return e, len(requests)
+        finally:
+            await provider.close()
+            await server.close()
+    return asyncio.run(main())
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(http_client, 'HTTP_MAX_RETRIES', 2)
+    monkeypatch.setattr(ProviderClient, '_backoff', lambda self, attempt: 0)
+
+def test_transient_failures_are_retried():
+    assert fetch([503, 502]) == ({'results': [1, 2]}, 3)
+
+def test_retries_give_up_with_the_last_error():
+    error, requests = fetch([503, 503, 500])
+    assert requests == 3
+    assert str(error) == 'test returned HTTP 500'
+
+def test_client_errors_are_not_retried():
+    error, requests = fetch([404])
+    assert requests == 1 and str(error) == 'test returned HTTP 404'
+
+def test_throttling_pauses_the_whole_client():
+    client = ProviderClient('test', rate=1000, burst=100)
+    assert fetch([429], client=client, headers={'Retry-After': '0'}) == ({'results': [1, 2]}, 2)
+    assert client.limiter.paused_until > 0
+    assert client.breaker.failures == 0
+
+def test_an_open_circuit_rejects_requests_without_sending_them(monkeypatch):
+    monkeypatch.setattr(http_client, 'HTTP_MAX_RETRIES', 0)
+    client = ProviderClient('test', rate=1000, burst=100)
+    for _ in range(client.breaker.failure_threshold):
+        fetch([503], client=client)
+    error, requests = fetch([], client=client)
+    assert isinstance(error, CircuitOpenError) and requests == 0
+
+def test_a_throttled_probe_is_retried_instead_of_blocking_the_circuit():
+    client = ProviderClient('test', rate=1000, burst=100)
+    breaker = client.breaker
+    breaker.state, breaker.opened_at = breaker.OPEN, time.monotonic() - breaker.reset_timeout
+    assert fetch([429], client=client, headers={'Retry-After': '0'}) == ({'results': [1, 2]}, 2)
+    assert breaker.state == breaker.CLOSED
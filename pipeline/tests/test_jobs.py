@@ -0,0 +1,94 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+from jobs import AsyncScheduler, Job, run_in_thread
+
+def test_a_cancelled_job_waits_for_its_thread():
+    finished = threading.Event()
+
+    def slow():
+        time.sleep(0.2)
+        finished.set()
+
+    async def main():
+        task = asyncio.create_task(run_in_thread(slow))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return finished.is_set()
+
+    assert asyncio.run(main())
+
+def test_jitter_is_capped_at_a_tenth_of_the_interval():
+    job = Job('openaq', None, 60, jitter=30)
+    assert job.jitter == 6
+    assert job.deadline == pytest.approx(54)
+
+def test_overdue_jobs_run_at_once_and_recent_ones_wait(tmp_path):
+    path = tmp_path / 'schedule.json'
+    now = time.time()
+    path.write_text(json.dumps({'overdue': now - 500, 'recent': now - 100}))
+    scheduler = AsyncScheduler([], str(path))
+
+    assert scheduler._first_due(Job('overdue', None, 300)) == pytest.approx(now, abs=1)
+    assert scheduler._first_due(Job('recent', None, 300)) == pytest.approx(now + 200, abs=1)
+    assert scheduler._first_due(Job('new', None, 300)) == pytest.approx(now, abs=1)
+
+def run_for(scheduler, seconds):
+    async def main():
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(seconds)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    asyncio.run(main())
+
+def test_jobs_run_on_their_own_cadence_and_record_their_last_run(tmp_path):
+    runs = {'fast': 0, 'slow': 0}
+
+    def job(name):
+        async def run():
+            runs[name] += 1
+        return run
+
+    path = tmp_path / 'schedule.json'
+    scheduler = AsyncScheduler([Job('fast', job('fast'), 0.1, jitter=0), Job('slow', job('slow'), 10, jitter=0)], str(path))
+    run_for(scheduler, 0.35)
+
+    assert runs['fast'] == 4 and runs['slow'] == 1
+    assert set(json.loads(path.read_text())) == {'fast', 'slow'}
+
+def test_runs_past_their_deadline_are_cancelled_without_stopping_the_job(tmp_path):
+    started = []
+
+    async def stuck():
+        started.append(time.time())
+        await asyncio.sleep(10)
+
+    scheduler = AsyncScheduler([Job('stuck', stuck, 0.1, jitter=0, deadline=0.05)], None)
+    run_for(scheduler, 0.25)
+    assert len(started) == 3
+
+def test_failures_are_logged_and_the_job_keeps_running():
+    runs = []
+
+    async def failing():
+        runs.append(1)
+        raise RuntimeError('provider down')
+
+    run_for(AsyncScheduler([Job('failing', failing, 0.1, jitter=0)], None), 0.25)
+    assert len(runs) == 3
+
+def test_overruns_skip_the_ticks_they_missed():
+    started = []
+
+    async def slow():
+        started.append(time.time())
+        await asyncio.sleep(0.25)
+
+    run_for(AsyncScheduler([Job('slow', slow, 0.1, jitter=0, deadline=1)], None), 0.35)
+    # Ticks at 0.1 and 0.2 passed during the first run, so the next one starts at 0.3
+    assert len(started) == 2
+    assert started[1] - started[0] == pytest.approx(0.3, abs=0.04)
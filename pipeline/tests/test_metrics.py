@@ -0,0 +1,46 @@
+import json
+import pytest
+from prometheus_client import REGISTRY
+from metrics import RunSummary, timed
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+def test_summaries_record_stages_rows_and_errors(tmp_path):
+    path = tmp_path / 'state' / 'runs.jsonl'
+    runs = sample('pipeline_runs_total', job='metrics-test', status='failed')
+    summary = RunSummary('metrics-test', str(path))
+
+    with summary.stage('collect', 'openaq'):
+        pass
+    summary.count('collect', 12, 'openaq')
+    with pytest.raises(RuntimeError):
+        with summary.stage('load'):
+            raise RuntimeError('database unavailable')
+    summary.error('run', RuntimeError('database unavailable'))
+    summary.extra['locations'] = 3
+    summary.finish('failed')
+
+    (line,) = path.read_text().splitlines()
+    recorded = json.loads(line)
+    assert recorded['job'] == 'metrics-test' and recorded['status'] == 'failed'
+    assert set(recorded['stages']) == {'collect.openaq', 'load'}
+    assert recorded['rows'] == {'collect.openaq': 12}
+    assert recorded['errors'] == {'load': 1, 'run': 1}
+    assert recorded['error'] == 'RuntimeError: database unavailable'
+    assert recorded['locations'] == 3
+    assert sample('pipeline_runs_total', job='metrics-test', status='failed') == runs + 1
+
+def test_timed_blocks_are_observed_and_failures_counted():
+    observed = sample('pipeline_stage_duration_seconds_count', stage='metrics-test', source='all')
+    errors = sample('pipeline_errors_total', stage='metrics-test', source='all')
+    with timed('metrics-test'):
+        pass
+    with pytest.raises(ValueError):
+        with timed('metrics-test'):
+            raise ValueError('bad batch')
+    assert sample('pipeline_stage_duration_seconds_count', stage='metrics-test', source='all') == observed + 2
+    assert sample('pipeline_errors_total', stage='metrics-test', source='all') == errors + 1
+
+def test_a_summary_without_a_path_is_only_logged():
+    assert RunSummary('metrics-test', None).finish()['status'] == 'ok'
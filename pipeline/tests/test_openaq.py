@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+from aqi import to_micrograms
+from collectors.http_client import ProviderError
+from collectors.openaq import OpenAQCollector
+from collectors.spatial import GridIndex, haversine_km
+
+LOCATION = {'name': 'Paris Nord', 'lat': 48.8809, 'lon': 2.3553}
+
+def payload(*measurements):
+    return {'measurements': [
+        {'parameter': parameter, 'value': value, 'unit': unit, 'lastUpdated': '2024-05-15T12:00:00+02:00'}
+        for parameter, value, unit in measurements
+    ]}
+
+@pytest.fixture
+def collector():
+    return OpenAQCollector([LOCATION])
+
+def test_gases_are_stored_in_micrograms(collector):
+    reading = collector.transform(payload(('co', 0.4, 'ppm'), ('no2', 20.0, 'µg/m³')), LOCATION)
+    assert reading['co'] == pytest.approx(to_micrograms('co', 0.4, 'ppm'))
+    assert reading['no2'] == 20.0
+    assert str(reading['timestamp']) == '2024-05-15 10:00:00'
+
+def test_readings_beyond_the_index_scale_are_kept(collector):
+    # Wildfire smoke and dust storms, well past the top breakpoints
+    reading = collector.transform(payload(('pm25', 812.0, 'µg/m³'), ('pm10', 2400.0, 'µg/m³')), LOCATION)
+    assert (reading['pm25'], reading['pm10']) == (812.0, 2400.0)
+
+@pytest.mark.parametrize('value', [-999.0, float('nan'), float('inf'), 1e7])
+def test_faulty_readings_are_dropped(collector, value):
+    reading = collector.transform(payload(('pm25', value, 'µg/m³'), ('pm10', 40.0, 'µg/m³')), LOCATION)
+    assert 'pm25' not in reading
+    assert reading['pm10'] == 40.0
+
+NORD = LOCATION
+EST = {'name': 'Paris Est', 'lat': 48.8768, 'lon': 2.3592}
+LYON = {'name': 'Lyon', 'lat': 45.7640, 'lon': 4.8357}
+STATIONS = [
+    {'station_id': 1, 'name': 'Paris Centre', 'lat': 48.8790, 'lon': 2.3570},
+    {'station_id': 2, 'name': 'Lyon Centre', 'lat': 45.7600, 'lon': 4.8400},
+]
+
+def plan(collector, timeout=None):
+    return asyncio.run(collector.plan(timeout))
+
+def targets(groups):
+    return {target['name']: [location['name'] for location in locations] for target, locations in groups}
+
+def test_locations_near_one_station_share_a_fetch(monkeypatch):
+    collector = OpenAQCollector([NORD, EST, LYON])
+    queries = []
+
+    async def discover(center, radius):
+        queries.append(center)
+        return STATIONS
+
+    monkeypatch.setattr(collector, '_discover_stations', discover)
+    assert targets(plan(collector)) == {'Paris Centre': ['Paris Nord', 'Paris Est'], 'Lyon Centre': ['Lyon']}
+    # One discovery query per occupied grid cell, not per location
+    assert len(queries) == 2
+    # The station index is reused until it goes stale
+    plan(collector)
+    assert len(queries) == 2
+
+def test_locations_in_a_failed_cell_fall_back_to_their_own_query(monkeypatch):
+    collector = OpenAQCollector([NORD, LYON])
+
+    async def discover(center, radius):
+        if center[0] < 47:
+            raise ProviderError('openaq returned HTTP 503')
+        return STATIONS
+
+    monkeypatch.setattr(collector, '_discover_stations', discover)
+    assert targets(plan(collector)) == {'Paris Centre': ['Paris Nord'], 'Lyon': ['Lyon']}
+    assert collector.stations_refreshed_at is None
+
+def test_a_slow_refresh_falls_back_to_per_location_targets(monkeypatch):
+    collector = OpenAQCollector([NORD, EST])
+
+    async def discover(center, radius):
+        await asyncio.sleep(1)
+        return STATIONS
+
+    monkeypatch.setattr(collector, '_discover_stations', discover)
+    assert targets(plan(collector, timeout=0.1)) == {'Paris Nord': ['Paris Nord'], 'Paris Est': ['Paris Est']}
+
+def test_the_grid_finds_points_across_cell_borders():
+    grid = GridIndex(2)
+    for station in STATIONS:
+        grid.insert(station['lat'], station['lon'], station['name'])
+    assert grid.nearest(NORD['lat'], NORD['lon'], 2) == 'Paris Centre'
+    assert grid.nearest(NORD['lat'], NORD['lon'], 0.1) is None
+    assert haversine_km(NORD['lat'], NORD['lon'], LYON['lat'], LYON['lon']) == pytest.approx(392, abs=2)
@@ -0,0 +1,56 @@
+from datetime import datetime
+import pandas as pd
+import pytest
+from sqlalchemy import text
+from partitions import PartitionManager, add_months
+
+def this_month():
+    return datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+@pytest.fixture
+def partitions(db):
+    """A PartitionManager that drops the partitions a test adds beyond the usual window"""
+    manager = PartitionManager(db.engine, months_ahead=3, expiry='drop')
+    with db.engine.connect() as conn:
+        before = set(manager.partitions(conn))
+    yield manager
+    with db.engine.begin() as conn:
+        for month in set(manager.partitions(conn)) - before:
+            manager.expire(conn, month)
+        conn.execute(text("DROP TABLE IF EXISTS measurements_detached_test"))
+
+def test_add_months_wraps_years():
+    assert add_months(datetime(2024, 11, 1), 3) == datetime(2025, 2, 1)
+    assert add_months(datetime(2024, 1, 1), -1) == datetime(2023, 12, 1)
+
+def test_upcoming_months_are_created_once(db, partitions):
+    partitions.maintain()
+    with db.engine.connect() as conn:
+        months = partitions.partitions(conn)
+    assert all(add_months(this_month(), offset) in months for offset in range(4))
+    assert partitions.maintain() == []
+
+def test_rows_in_the_default_partition_move_to_their_new_month(db, partitions):
+    month = add_months(this_month(), 24)
+    db.upsert_measurements(pd.DataFrame([{
+        'location_name': 'Paris Nord', 'latitude': 48.8809, 'longitude': 2.3553,
+        'timestamp': month.replace(day=15), 'pm25': 12.0, 'source': 'openaq'
+    }]))
+
+    def partition():
+        with db.engine.connect() as conn:
+            return conn.execute(text("SELECT tableoid::regclass::text FROM measurements")).scalar()
+
+    assert partition() == 'measurements_default'
+    PartitionManager(db.engine, months_ahead=24).maintain()
+    assert partition() == f"measurements_{month:%Y_%m}"
+
+def test_expired_partitions_are_detached_or_dropped(db, partitions):
+    month = add_months(this_month(), 30)
+    PartitionManager(db.engine, months_ahead=30).maintain()
+    with db.engine.begin() as conn:
+        PartitionManager(db.engine, expiry='detach').expire(conn, month)
+        assert month not in partitions.partitions(conn)
+        # Detached partitions are kept as plain tables
+        assert conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": f"measurements_{month:%Y_%m}"}).scalar()
+        conn.execute(text(f"ALTER TABLE measurements_{month:%Y_%m} RENAME TO measurements_detached_test"))
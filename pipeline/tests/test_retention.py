@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+import pandas as pd
+import pytest
+from sqlalchemy import text
+from partitions import PartitionManager
+from retention import RetentionManager
+
+def readings(day, locations=('Paris Nord', 'Paris Est'), per_hour=4):
+    """Readings every 15 minutes over one UTC day, pm25 rising through it"""
+    times = pd.date_range(day, periods=24 * per_hour, freq=f'{60 // per_hour}min')
+    return pd.DataFrame([
+        {
+            'location_name': location, 'latitude': 48.88, 'longitude': 2.35,
+            'timestamp': timestamp, 'pm25': float(index), 'source': 'openaq'
+        }
+        for location in locations
+        for index, timestamp in enumerate(times)
+    ])
+
+def rollups(db, table):
+    with db.engine.connect() as conn:
+        return pd.read_sql(
+            text(f"SELECT location_id, bucket, sample_count, avg_pm25, min_pm25, max_pm25 FROM {table} ORDER BY 1, 2"),
+            conn
+        )
+
+def raw_rows(db):
+    with db.engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM measurements")).scalar()
+
+@pytest.fixture
+def aged_day(db):
+    day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=5)
+    db.insert_measurements(readings(day))
+    return day
+
+def retention(db, **options):
+    return RetentionManager(db, PartitionManager(db.engine), raw_days=2, hourly_months=0, pause=0, **options)
+
+def test_aged_rows_are_downsampled_then_purged(db, aged_day):
+    hourly = rollups(db, 'measurements_hourly')
+    assert len(hourly) == 48 and (hourly['sample_count'] == 4).all()
+
+    purged = retention(db, chunk_rows=50).run()
+    assert purged['raw_rows'] == 192
+    assert raw_rows(db) == 0
+    pd.testing.assert_frame_equal(rollups(db, 'measurements_hourly'), hourly)
+
+def test_an_interrupted_purge_keeps_the_rollups(db, aged_day, monkeypatch):
+    hourly, daily = rollups(db, 'measurements_hourly'), rollups(db, 'measurements_daily')
+
+    interrupted = retention(db, chunk_rows=50)
+
+    def die_after_one_chunk(table, column, before, since=None):
+        # The first chunk's rows are scattered over the whole day
+        with db.engine.begin() as conn:
+            conn.execute(text("""
+                DELETE FROM measurements WHERE id IN (SELECT id FROM measurements ORDER BY random() LIMIT 50)
+            """))
+        raise RuntimeError('worker killed mid-purge')
+
+    monkeypatch.setattr(interrupted, '_purge_chunks', die_after_one_chunk)
+    with pytest.raises(RuntimeError):
+        interrupted.run()
+    assert raw_rows(db) == 142
+
+    # The next run downsamples what is left of the day before purging it
+    retention(db, chunk_rows=50).run()
+    assert raw_rows(db) == 0
+    pd.testing.assert_frame_equal(rollups(db, 'measurements_hourly'), hourly)
+    pd.testing.assert_frame_equal(rollups(db, 'measurements_daily'), daily)
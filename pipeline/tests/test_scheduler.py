@@ -0,0 +1,126 @@
+import asyncio
+import json
+import threading
+import pandas as pd
+import scheduler
+from metrics import RunSummary
+from scheduler import ETLPipeline
+
+class FakeCollector:
+    def __init__(self, source, rows=(), error=None):
+        self.source = source
+        self.rows = list(rows)
+        self.error = error
+        self.stats = {'fetched': len(self.rows)}
+        self.locations = None
+        self.pending_markers = {}
+        self.committed = self.discarded = 0
+
+    def set_locations(self, locations):
+        self.locations = locations
+
+    async def collect_async(self, timeout=None):
+        if self.error:
+            raise self.error
+        self.pending_markers = {'Paris Nord': 'marker'}
+        return self.rows
+
+    def commit_markers(self):
+        self.committed += 1
+
+    def discard_markers(self):
+        self.discarded += 1
+
+class FakeTransformer:
+    def transform_frame(self, *batches):
+        return pd.DataFrame([row for batch in batches for row in batch])
+
+def pipeline(tmp_path, monkeypatch, collectors, load=None):
+    """An ETLPipeline with fake collectors and sink, and no database"""
+    etl = ETLPipeline.__new__(ETLPipeline)
+    etl.collectors = {collector.source: collector for collector in collectors}
+    etl.transformer = FakeTransformer()
+    etl.spool = None
+    etl.shards = None
+    etl.summary_path = str(tmp_path / 'runs.jsonl')
+    etl.loaded = []
+    etl.load_measurements = load or (lambda frame, summary: etl.loaded.append(frame))
+    etl.loop_thread = None
+
+    def assign_locations(sources):
+        # Catalog reads block, so they must not run on the loop's thread
+        etl.catalog_thread = threading.get_ident()
+        for source in sources:
+            etl.collectors[source].set_locations(['Paris Nord'])
+        return ['Paris Nord']
+
+    etl.assign_locations = assign_locations
+    monkeypatch.setattr(scheduler, 'PIPELINE_MODE', 'batch')
+    return etl
+
+def run(etl, sources=None):
+    async def main():
+        etl.loop_thread = threading.get_ident()
+        await etl.run_sources(sources)
+    asyncio.run(main())
+    with open(etl.summary_path) as f:
+        return json.loads(f.readlines()[-1])
+
+def test_a_run_merges_every_source_and_commits_their_markers(tmp_path, monkeypatch):
+    weather = FakeCollector('openweather', [{'location_name': 'Paris Nord', 'temperature': 18.5}])
+    air = FakeCollector('openaq', [{'location_name': 'Paris Nord', 'pm25': 12.0}])
+    etl = pipeline(tmp_path, monkeypatch, [weather, air])
+
+    summary = run(etl)
+    assert summary['status'] == 'ok' and summary['locations'] == 1
+    assert etl.catalog_thread != etl.loop_thread
+    assert weather.locations == air.locations == ['Paris Nord']
+    assert len(etl.loaded) == 1 and len(etl.loaded[0]) == 2
+    assert (weather.committed, air.committed) == (1, 1)
+
+def test_a_failing_collector_doesnt_stop_the_others(tmp_path, monkeypatch):
+    weather = FakeCollector('openweather', error=RuntimeError('timeout'))
+    air = FakeCollector('openaq', [{'location_name': 'Paris Nord', 'pm25': 12.0}])
+    etl = pipeline(tmp_path, monkeypatch, [weather, air])
+
+    summary = run(etl)
+    assert summary['status'] == 'ok'
+    assert summary['errors'] == {'collect.openweather': 1}
+    assert len(etl.loaded[0]) == 1
+
+def test_a_failed_load_discards_the_markers(tmp_path, monkeypatch):
+    def load(frame, summary):
+        raise RuntimeError('database unavailable')
+
+    air = FakeCollector('openaq', [{'location_name': 'Paris Nord', 'pm25': 12.0}])
+    etl = pipeline(tmp_path, monkeypatch, [air], load=load)
+
+    summary = run(etl, ['openaq'])
+    assert summary['status'] == 'failed'
+    assert summary['error'] == 'RuntimeError: database unavailable'
+    assert (air.committed, air.discarded) == (0, 1)
+
+def test_sources_sharing_an_interval_share_a_job(tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler, 'SOURCE_INTERVALS', {'openweather': 30, 'openaq': 5, 'sensors': 5})
+    etl = pipeline(tmp_path, monkeypatch, [FakeCollector('openweather'), FakeCollector('openaq'), FakeCollector('sensors')])
+    jobs = {job.name: job.interval for job in etl.jobs()}
+    assert jobs == {'openaq+sensors': 300, 'openweather': 1800, 'maintenance': scheduler.MAINTENANCE_INTERVAL * 60}
+
+class SlowCollector(FakeCollector):
+    async def collect_async(self, timeout=None):
+        await asyncio.sleep(0.2)
+        return await super().collect_async(timeout)
+
+def test_sources_are_collected_in_parallel(tmp_path, monkeypatch):
+    collectors = [SlowCollector(source, [{'location_name': 'Paris Nord'}]) for source in ('openweather', 'openaq')]
+    etl = pipeline(tmp_path, monkeypatch, collectors)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        collected = await etl.collect_all(list(etl.collectors), RunSummary('test', None))
+        return collected, loop.time() - started
+
+    collected, elapsed = asyncio.run(main())
+    assert {source: len(rows) for source, rows in collected.items()} == {'openweather': 1, 'openaq': 1}
+    assert elapsed < 0.35
@@ -0,0 +1,57 @@
+from unittest import mock
+from sharding import HashRing, ShardLeaseManager, stable_hash
+
+KEYS = [f"location-{number}" for number in range(2000)]
+
+def test_stable_hash_is_deterministic():
+    assert stable_hash('Paris Nord') == stable_hash('Paris Nord')
+    assert stable_hash('Paris Nord') != stable_hash('Paris Est')
+    assert 0 <= stable_hash('Paris Nord') < 2 ** 64
+
+def test_every_shard_gets_a_share():
+    ring = HashRing(8)
+    counts = {}
+    for key in KEYS:
+        shard = ring.shard_for(key)
+        counts[shard] = counts.get(shard, 0) + 1
+    assert sorted(counts) == list(range(8))
+    assert min(counts.values()) > len(KEYS) / 8 / 3
+
+def test_adding_a_shard_only_moves_keys_onto_it():
+    before, after = HashRing(8), HashRing(9)
+    moved = [key for key in KEYS if before.shard_for(key) != after.shard_for(key)]
+    assert moved
+    assert all(after.shard_for(key) == 8 for key in moved)
+    assert len(moved) < len(KEYS) / 4
+
+def manager(worker_id, shard_count=16):
+    return ShardLeaseManager(mock.MagicMock(), worker_id, shard_count=shard_count)
+
+def test_assign_keeps_the_locations_of_owned_shards():
+    shards = manager('worker-a')
+    locations = [{'name': key} for key in KEYS[:200]]
+    shards.owned = {0, 1, 2}
+    assigned = shards.assign(locations)
+    assert assigned
+    assert all(shards.ring.shard_for(location['name']) in shards.owned for location in assigned)
+    assert len(assigned) == sum(shards.ring.shard_for(key) in shards.owned for key in KEYS[:200])
+
+def test_assignments_of_all_workers_partition_the_catalog():
+    workers = ['worker-a', 'worker-b', 'worker-c']
+    managers = [manager(worker) for worker in workers]
+    for shards in managers:
+        shards.owned = {
+            shard_id for shard_id in range(shards.shard_count)
+            if shards._desired_owner(shard_id, workers) == shards.worker_id
+        }
+    locations = [{'name': key} for key in KEYS]
+    assigned = [location['name'] for shards in managers for location in shards.assign(locations)]
+    assert sorted(assigned) == sorted(KEYS)
+
+def test_a_departing_worker_only_moves_its_own_shards():
+    shards = manager('worker-a', shard_count=64)
+    before = {shard_id: shards._desired_owner(shard_id, ['worker-a', 'worker-b', 'worker-c']) for shard_id in range(64)}
+    after = {shard_id: shards._desired_owner(shard_id, ['worker-a', 'worker-b']) for shard_id in range(64)}
+    moved = [shard_id for shard_id in range(64) if before[shard_id] != after[shard_id]]
+    assert moved
+    assert all(before[shard_id] == 'worker-c' for shard_id in moved)
@@ -0,0 +1,73 @@
+import os
+import pandas as pd
+from spool import Spool
+
+def batch(rows=3, offset=0):
+    return pd.DataFrame({
+        'location_name': [f"location-{offset + number}" for number in range(rows)],
+        'timestamp': pd.date_range('2024-01-01 10:00', periods=rows, freq='h') + pd.Timedelta(hours=offset),
+        'pm25': [12.5, None, 30.0][:rows],
+        'aqi': pd.array([52, None, 88][:rows], dtype='Int64'),
+    })
+
+def replay(spool):
+    return [frame for path in spool.sealed_segments() for frame in spool.read(path)]
+
+def test_batches_replay_with_their_dtypes(tmp_path):
+    spool = Spool(str(tmp_path))
+    spool.append(batch())
+    frames = replay(spool)
+    assert len(frames) == 1
+    pd.testing.assert_frame_equal(frames[0], batch(), check_dtype=True)
+
+def test_empty_batches_are_not_spooled(tmp_path):
+    spool = Spool(str(tmp_path))
+    spool.append(batch().iloc[0:0])
+    assert spool.sealed_segments() == []
+    assert spool.stats['appended_rows'] == 0
+
+def test_segments_are_sealed_once_full_and_replayed_in_order(tmp_path):
+    spool = Spool(str(tmp_path), segment_bytes=1)
+    for offset in (0, 10, 20):
+        spool.append(batch(offset=offset))
+    paths = spool.sealed_segments()
+    assert len(paths) == 3
+    assert paths == sorted(paths)
+    assert [frame['location_name'].iloc[0] for frame in replay(spool)] == ['location-0', 'location-10', 'location-20']
+
+def test_a_torn_last_line_is_skipped(tmp_path):
+    spool = Spool(str(tmp_path))
+    spool.append(batch())
+    path, = spool.sealed_segments()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"dtypes": {"pm25"')
+    assert len(list(spool.read(path))) == 1
+
+def test_a_restarted_spool_picks_up_its_segments(tmp_path):
+    first = Spool(str(tmp_path))
+    first.append(batch())
+    first.close()
+
+    second = Spool(str(tmp_path))
+    assert second.wait(0)
+    second.append(batch(offset=10))
+    paths = second.sealed_segments()
+    assert len(paths) == 2
+    assert [len(frame) for frame in replay(second)] == [3, 3]
+
+def test_removed_segments_leave_the_backlog(tmp_path):
+    spool = Spool(str(tmp_path))
+    spool.append(batch())
+    path, = spool.sealed_segments()
+    assert spool.pending_bytes() == os.path.getsize(path)
+    assert spool.metrics()['pending_segments'] == 1
+
+    spool.remove(path)
+    assert spool.pending_bytes() == 0
+    assert spool.metrics()['pending_segments'] == 0
+
+def test_appended_rows_are_counted(tmp_path):
+    spool = Spool(str(tmp_path))
+    spool.append(batch())
+    spool.append(batch(rows=2, offset=5))
+    assert spool.stats['appended_rows'] == 5
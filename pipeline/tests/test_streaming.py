@@ -0,0 +1,118 @@
+import asyncio
+import pandas as pd
+import pytest
+from collectors.base import BaseCollector
+from collectors.cache import ResponseCache
+import streaming
+from streaming import BatchingLoader, StreamJoiner, stream_collectors
+
+class StubCollector(BaseCollector):
+    """Streams one reading per location"""
+
+    def __init__(self, source, names, field):
+        self.source = source
+        super().__init__([{'name': name} for name in names])
+        self.cache = ResponseCache(100)
+        self.field = field
+
+    async def fetch(self, target):
+        await asyncio.sleep(0)
+        return {'name': target['name']}
+
+    def observation_marker(self, data):
+        return '10:00'
+
+    def transform(self, data, location):
+        return {'location_name': location['name'], self.field: 1.0, 'source': self.source}
+
+class RecordTransformer:
+    """Merges each micro-batch's records per location"""
+
+    def transform_frame(self, *batches):
+        rows = {}
+        for batch in batches:
+            for record in batch:
+                rows.setdefault(record['location_name'], {}).update(record)
+        return pd.DataFrame(list(rows.values()))
+
+def test_records_are_released_once_every_source_reported():
+    joiner = StreamJoiner(['openweather', 'openaq'])
+    assert joiner.add('openweather', {'location_name': 'Paris Nord', 'temperature': 18.5}) == []
+    ready = joiner.add('openaq', {'location_name': 'Paris Nord', 'pm25': 12.0})
+    assert [sorted(group) for group in ready] == [['openaq', 'openweather']]
+
+def test_a_finished_source_releases_the_locations_it_never_reported():
+    joiner = StreamJoiner(['openweather', 'openaq'])
+    joiner.add('openweather', {'location_name': 'Paris Nord'})
+    joiner.add('openweather', {'location_name': 'Paris Est'})
+    assert len(joiner.finish('openaq')) == 2
+    assert joiner.pending == {}
+
+def test_the_oldest_locations_are_released_when_the_buffer_is_full():
+    joiner = StreamJoiner(['openweather', 'openaq'], max_pending=2)
+    for name in ('a', 'b'):
+        assert joiner.add('openweather', {'location_name': name}) == []
+    ready = joiner.add('openweather', {'location_name': 'c'})
+    assert [group['openweather']['location_name'] for group in ready] == ['a']
+    assert joiner.released_early == 1
+
+def test_batches_are_flushed_by_size_and_on_close():
+    frames = []
+
+    async def main():
+        loader = BatchingLoader(frames.append, RecordTransformer(), ['openaq'], batch_rows=2, flush_ms=60000)
+        for name in ('a', 'b', 'c'):
+            await loader.add([{'openaq': {'location_name': name}}])
+        assert [len(frame) for frame in frames] == [2]
+        await loader.close()
+        return loader
+
+    loader = asyncio.run(main())
+    assert [len(frame) for frame in frames] == [2, 1]
+    assert (loader.loaded, loader.batches) == (3, 2)
+
+def test_a_partial_batch_is_flushed_after_the_interval():
+    frames = []
+
+    async def main():
+        loader = BatchingLoader(frames.append, RecordTransformer(), ['openaq'], batch_rows=100, flush_ms=20)
+        loader.start()
+        await loader.add([{'openaq': {'location_name': 'a'}}])
+        await asyncio.sleep(0.1)
+        loaded = len(frames)
+        await loader.close()
+        return loaded
+
+    assert asyncio.run(main()) == 1
+
+def stream(collectors, sink):
+    async def main():
+        return await stream_collectors(collectors, sink, RecordTransformer())
+    return asyncio.run(main())
+
+@pytest.fixture
+def collectors(monkeypatch):
+    monkeypatch.setattr(streaming, 'get_timeout', lambda source: 5)
+    names = [f"location-{number}" for number in range(25)]
+    return {
+        'openweather': StubCollector('openweather', names, 'temperature'),
+        'openaq': StubCollector('openaq', names[5:], 'pm25'),
+    }
+
+def test_streams_are_joined_and_loaded(collectors):
+    frames = []
+    assert stream(collectors, frames.append) == 25
+    combined = pd.concat(frames)
+    assert sorted(combined['location_name']) == sorted(f"location-{number}" for number in range(25))
+    # Every location both sources report arrives in one row
+    assert combined['pm25'].notna().sum() == 20 and combined['temperature'].notna().all()
+    assert collectors['openaq'].cache.get('openaq', 'location-5')[0] == '10:00'
+
+def test_a_failed_load_discards_every_marker(collectors):
+    def sink(frame):
+        raise RuntimeError('database unavailable')
+
+    assert stream(collectors, sink) == 0
+    for source, collector in collectors.items():
+        assert collector.pending_markers == {}
+        assert collector.cache.get(source, 'location-5') is None
@@ -1,91 +1,121 @@
 import logging
 from datetime import datetime
-import random
+import numpy as np
+import pandas as pd
+from aqi import compute_aqi
 
 logger = logging.getLogger(__name__)
 
+# Columns each source may contribute to a combined measurement row
+MEASUREMENT_FIELDS = [
+    'temperature', 'humidity', 'pressure',
+    'pm25', 'pm10', 'no2', 'so2', 'co', 'o3'
+]
+
+# Output schema of the transform, in load order
+MEASUREMENT_DTYPES = {
+    'location_name': 'object',
+    'latitude': 'float64',
+    'longitude': 'float64',
+    'timestamp': 'datetime64[ns]',
+    'temperature': 'float64',
+    'humidity': 'float64',
+    'pressure': 'float64',
+    'pm25': 'float64',
+    'pm10': 'float64',
+    'no2': 'float64',
+    'so2': 'float64',
+    'co': 'float64',
+    'o3': 'float64',
+    'aqi': 'Int64',
+    'dominant_pollutant': 'object',
+    'traffic_level': 'Int64',
+    'source': 'object'
+}
+
 class DataTransformer:
     def __init__(self):
-        pass
-    
-    def transform(self, weather_data, air_quality_data):
-        """Combine and transform data from multiple sources"""
-        # Create a mapping by location
-        weather_map = {w['location_name']: w for w in weather_data}
-        air_quality_map = {a['location_name']: a for a in air_quality_data}
-        
-        combined_data = []
-        
-        # Merge data by location
-        all_locations = set(weather_map.keys()) | set(air_quality_map.keys())
-        
-        for location in all_locations:
-            measurement = {
-                'location_name': location,
-                'timestamp': datetime.utcnow()
-            }
-            
-            # Add weather data
-            if location in weather_map:
-                weather = weather_map[location]
-                measurement.update({
-                    'latitude': weather['latitude'],
-                    'longitude': weather['longitude'],
-                    'temperature': weather.get('temperature'),
-                    'humidity': weather.get('humidity'),
-                    'pressure': weather.get('pressure')
-                })
-            
-            # Add air quality data
-            if location in air_quality_map:
-                air_quality = air_quality_map[location]
-                measurement.update({
-                    'pm25': air_quality.get('pm25'),
-                    'pm10': air_quality.get('pm10'),
-                    'no2': air_quality.get('no2'),
-                    'so2': air_quality.get('so2'),
-                    'co': air_quality.get('co'),
-                    'o3': air_quality.get('o3'),
-                    'aqi': air_quality.get('aqi')
-                })
-                
-                # Use air quality coordinates if weather data missing
-                if 'latitude' not in measurement:
-                    measurement['latitude'] = air_quality['latitude']
-                    measurement['longitude'] = air_quality['longitude']
-            
-            # Add synthetic traffic data (for demo purposes)
-            measurement['traffic_level'] = self.estimate_traffic_level(measurement['timestamp'])
-            
-            # Determine source
-            if location in weather_map and location in air_quality_map:
-                measurement['source'] = 'combined'
-            elif location in weather_map:
-                measurement['source'] = 'openweather'
-            else:
-                measurement['source'] = 'openaq'
-            
-            # Ensure we have coordinates
-            if 'latitude' in measurement and 'longitude' in measurement:
-                combined_data.append(measurement)
-            else:
+        self.rng = np.random.default_rng()
+
+    def transform(self, *sources):
+        """Combine and transform data from multiple sources into measurement dicts"""
+        frame = self.transform_frame(*sources)
+        # Plain Python values: None for missing readings and datetime timestamps
+        records = frame.astype(object).where(frame.notna(), None)
+        records['timestamp'] = pd.Series(
+            [timestamp.to_pydatetime() for timestamp in frame['timestamp']], index=frame.index, dtype=object
+        )
+        return records.to_dict('records')
+
+    def transform_frame(self, *sources):
+        """Combine data from multiple sources into one typed measurement frame.
+
+        Each positional argument is one collector's batch, as a list of
+        measurement dicts or a DataFrame. Batches are joined on location in a
+        single outer merge; earlier sources win for coordinates and later
+        sources win for overlapping fields. Rows are stamped with the provider
+        observation time, the latest one when several sources saw the row.
+        """
+        frames = [
+            self._source_frame(batch, index)
+            for index, batch in enumerate(sources)
+            if len(batch)
+        ]
+        if not frames:
+            return self._empty_frame()
+
+        combined = frames[0]
+        for frame in frames[1:]:
+            combined = combined.merge(frame, on='location_name', how='outer', suffixes=('', '_next'))
+            for column in [c for c in combined.columns if c.endswith('_next')]:
+                base = column[:-len('_next')]
+                if base in ('latitude', 'longitude', 'source'):
+                    combined[base] = combined[base].combine_first(combined[column])
+                elif base == 'timestamp':
+                    combined[base] = combined[[base, column]].max(axis=1)
+                else:
+                    combined[base] = combined[column].combine_first(combined[base])
+                combined = combined.drop(columns=column)
+
+        # Rows seen by more than one source are 'combined'
+        seen_by = combined[[c for c in combined.columns if c.startswith('_from_')]].sum(axis=1)
+        combined['source'] = combined['source'].where(seen_by == 1, 'combined')
+
+        missing_coordinates = combined['latitude'].isna() | combined['longitude'].isna()
+        if missing_coordinates.any():
+            for location in combined.loc[missing_coordinates, 'location_name']:
                 logger.warning(f"Skipping measurement for {location} - missing coordinates")
-        
-        return combined_data
-    
-    def estimate_traffic_level(self, timestamp):
-        """Estimate traffic level based on time of day (synthetic data)"""
-        hour = timestamp.hour
-        
-        # Morning rush hour (7-9 AM)
-        if 7 <= hour <= 9:
-            return random.randint(7, 10)
-        # Evening rush hour (5-7 PM)
-        elif 17 <= hour <= 19:
-            return random.randint(7, 10)
-        # Daytime
-        elif 9 < hour < 17:
-            return random.randint(4, 7)
-        # Night time
-        else:
-            return random.randint(1, 3)
\ No newline at end of file
+            combined = combined[~missing_coordinates]
+
+        if 'timestamp' not in combined.columns:
+            combined['timestamp'] = pd.NaT
+        combined['timestamp'] = pd.to_datetime(combined['timestamp']).fillna(pd.Timestamp(datetime.utcnow()))
+
+        # AQI is derived from the merged pollutants, so it sees every source's readings
+        combined['aqi'], combined['dominant_pollutant'] = compute_aqi(combined)
+
+        # Add synthetic traffic data (for demo purposes)
+        combined['traffic_level'] = self.estimate_traffic_levels(combined['timestamp'].dt.hour.to_numpy())
+
+        return combined.reindex(columns=list(MEASUREMENT_DTYPES)).astype(MEASUREMENT_DTYPES).reset_index(drop=True)
+
+    def _source_frame(self, batch, index):
+        """Project one collector batch onto the measurement columns"""
+        frame = batch if isinstance(batch, pd.DataFrame) else pd.DataFrame.from_records(batch)
+        columns = ['location_name', 'latitude', 'longitude', 'timestamp', 'source'] + [
+            field for field in MEASUREMENT_FIELDS if field in frame.columns
+        ]
+        frame = frame[[c for c in columns if c in frame.columns]].drop_duplicates('location_name', keep='last')
+        frame[f'_from_{index}'] = 1
+        return frame
+
+    def _empty_frame(self):
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in MEASUREMENT_DTYPES.items()})
+
+    def estimate_traffic_levels(self, hours):
+        """Estimate traffic levels for an array of hours of day (synthetic data)"""
+        rush_hour = ((hours >= 7) & (hours <= 9)) | ((hours >= 17) & (hours <= 19))
+        daytime = (hours > 9) & (hours < 17)
+        low = np.select([rush_hour, daytime], [7, 4], default=1)
+        high = np.select([rush_hour, daytime], [10, 7], default=3)
+        return self.rng.integers(low, high + 1)
@@ -24,7 +24,7 @@ END $$;
 
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_measurements_location_timestamp 
-ON measurements(location_name, timestamp DESC);
+ON measurements(location_id, timestamp DESC);
 
 CREATE INDEX IF NOT EXISTS idx_measurements_timestamp 
 ON measurements(timestamp DESC);
@@ -34,37 +34,14 @@ ON measurements(pm25)
 WHERE pm25 IS NOT NULL;
 
 CREATE INDEX IF NOT EXISTS idx_predictions_location_target 
-ON predictions(location_name, target_timestamp DESC);
+ON predictions(location_id, target_timestamp DESC);
 
 CREATE INDEX IF NOT EXISTS idx_alerts_active 
 ON alerts(is_active, created_at DESC) 
 WHERE is_active = true;
 
--- Create materialized view for hourly aggregates
-CREATE MATERIALIZED VIEW IF NOT EXISTS hourly_measurements AS
-SELECT 
-    location_name,
-    date_trunc('hour', timestamp) as hour,
-    AVG(temperature) as avg_temperature,
-    AVG(humidity) as avg_humidity,
-    AVG(pm25) as avg_pm25,
-    AVG(pm10) as avg_pm10,
-    MAX(pm25) as max_pm25,
-    MIN(pm25) as min_pm25,
-    COUNT(*) as measurement_count
-FROM measurements
-GROUP BY location_name, date_trunc('hour', timestamp);
-
-CREATE INDEX IF NOT EXISTS idx_hourly_measurements 
-ON hourly_measurements(location_name, hour DESC);
-
--- Create function to refresh materialized view
-CREATE OR REPLACE FUNCTION refresh_hourly_measurements()
-RETURNS void AS $$
-BEGIN
-    REFRESH MATERIALIZED VIEW CONCURRENTLY hourly_measurements;
-END;
-$$ LANGUAGE plpgsql;
+-- Hourly and daily aggregates live in the measurements_hourly and
+-- measurements_daily rollup tables, which the pipeline keeps current
 
 -- Create function to auto-update timestamps
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -93,40 +70,13 @@ BEGIN
     END IF;
 END $$;
 
--- Create partitioning for measurements table (optional, for large datasets)
--- This creates monthly partitions for better performance
-DO $$ 
-DECLARE
-    start_date date := '2024-01-01';
-    end_date date := '2025-12-31';
-    partition_date date;
-    partition_name text;
-BEGIN
-    partition_date := start_date;
-    
-    WHILE partition_date < end_date LOOP
-        partition_name := 'measurements_' || to_char(partition_date, 'YYYY_MM');
-        
-        -- Check if partition exists
-        IF NOT EXISTS (
-            SELECT 1 FROM pg_class c
-            JOIN pg_namespace n ON n.oid = c.relnamespace
-            WHERE c.relname = partition_name
-        ) THEN
-            EXECUTE format(
-                'CREATE TABLE %I PARTITION OF measurements 
-                FOR VALUES FROM (%L) TO (%L)',
-                partition_name,
-                partition_date,
-                partition_date + interval '1 month'
-            );
-        END IF;
-        
-        partition_date := partition_date + interval '1 month';
-    END LOOP;
-END $$;
+-- measurements is range-partitioned by month on timestamp. The partitions are
+-- created by the Django migration api/0006_partition_measurements and kept
+-- rolling by the pipeline (pipeline/partitions.py), not here.
 
--- Insert default alert configurations
+-- Insert default alert configurations. Pollutant thresholds are in µg/m³,
+-- the unit the pipeline stores every reading in (gases reported in ppm/ppb
+-- are converted on the way in); AQI thresholds are index values.
 INSERT INTO alert_configs (parameter, threshold_value, severity, is_enabled)
 VALUES 
     ('pm25', 35.0, 'medium', true),